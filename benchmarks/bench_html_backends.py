@@ -0,0 +1,89 @@
+"""
+Бенчмарк HTML бэкендов на сохранённых страницах BeForward
+
+По умолчанию - синтетические страницы первой и второй версии из
+benchmarks/fixtures/; реальные страницы (Ctrl+S в браузере или curl)
+сохраните туда же как *.html или передайте пути аргументами:
+
+    python benchmarks/bench_html_backends.py page_v1.html page_v2.html
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import FIXTURES_DIR, input_paths
+from html_backend import Bs4Backend, available_backends, get_backend
+from rus_bot import BeForwardParser, PageDocument
+
+ITERATIONS = 20
+
+
+def run_extractors(parser: BeForwardParser, doc: PageDocument) -> dict:
+    """Выполняет все экстракторы страницы (как parse_car_data, без сети)"""
+    result = {
+        'car_name': parser._extract_car_name(doc),
+        'specs': parser._extract_specs(doc),
+        'photo_download_url': parser._extract_photo_download_url(doc),
+        'price': parser._extract_price_from_document(doc),
+    }
+    if result['photo_download_url'] == "COLLECT_PHOTOS":
+        result['photo_urls'] = parser._collect_photo_urls(doc)
+    return result
+
+
+def bench_file(parser: BeForwardParser, path: str):
+    """Замеряет парсинг и экстракторы одной страницы на всех бэкендах"""
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    print(f"\n📄 {os.path.basename(path)} ({len(content) / 1024:.0f} KB)")
+    print(f"{'backend':<14} {'partial':<8} {'parse ms':>10} {'extract ms':>11} {'total ms':>10}  result")
+
+    reference = None
+    for name in available_backends():
+        backend = get_backend(name)
+        # Частичный парсинг есть только у bs4 бэкендов
+        partial_modes = (False, True) if isinstance(backend, Bs4Backend) else (False,)
+        for partial in partial_modes:
+            parse_time = 0.0
+            extract_time = 0.0
+            for _ in range(ITERATIONS):
+                start = time.perf_counter()
+                doc = PageDocument(path, content, backend=backend, partial=partial)
+                parse_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                result = run_extractors(parser, doc)
+                extract_time += time.perf_counter() - start
+
+            if reference is None:
+                reference = result
+            status = "OK" if result == reference else "DIFF"
+
+            parse_ms = parse_time / ITERATIONS * 1000
+            extract_ms = extract_time / ITERATIONS * 1000
+            print(
+                f"{name:<14} {str(partial):<8} {parse_ms:>10.1f} {extract_ms:>11.1f} "
+                f"{parse_ms + extract_ms:>10.1f}  {status}"
+            )
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    paths = input_paths(('*.html',))
+    if not paths:
+        print(f"❌ Нет страниц для замера: передайте пути или сохраните *.html в {FIXTURES_DIR}")
+        return
+
+    print(f"🧪 Бэкенды: {', '.join(available_backends())}, итераций: {ITERATIONS}")
+    parser = BeForwardParser()
+    for path in paths:
+        bench_file(parser, path)
+
+
+if __name__ == "__main__":
+    main()
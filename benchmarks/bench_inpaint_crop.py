@@ -0,0 +1,104 @@
+"""
+Бенчмарк inpainting водяного знака: всё фото (full) против области вокруг знака (crop)
+
+Нужен запущенный IOPaint (handler.py или `iopaint start --model=lama`).
+Передайте фото BeForward аргументами или сохраните *.jpg в benchmarks/fixtures/:
+
+    python benchmarks/bench_inpaint_crop.py photo1.jpg photo2.jpg
+    IOPAINT_HOST=http://127.0.0.1:8080 python benchmarks/bench_inpaint_crop.py
+
+PSNR считается между результатами full и crop: по области знака и по всему фото
+(вне маски crop не меняет пиксели, поэтому общий PSNR обычно очень высокий).
+"""
+import base64
+import io
+import logging
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from PIL import Image, ImageChops, ImageStat
+
+import config
+from common import photo_paths
+from watermark import crop_box, inpaint_watermark, watermark_box
+
+ITERATIONS = 3
+
+
+def to_base64(img: Image.Image) -> str:
+    buffer = io.BytesIO()
+    img.convert('RGB' if img.mode == 'RGBA' else img.mode).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def iopaint_inpaint(img: Image.Image, mask: Image.Image) -> Image.Image:
+    """Один запрос к IOPaint (как BeForwardParser._inpaint_request)"""
+    response = requests.post(
+        f"{config.IOPAINT_URL}{config.IOPAINT_INPAINT_ENDPOINT}",
+        json={
+            'image': to_base64(img),
+            'mask': to_base64(mask),
+            'ldmSampler': 'plms',
+            'hdStrategy': 'Original',
+        },
+        timeout=config.INPAINT_TIMEOUT
+    )
+    response.raise_for_status()
+    return Image.open(io.BytesIO(response.content)).convert('RGB')
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    """PSNR двух изображений одного размера (дБ)"""
+    diff = ImageChops.difference(a.convert('RGB'), b.convert('RGB'))
+    mse = sum(rms ** 2 for rms in ImageStat.Stat(diff).rms) / 3
+    return float('inf') if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def timed(mode: str, img: Image.Image):
+    """Среднее время inpaint_watermark в режиме mode и последний результат"""
+    elapsed = 0.0
+    result = None
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        result = inpaint_watermark(img, iopaint_inpaint, mode=mode)
+        elapsed += time.perf_counter() - start
+    return elapsed / ITERATIONS, result
+
+
+def bench_file(path: str):
+    img = Image.open(path).convert('RGB')
+    width, height = img.size
+
+    full_time, full = timed('full', img)
+    crop_time, crop = timed('crop', img)
+
+    region = crop_box(width, height, watermark_box(width, height), config.INPAINT_CROP_PADDING)
+    x1, y1, x2, y2 = watermark_box(width, height)
+    mark = (x1, y1, min(x2 + 1, width), min(y2 + 1, height))
+
+    print(
+        f"{os.path.basename(path):<28} {width}x{height:<6} "
+        f"{full_time * 1000:>9.0f} {crop_time * 1000:>9.0f} {full_time / crop_time:>7.1f}x "
+        f"{psnr(full.crop(mark), crop.crop(mark)):>10.1f} {psnr(full, crop):>10.1f}  "
+        f"crop {region[2] - region[0]}x{region[3] - region[1]}"
+    )
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    paths = photo_paths()
+
+    print(f"🧪 IOPaint: {config.IOPAINT_URL}, padding: {config.INPAINT_CROP_PADDING}px, итераций: {ITERATIONS}")
+    print(f"{'photo':<28} {'size':<11} {'full ms':>9} {'crop ms':>9} {'speedup':>8} {'PSNR mark':>10} {'PSNR all':>10}")
+    for path in paths:
+        bench_file(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Бенчмарк движков очистки фото: IOPaint HTTP сервер против моделей в процессе
+
+HTTP замеряется, если IOPaint доступен по IOPAINT_HOST (`iopaint start --model=lama
+--device=cpu --enable-realesrgan`). Устройство для моделей в процессе - BENCH_DEVICE
+(по умолчанию cpu):
+
+    python benchmarks/bench_inpaint_engine.py photo1.jpg photo2.jpg
+    BENCH_DEVICE=cuda python benchmarks/bench_inpaint_engine.py
+"""
+import io
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from PIL import Image
+
+import config
+from bench_inpaint_crop import iopaint_inpaint, to_base64
+from common import photo_paths
+from inpaint_engine import LOCAL_ENGINE_AVAILABLE, LocalInpaintEngine
+from watermark import inpaint_watermark
+
+ITERATIONS = 3
+
+
+def iopaint_upscale(img: Image.Image) -> Image.Image:
+    """RealESRGAN через IOPaint HTTP (как handler.upscale_image)"""
+    response = requests.post(
+        f"{config.IOPAINT_URL}{config.IOPAINT_UPSCALE_ENDPOINT}",
+        json={'name': 'RealESRGAN', 'image': to_base64(img), 'scale': config.UPSCALE_FACTOR},
+        timeout=config.UPSCALE_TIMEOUT
+    )
+    response.raise_for_status()
+    return Image.open(io.BytesIO(response.content)).convert('RGB')
+
+
+def iopaint_available() -> bool:
+    try:
+        return requests.get(f"{config.IOPAINT_URL}{config.IOPAINT_CONFIG_ENDPOINT}", timeout=3).ok
+    except Exception:
+        return False
+
+
+def average_ms(fn, *args) -> float:
+    fn(*args)  # прогрев (первый вызов модели заметно медленнее)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn(*args)
+    return (time.perf_counter() - start) / ITERATIONS * 1000
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    paths = photo_paths()
+
+    engines = {}
+    if iopaint_available():
+        engines['http'] = (iopaint_inpaint, iopaint_upscale)
+    else:
+        print(f"⚠️ IOPaint недоступен на {config.IOPAINT_URL} - HTTP не замеряется")
+
+    if LOCAL_ENGINE_AVAILABLE:
+        device = os.getenv('BENCH_DEVICE', 'cpu')
+        start = time.perf_counter()
+        local = LocalInpaintEngine(device=device, upscale_factor=config.UPSCALE_FACTOR)
+        print(f"🧠 Модели загружены на {device} за {time.perf_counter() - start:.1f} сек")
+        engines['local'] = (local.inpaint, local.upscale)
+    else:
+        print("⚠️ iopaint/torch не установлены - модели в процессе не замеряются")
+
+    if not engines:
+        return
+
+    print(f"🧪 INPAINT_MODE={config.INPAINT_MODE}, итераций: {ITERATIONS}")
+    print(f"{'photo':<28} {'engine':<7} {'inpaint ms':>11} {'upscale ms':>11}")
+    for path in paths:
+        img = Image.open(path).convert('RGB')
+        for name, (inpaint, upscale) in engines.items():
+            inpaint_ms = average_ms(inpaint_watermark, img, inpaint)
+            upscale_ms = average_ms(upscale, img)
+            print(f"{os.path.basename(path):<28} {name:<7} {inpaint_ms:>11.0f} {upscale_ms:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
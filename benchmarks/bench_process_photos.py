@@ -0,0 +1,78 @@
+"""
+Бенчмарк handler.process_photos: последовательная обработка против конвейера
+
+Задача из 20 фото (фото из аргументов или benchmarks/fixtures/ повторяются по кругу).
+Модель - IOPaint на handler.IOPAINT_URL, если он запущен, иначе модели в процессе
+(BENCH_DEVICE, по умолчанию cpu):
+
+    python benchmarks/bench_process_photos.py photo1.jpg photo2.jpg
+    PIPELINE_WORKERS=8 MODEL_MAX_INFLIGHT=2 python benchmarks/bench_process_photos.py
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import handler
+from common import photo_paths
+from inpaint_engine import LOCAL_ENGINE_AVAILABLE, LocalInpaintEngine
+
+JOB_SIZE = 20
+
+
+def iopaint_available() -> bool:
+    try:
+        return requests.get(f"{handler.IOPAINT_URL}/api/v1/server-config", timeout=3).ok
+    except Exception:
+        return False
+
+
+def run(label: str, photos: list, workers: int, inflight: int, batch_size: int):
+    handler.PIPELINE_WORKERS = workers
+    handler.MODEL_MAX_INFLIGHT = inflight
+    handler.INPAINT_BATCH_SIZE = batch_size
+
+    start = time.perf_counter()
+    zip_bytes = handler.process_photos(photos)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<12} workers={workers:<3} inflight={inflight:<3} batch={batch_size:<3} "
+        f"{elapsed:>7.1f} сек {len(photos) / elapsed:>7.2f} фото/сек  zip {len(zip_bytes) / 1024:.0f} KB"
+    )
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    paths = photo_paths()
+
+    sources = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            sources.append(f.read())
+    photos = [sources[i % len(sources)] for i in range(JOB_SIZE)]
+
+    if iopaint_available():
+        print(f"🧪 IOPaint: {handler.IOPAINT_URL}")
+    elif LOCAL_ENGINE_AVAILABLE:
+        device = os.getenv('BENCH_DEVICE', 'cpu')
+        handler.engine = LocalInpaintEngine(device=device, upscale_factor=handler.UPSCALE_FACTOR)
+        print(f"🧪 Модели в процессе на {device}")
+    else:
+        print("❌ Нет ни IOPaint, ни iopaint/torch для моделей в процессе")
+        return
+
+    workers, inflight, batch_size = handler.PIPELINE_WORKERS, handler.MODEL_MAX_INFLIGHT, handler.INPAINT_BATCH_SIZE
+    run('прогрев', photos[:2], 1, 1, 1)
+    run('по одному', photos, 1, 1, 1)
+    run('конвейер', photos, workers, inflight, 1)
+    if handler.engine and batch_size > 1:
+        run('конв.+пачки', photos, workers, inflight, batch_size)
+
+
+if __name__ == "__main__":
+    main()
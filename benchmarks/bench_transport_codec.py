@@ -0,0 +1,70 @@
+"""
+Микро-бенчмарк форматов передачи фото и маски в IOPaint (image_codec.py)
+
+Для каждого фото: время кодирования, размер base64 и время декодирования
+(то, что делает IOPaint на своей стороне) - для всего фото и для области
+вокруг знака (INPAINT_MODE=crop). IOPaint не нужен:
+
+    python benchmarks/bench_transport_codec.py photo1.jpg photo2.jpg
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from common import photo_paths
+from image_codec import IMAGE_CODECS, MASK_CODECS, encode_image, encode_mask, to_base64
+from watermark import prepare_watermark
+
+ITERATIONS = 5
+
+
+def measure(encode, decode_gray: bool = False):
+    """Среднее время кодирования, размер base64 и время декодирования"""
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        data = encode()
+    encode_ms = (time.perf_counter() - start) / ITERATIONS * 1000
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        decoded = Image.open(io.BytesIO(data))
+        decoded.convert('L' if decode_gray else 'RGB').load()
+    decode_ms = (time.perf_counter() - start) / ITERATIONS * 1000
+
+    return encode_ms, len(to_base64(data)), decode_ms
+
+
+def row(name: str, part: str, codec: str, result):
+    encode_ms, size, decode_ms = result
+    print(f"{name:<24} {part:<6} {codec:<6} {encode_ms:>10.1f} {size / 1024:>10.0f} {decode_ms:>10.1f}")
+
+
+def main():
+    paths = photo_paths()
+
+    print(f"🧪 итераций: {ITERATIONS}, jpeg для crop - png (исходного файла области нет)")
+    print(f"{'photo':<24} {'part':<6} {'codec':<6} {'encode ms':>10} {'base64 KB':>10} {'decode ms':>10}")
+    for path in paths:
+        with open(path, 'rb') as f:
+            source = f.read()
+        img = Image.open(io.BytesIO(source))
+        img.load()
+        name = os.path.basename(path)
+        print(f"{name:<24} source {len(source) / 1024:.0f} KB, {img.size[0]}x{img.size[1]}")
+
+        for part, mode in (('full', 'full'), ('crop', 'crop')):
+            _, model_input, mask = prepare_watermark(img, mode=mode)
+            part_source = source if model_input is img else None
+            for codec in IMAGE_CODECS:
+                row(name, part, codec, measure(lambda: encode_image(model_input, codec, part_source)))
+            for codec in MASK_CODECS:
+                row(name, part, 'm:' + codec, measure(lambda: encode_mask(mask, codec), decode_gray=True))
+
+
+if __name__ == "__main__":
+    main()
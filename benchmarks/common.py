@@ -0,0 +1,66 @@
+"""
+Общие помощники бенчмарков: входные файлы из аргументов или benchmarks/fixtures/
+
+Страницы BeForward лежат в fixtures/ (синтетические, с той же разметкой).
+Фото в репозиторий не кладём: если их нет ни в аргументах, ни в fixtures/,
+генерируются синтетические JPEG типичных размеров с полосой водяного знака.
+"""
+import glob
+import os
+import sys
+import tempfile
+from typing import List, Sequence
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+PHOTO_PATTERNS = ('*.jpg', '*.jpeg', '*.png')
+
+# Частые размеры фото BeForward
+SYNTHETIC_SIZES = ((1024, 768), (1280, 960), (640, 480))
+
+
+def input_paths(patterns: Sequence[str]) -> List[str]:
+    """Пути из аргументов командной строки или файлы fixtures/ по маскам"""
+    if sys.argv[1:]:
+        return sys.argv[1:]
+    return sorted(
+        path
+        for pattern in patterns
+        for path in glob.glob(os.path.join(FIXTURES_DIR, pattern))
+    )
+
+
+def photo_paths() -> List[str]:
+    """Фото для замера: аргументы, fixtures/ или синтетические JPEG"""
+    paths = input_paths(PHOTO_PATTERNS)
+    if paths:
+        return paths
+
+    paths = synthetic_photos()
+    print(f"ℹ️ Фото не переданы - синтетические JPEG: {os.path.dirname(paths[0])}")
+    return paths
+
+
+def synthetic_photos(sizes: Sequence = SYNTHETIC_SIZES) -> List[str]:
+    """Создаёт (один раз) синтетические фото с шумом и полосой водяного знака"""
+    from PIL import Image, ImageDraw
+
+    from watermark import watermark_box
+
+    out_dir = os.path.join(tempfile.gettempdir(), 'beforward_bench_photos')
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = []
+    for width, height in sizes:
+        path = os.path.join(out_dir, f"synthetic_{width}x{height}.jpg")
+        if not os.path.exists(path):
+            # Градиент + шум: JPEG по размеру и сложности ближе к фото, чем заливка
+            base = Image.linear_gradient('L').resize((width, height))
+            noise = Image.effect_noise((width, height), 48)
+            img = Image.merge('RGB', (base, noise, Image.blend(base, noise, 0.5)))
+            draw = ImageDraw.Draw(img)
+            draw.rectangle(watermark_box(width, height), fill=(255, 255, 255))
+            draw.text((watermark_box(width, height)[0] + 10, height - 25), "BE FORWARD", fill=(200, 0, 0))
+            img.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
@@ -4,15 +4,21 @@
 """
 import asyncio
 import base64
+import functools
 import io
 import logging
 import os
+import time
+from typing import List, Tuple
+
 import requests
 from dotenv import load_dotenv
 
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 
+import config
+from photo_archive import download_archive, read_selected_photos, read_selected_photos_ranged, select_photos_smart
 from rus_bot import BeForwardParser
 
 # Загружаем локальную конфигурацию
@@ -32,6 +38,79 @@ RUNPOD_ENDPOINT_ID = os.getenv('RUNPOD_ENDPOINT_ID')
 RUNPOD_API_URL = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/run"
 RUNPOD_STATUS_URL = f"https://api.runpod.ai/v2/{RUNPOD_ENDPOINT_ID}/status"
 
+# Как передавать фото на GPU воркер:
+# sources - только ссылки (ZIP + referer или список фото), воркер качает сам
+# base64 - бот скачивает фото и отправляет их в теле запроса
+RUNPOD_PHOTO_TRANSPORT = os.getenv('RUNPOD_PHOTO_TRANSPORT', 'sources')
+
+
+class PhotoPayload:
+    """Тело запроса RunPod {"input": {"photo_urls": [...]}} с потоковым base64
+
+    requests отправляет объект с __iter__ и __len__ потоком с Content-Length,
+    поэтому base64 кодируется кусками во время отправки: в памяти нет
+    списка base64 строк. Итерация не расходует фото - тело можно отправить
+    повторно (retry, редирект).
+    """
+
+    # Кратно 3 - куски base64 склеиваются без паддинга внутри строки
+    CHUNK = 3 * 64 * 1024
+
+    PREFIX = b'{"input": {"photo_urls": ['
+    SUFFIX = b']}}'
+
+    def __init__(self, photos: List[Tuple[str, bytes]]):
+        """Инициализация
+
+        Args:
+            photos: Фото (имя, байты)
+        """
+        self.photos = photos
+        encoded = sum(4 * ((len(data) + 2) // 3) + 2 for _, data in photos)
+        self.length = len(self.PREFIX) + encoded + max(len(photos) - 1, 0) + len(self.SUFFIX)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        yield self.PREFIX
+        for index in range(len(self.photos)):
+            view = memoryview(self.photos[index][1])
+            yield b',"' if index else b'"'
+            for offset in range(0, len(view), self.CHUNK):
+                yield base64.b64encode(view[offset:offset + self.CHUNK])
+            yield b'"'
+            view.release()
+        yield self.SUFFIX
+
+
+class StageTimings:
+    """Тайминги этапов обработки URL
+
+    Время старта и конца считается от начала запроса, поэтому в логе
+    видно, какие этапы шли параллельно (цена и скачивание фото).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def start(self, name: str):
+        self.stages[name] = [time.perf_counter() - self.started, None]
+
+    def end(self, name: str):
+        if name in self.stages and self.stages[name][1] is None:
+            self.stages[name][1] = time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        parts = []
+        for name, (start, end) in self.stages.items():
+            if end is None:
+                parts.append(f"{name} {start:.1f}с→…")
+            else:
+                parts.append(f"{name} {start:.1f}→{end:.1f}с ({end - start:.1f}с)")
+        return ' | '.join(parts)
+
 
 class LocalBot:
     """Локальный бот с вызовом RunPod для обработки фото"""
@@ -112,143 +191,148 @@ class LocalBot:
         self.is_processing = False
         logger.info("✅ Обработчик очереди завершён")
 
-    def _download_photos_sync(self, photo_download_url: str, referer_url: str):
-        """Синхронное скачивание фото (для executor)"""
-        import zipfile
-        import tempfile
-
-        temp_dir = tempfile.mkdtemp()
-        photo_paths = []
-
-        # Используем метод парсера для скачивания
-        response = self.parser.session.get(
-            photo_download_url,
-            timeout=120,
-            headers={'Referer': referer_url}
-        )
-        response.raise_for_status()
-
-        zip_path = os.path.join(temp_dir, 'photos.zip')
-        with open(zip_path, 'wb') as f:
-            f.write(response.content)
-
-        # Извлекаем фото
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(temp_dir)
-
-        # Собираем пути к фото
-        for root, dirs, files in os.walk(temp_dir):
-            for file in files:
-                if file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    photo_path = os.path.join(root, file)
-                    photo_paths.append(photo_path)
-
-        # Натуральная сортировка по числам в имени файла (1.jpg, 2.jpg, ..., 10.jpg)
-        import re
-        def extract_number(path):
-            """Извлекает число из имени файла для правильной сортировки"""
-            filename = os.path.basename(path)
-            # Ищем число перед расширением: XXX_123.jpg -> 123
-            match = re.search(r'_?(\d+)\.(jpg|jpeg|png)$', filename, re.IGNORECASE)
-            if match:
-                return int(match.group(1))
-            # Если не найдено, ищем любое число в имени
-            numbers = re.findall(r'\d+', filename)
-            return int(numbers[-1]) if numbers else 0
-
-        photo_paths.sort(key=extract_number)
-
-        return photo_paths, temp_dir
+    def _download_photos_sync(self, photo_download_url: str, referer_url: str) -> List[Tuple[str, bytes]]:
+        """Синхронное скачивание фото (для executor)
+
+        Returns:
+            Выбранные фото (имя, байты) - читаются прямо из архива, без распаковки
+        """
+        headers = {'Referer': referer_url}
+
+        # Только выбранные фото через Range (без HTTP кэша - Range ответы не кэшируются)
+        if config.PHOTO_RANGE_DOWNLOAD and not self.parser.http_cache:
+            photos = read_selected_photos_ranged(self.parser.session, photo_download_url, headers=headers, timeout=120)
+            if photos is not None:
+                return photos
+
+        if self.parser.http_cache:
+            # Архив кэшируется на диске - неизменённый архив стоит ответа 304
+            with self.parser.http_cache.get(
+                photo_download_url,
+                headers=headers,
+                timeout=120
+            ) as cached:
+                return read_selected_photos(cached.file)
+
+        # Потоковое скачивание - память ограничена config.PHOTO_DOWNLOAD_MEMORY_MB
+        with download_archive(self.parser.session, photo_download_url, headers=headers, timeout=120) as archive:
+            return read_selected_photos(archive)
 
     async def _process_url(self, url: str, update: Update, context: ContextTypes.DEFAULT_TYPE, status_msg):
         """Обработка одного URL"""
         await status_msg.edit_text("⏳ Получаю данные автомобиля...")
 
-        temp_dir = None  # Для cleanup в finally
+        stages = StageTimings()
+        price_task = None
         try:
-            # 1. Парсим данные машины (в отдельном потоке - не блокируем event loop)
+            # 1. Статичные данные страницы (цена считается отдельной задачей)
             logger.info(f"📋 Парсинг: {url}")
             loop = asyncio.get_event_loop()
 
-            # Запускаем парсинг в отдельном потоке чтобы не блокировать event loop
-            # (Playwright внутри уже работает в потоке, но сам parse_car_data синхронный)
-            car_data = await loop.run_in_executor(None, self.parser.parse_car_data, url)
-            logger.info(f"✅ parse_car_data завершён")
+            stages.start('страница')
+            car_data, price_task = await self.parser.parse_car_data_staged(url)
+            stages.end('страница')
+
+            stages.start('цена')
+            price_task.add_done_callback(lambda _: stages.end('цена'))
 
-            result_text = self.parser.format_car_data(car_data, url)
-            logger.info(f"✅ format_car_data завершён")
+            if 'error' in car_data:
+                await status_msg.edit_text(self.parser.format_car_data(car_data, url), disable_web_page_preview=True)
+                return
 
-            # 2. Получаем список фото
+            # 2. Ссылка на фото известна сразу - не ждём цену
             photo_download_url = car_data.get('photo_download_url')
             logger.info(f"📸 Photo download URL: {photo_download_url}")
 
-            if not photo_download_url or photo_download_url == "COLLECT_PHOTOS":
+            photo_urls = car_data.get('photo_urls')
+            if not photo_download_url or (photo_download_url == "COLLECT_PHOTOS" and not photo_urls):
                 # Нет фото - просто отправляем данные
                 logger.info("⚠️ Нет фото, отправляю только данные")
+                result_text = await self._await_caption(car_data, price_task, url)
                 await status_msg.edit_text(result_text, disable_web_page_preview=True)
                 return
 
-            # 3. Скачиваем фото через парсер (в отдельном потоке)
-            logger.info(f"📥 Начинаю скачивание фото...")
-            try:
-                photo_paths, temp_dir = await loop.run_in_executor(
-                    None,
-                    self._download_photos_sync,
-                    photo_download_url,
-                    url
-                )
-                logger.info(f"✅ Скачано {len(photo_paths)} фото")
+            if RUNPOD_PHOTO_TRANSPORT == 'sources':
+                # 3. GPU воркер сам скачивает и выбирает фото - отправляем только ссылки
+                if photo_download_url == "COLLECT_PHOTOS":
+                    sources = {"image_urls": photo_urls}
+                else:
+                    sources = {"zip_url": photo_download_url, "referer": url}
+                await status_msg.edit_text("🎨 Обработка фото...")
+                logger.info(f"🚀 Отправка источников фото на RunPod: {list(sources)}")
+                request_body = {'json': {"input": {"sources": sources}}}
+            else:
+                # 3. Скачиваем фото (в отдельном потоке) параллельно с получением цены
+                logger.info("📥 Начинаю скачивание фото...")
+                await status_msg.edit_text("📥 Скачиваю фото...")
+                stages.start('фото')
+                try:
+                    if photo_download_url == "COLLECT_PHOTOS":
+                        # Вторая версия страницы - фото из слайдера, параллельно по ссылкам
+                        selected_photos = await self.parser.fetch_photo_urls_async(
+                            select_photos_smart(photo_urls)
+                        )
+                        logger.info(f"✅ Получено {len(selected_photos)} фото по ссылкам")
+                    else:
+                        selected_photos = await loop.run_in_executor(
+                            None,
+                            self._download_photos_sync,
+                            photo_download_url,
+                            url
+                        )
+                        logger.info(f"✅ Получено {len(selected_photos)} фото из архива")
+
+                except Exception as e:
+                    logger.error(f"❌ Ошибка скачивания: {e}")
+                    result_text = await self._await_caption(car_data, price_task, url)
+                    await status_msg.edit_text(
+                        result_text + f"\n\n❌ Не удалось скачать фото: {str(e)[:100]}",
+                        disable_web_page_preview=True
+                    )
+                    return
+                finally:
+                    stages.end('фото')
 
-            except Exception as e:
-                logger.error(f"❌ Ошибка скачивания: {e}")
-                await status_msg.edit_text(
-                    result_text + f"\n\n❌ Не удалось скачать фото: {str(e)[:100]}",
-                    disable_web_page_preview=True
-                )
-                return
+                if not selected_photos:
+                    result_text = await self._await_caption(car_data, price_task, url)
+                    await status_msg.edit_text(
+                        result_text + "\n\n⚠️ Фото не найдены",
+                        disable_web_page_preview=True
+                    )
+                    return
 
-            if not photo_paths:
-                await status_msg.edit_text(
-                    result_text + "\n\n⚠️ Фото не найдены",
-                    disable_web_page_preview=True
+                # 4. Фото уже выбраны по списку архива (всегда ≤ 20)
+                photo_count = len(selected_photos)
+                await status_msg.edit_text(f"🎨 Обработка {photo_count} фото...")
+
+                # base64 кодируется по частям прямо во время отправки запроса
+                payload = PhotoPayload(selected_photos)
+                request_body = {'data': payload}
+                logger.info(f"🚀 Отправка {photo_count} фото на RunPod ({len(payload) / 1024 / 1024:.1f} MB)...")
+
+                # Байты фото теперь только в payload - освобождаются вместе с request_body
+                del selected_photos
+
+            # 1. Запускаем async job (цена может ещё считаться)
+            stages.start('runpod')
+            run_response = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    requests.post,
+                    RUNPOD_API_URL,
+                    headers={
+                        "Authorization": f"Bearer {RUNPOD_API_KEY}",
+                        "Content-Type": "application/json"
+                    },
+                    timeout=30,
+                    **request_body
                 )
-                return
-
-            # 4. Умный выбор фото (всегда ≤ 20)
-            selected_photos = self.parser._select_photos_smart(photo_paths)
-            photo_count = len(selected_photos)
-            await status_msg.edit_text(f"🎨 Обработка {photo_count} фото...")
-
-            # Конвертируем локальные файлы в base64 для отправки
-            photo_data = []
-            for photo_path in selected_photos:
-                with open(photo_path, 'rb') as f:
-                    photo_base64 = base64.b64encode(f.read()).decode('utf-8')
-                    photo_data.append(photo_base64)
-
-            logger.info(f"🚀 Отправка {len(photo_data)} фото на RunPod...")
-
-            # Освобождаем списки (файлы будут удалены в finally)
-            del photo_paths
-            del selected_photos
-
-            # 1. Запускаем async job
-            run_response = requests.post(
-                RUNPOD_API_URL,
-                json={
-                    "input": {
-                        "photo_urls": photo_data
-                    }
-                },
-                headers={
-                    "Authorization": f"Bearer {RUNPOD_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                timeout=30
             )
 
             if run_response.status_code != 200:
                 logger.error(f"RunPod error: {run_response.text}")
+                stages.end('runpod')
+                result_text = await self._await_caption(car_data, price_task, url)
                 await status_msg.edit_text(
                     result_text + "\n\n❌ Ошибка запуска обработки",
                     disable_web_page_preview=True
@@ -259,8 +343,8 @@ class LocalBot:
             job_id = run_result.get("id")
             logger.info(f"✅ Job создан: {job_id}")
 
-            # Освобождаем память от base64 данных
-            del photo_data
+            # Байты фото не нужны на время polling
+            request_body = None
 
             # 2. Polling результата
             max_wait = 300  # 5 минут
@@ -295,6 +379,8 @@ class LocalBot:
                     break
                 elif job_status == "FAILED":
                     error = status_result.get("error", "Unknown error")
+                    stages.end('runpod')
+                    result_text = await self._await_caption(car_data, price_task, url)
                     await status_msg.edit_text(
                         result_text + f"\n\n❌ Ошибка обработки: {error}",
                         disable_web_page_preview=True
@@ -303,12 +389,19 @@ class LocalBot:
 
             else:
                 # Timeout
+                stages.end('runpod')
+                result_text = await self._await_caption(car_data, price_task, url)
                 await status_msg.edit_text(
                     result_text + "\n\n⏱️ Обработка заняла слишком много времени. Попробуй позже.",
                     disable_web_page_preview=True
                 )
                 return
 
+            stages.end('runpod')
+
+            # Цена к этому моменту обычно уже готова - собираем подпись
+            result_text = await self._await_caption(car_data, price_task, url)
+
             # RunPod возвращает {"status": "COMPLETED", "output": {...}}
             output = result.get("output", {})
 
@@ -353,15 +446,40 @@ class LocalBot:
             await update.message.reply_text(f"❌ Ошибка: {str(e)[:200]}")
 
         finally:
-            # Всегда очищаем временные файлы
-            if temp_dir:
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                logger.info(f"🗑️ Очищена временная директория: {temp_dir}")
+            # Ранний выход или ошибка - цена уже не нужна, задача не должна висеть
+            self._drop_price_task(price_task)
+            logger.info(f"⏱️ Этапы: {stages.summary()}")
+
+    @staticmethod
+    def _drop_price_task(price_task):
+        """Отменяет недождавшуюся задачу цены (ошибка завершённой задачи считается обработанной)"""
+        if price_task is None:
+            return
+        if not price_task.done():
+            price_task.cancel()
+        elif not price_task.cancelled():
+            price_task.exception()
+
+    async def _await_caption(self, car_data: dict, price_task, url: str) -> str:
+        """Дожидается цены и собирает подпись с данными автомобиля"""
+        try:
+            await price_task
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения цены: {e}")
+        return self.parser.format_car_data(car_data, url)
+
+    async def post_shutdown(self, application):
+        """Выполняется при завершении работы бота"""
+        await self.parser.aclose()
 
     def run(self):
         """Запуск бота"""
-        self.application = Application.builder().token(self.token).build()
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
 
         self.application.add_handler(CommandHandler("start", self.start_command))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_url))
@@ -369,7 +487,13 @@ class LocalBot:
         logger.info("🚀 Запуск локального бота (polling режим)...")
         logger.info(f"📡 RunPod endpoint: {RUNPOD_ENDPOINT_ID}")
 
-        self.application.run_polling(drop_pending_updates=True)
+        # Запускаем браузеры заранее, чтобы первый запрос не ждал холодный старт
+        self.parser.warm_up()
+
+        try:
+            self.application.run_polling(drop_pending_updates=True)
+        finally:
+            self.parser.shutdown()
 
 
 def main():
@@ -0,0 +1,531 @@
+"""
+Сервис Chromium браузеров Playwright для извлечения цен
+Браузеры запускаются один раз и переиспользуются между запросами,
+все вызовы Playwright выполняются в одном долгоживущем потоке со своим event loop
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class PooledBrowser:
+    """Браузер с постоянным контекстом и счётчиком использований"""
+
+    def __init__(self, browser, context):
+        self.browser = browser
+        self.context = context
+        self.uses = 0
+        self.created_at = time.time()
+
+    def is_healthy(self) -> bool:
+        """Проверяет что процесс Chromium жив"""
+        return self.browser.is_connected()
+
+    async def close(self):
+        """Закрывает контекст и браузер (ошибки игнорируются - браузер мог упасть)"""
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+        try:
+            await self.browser.close()
+        except Exception:
+            pass
+
+
+class PageTracking:
+    """Статистика одной страницы: заблокированные запросы и время жизни"""
+
+    def __init__(self, blocking: bool):
+        self.blocking = blocking
+        self.blocked_requests = 0
+        self.blockable_bytes = 0
+        self.started_at = time.time()
+
+
+class ResourceBlocker:
+    """Блокирует ресурсы страницы, не нужные для чтения цены
+
+    В режиме замера блокировка включается через страницу: на страницах без
+    блокировки считается объём ресурсов, которые были бы заблокированы,
+    а время рендера сравнивается между двумя режимами.
+    """
+
+    def __init__(
+        self,
+        resource_types: list = None,
+        url_patterns: list = None,
+        measure: bool = None
+    ):
+        """Инициализация блокировщика
+
+        Args:
+            resource_types: Типы ресурсов Playwright (image, font, stylesheet...)
+            url_patterns: Подстроки URL для блокировки
+            measure: Режим замера экономии
+        """
+        if resource_types is None:
+            resource_types = config.PLAYWRIGHT_BLOCKED_RESOURCE_TYPES
+        if url_patterns is None:
+            url_patterns = config.PLAYWRIGHT_BLOCKED_URL_PATTERNS
+        if measure is None:
+            measure = config.PLAYWRIGHT_BLOCKING_MEASURE
+
+        self.resource_types = {t.strip() for t in resource_types if t.strip()}
+        self.url_patterns = [p.strip().lower() for p in url_patterns if p.strip()]
+        self.measure = measure
+
+        self._pages = 0
+        self.blocked_requests = 0
+        self._render_times = {True: deque(maxlen=50), False: deque(maxlen=50)}
+        self._blockable_bytes = deque(maxlen=50)
+
+    def should_block(self, request) -> bool:
+        """Проверяет, нужно ли блокировать запрос"""
+        if request.resource_type in self.resource_types:
+            return True
+        url = request.url.lower()
+        return any(pattern in url for pattern in self.url_patterns)
+
+    async def install(self, page) -> PageTracking:
+        """Подключает блокировку к странице (до page.goto)
+
+        Args:
+            page: Новая страница Playwright
+
+        Returns:
+            PageTracking для передачи в finish()
+        """
+        self._pages += 1
+        blocking = not (self.measure and self._pages % 2 == 0)
+        tracking = PageTracking(blocking)
+
+        if blocking:
+            async def route_handler(route):
+                if self.should_block(route.request):
+                    tracking.blocked_requests += 1
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await page.route("**/*", route_handler)
+
+        elif self.measure:
+            async def on_request_finished(request):
+                if not self.should_block(request):
+                    return
+                try:
+                    sizes = await request.sizes()
+                    tracking.blockable_bytes += sizes['responseBodySize'] + sizes['responseHeadersSize']
+                except Exception:
+                    pass
+
+            page.on('requestfinished', on_request_finished)
+
+        return tracking
+
+    def finish(self, tracking: PageTracking):
+        """Фиксирует статистику страницы после чтения цены"""
+        elapsed = time.time() - tracking.started_at
+        self.blocked_requests += tracking.blocked_requests
+        self._render_times[tracking.blocking].append(elapsed)
+
+        if not self.measure:
+            return
+
+        if tracking.blocking:
+            logger.info(
+                f"🚫 Страница с блокировкой: {elapsed:.1f} сек, "
+                f"заблокировано запросов: {tracking.blocked_requests}"
+            )
+        else:
+            self._blockable_bytes.append(tracking.blockable_bytes)
+            logger.info(
+                f"📏 Страница без блокировки: {elapsed:.1f} сек, "
+                f"блокируемые ресурсы: {tracking.blockable_bytes / 1024:.0f} KB"
+            )
+        logger.info(f"📊 Экономия блокировки: {self.stats()}")
+
+    def stats(self) -> Dict:
+        """Средняя экономия байт и времени на страницу"""
+        def avg(values):
+            return sum(values) / len(values) if values else 0.0
+
+        blocked_avg = avg(self._render_times[True])
+        full_avg = avg(self._render_times[False])
+        result = {'blocked_requests': self.blocked_requests}
+        if self.measure:
+            result.update({
+                'avg_render_blocked_sec': round(blocked_avg, 2),
+                'avg_render_full_sec': round(full_avg, 2),
+                'avg_time_saved_sec': round(full_avg - blocked_avg, 2) if self._render_times[False] else None,
+                'avg_bytes_saved_kb': round(avg(self._blockable_bytes) / 1024),
+            })
+        return result
+
+
+class BrowserPool:
+    """Пул долгоживущих браузеров Playwright
+
+    Все методы пула должны вызываться из event loop BrowserService -
+    Playwright объекты привязаны к loop, в котором созданы.
+    """
+
+    def __init__(
+        self,
+        size: int = None,
+        max_uses: int = None,
+        user_agent: str = None
+    ):
+        """Инициализация пула
+
+        Args:
+            size: Максимальное количество браузеров
+            max_uses: Количество использований до перезапуска браузера
+            user_agent: User Agent для контекстов
+        """
+        self.size = size or config.BROWSER_POOL_SIZE
+        self.max_uses = max_uses or config.BROWSER_MAX_USES
+        self.user_agent = user_agent or config.PLAYWRIGHT_USER_AGENT
+
+        # Блокировка лишних ресурсов для каждой выдаваемой страницы
+        self.blocker = ResourceBlocker() if config.PLAYWRIGHT_BLOCK_RESOURCES else None
+
+        self._playwright = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._created = 0
+        # Будит ожидающих _checkout: браузер вернулся в пул или освободился слот
+        self._available: Optional[asyncio.Condition] = None
+
+        # Время ожидания свободного браузера (последние 100 выдач)
+        self.checkout_waits = deque(maxlen=100)
+
+        self.stats = {
+            'launched': 0,
+            'recycled': 0,
+            'crashed': 0,
+            'checkouts': 0,
+        }
+
+    async def _start(self):
+        """Запускает Playwright драйвер"""
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._available = asyncio.Condition()
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+    async def _launch(self) -> PooledBrowser:
+        """Запускает новый браузер с контекстом"""
+        start = time.time()
+        browser = await self._playwright.chromium.launch(headless=True)
+        try:
+            context = await browser.new_context(user_agent=self.user_agent)
+        except BaseException:
+            # Ошибка или отмена по таймауту BrowserService - процесс не должен остаться висеть
+            try:
+                await browser.close()
+            except Exception:
+                pass
+            raise
+        self.stats['launched'] += 1
+        logger.info(f"🌐 Запущен браузер пула за {time.time() - start:.1f} сек ({self._created}/{self.size})")
+        return PooledBrowser(browser, context)
+
+    async def _new_browser(self) -> PooledBrowser:
+        """Резервирует слот и запускает браузер в нём"""
+        self._created += 1
+        try:
+            return await self._launch()
+        except BaseException:
+            # CancelledError (таймаут call/run_async) тоже освобождает слот -
+            # иначе после size отмен _checkout ждёт вечно
+            await self._release_slot()
+            raise
+
+    async def _release_slot(self):
+        """Освобождает слот закрытого браузера и будит ожидающего"""
+        self._created -= 1
+        async with self._available:
+            self._available.notify()
+
+    async def _checkout(self) -> PooledBrowser:
+        """Берёт свободный браузер из пула или запускает новый"""
+        await self._start()
+        wait_start = time.time()
+
+        # Ждём, пока браузер вернётся в пул или освободится слот под новый
+        # (перезапущенный/упавший браузер закрывается в _checkin без замены)
+        async with self._available:
+            while self._idle.empty() and self._created >= self.size:
+                await self._available.wait()
+            pooled = None if self._idle.empty() else self._idle.get_nowait()
+
+        if pooled is None:
+            pooled = await self._new_browser()
+
+        if not pooled.is_healthy():
+            logger.warning("⚠️ Браузер пула упал, перезапускаем")
+            self.stats['crashed'] += 1
+            await pooled.close()
+            self._created -= 1
+            pooled = await self._new_browser()
+
+        self.stats['checkouts'] += 1
+        self.checkout_waits.append(time.time() - wait_start)
+        return pooled
+
+    async def _checkin(self, pooled: PooledBrowser):
+        """Возвращает браузер в пул или перезапускает его"""
+        pooled.uses += 1
+
+        if not pooled.is_healthy():
+            logger.warning("⚠️ Браузер пула упал во время работы")
+            self.stats['crashed'] += 1
+        elif pooled.uses >= self.max_uses:
+            logger.info(f"♻️ Браузер пула отработал {pooled.uses} раз, перезапускаем")
+            self.stats['recycled'] += 1
+        else:
+            try:
+                await pooled.context.clear_cookies()
+                async with self._available:
+                    self._idle.put_nowait(pooled)
+                    self._available.notify()
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось очистить контекст браузера: {e}")
+                self.stats['crashed'] += 1
+
+        await pooled.close()
+        await self._release_slot()
+
+    @asynccontextmanager
+    async def page(
+        self,
+        document_url: str = None,
+        document_body: bytes = None,
+        document_content_type: str = 'text/html; charset=utf-8'
+    ):
+        """Выдаёт новую вкладку в браузере из пула (закрывается автоматически)
+
+        Args:
+            document_url: URL страницы, HTML которой уже скачан
+            document_body: Скачанный HTML - запрос document_url будет обслужен из памяти
+            document_content_type: Content-Type для отдачи HTML
+        """
+        pooled = await self._checkout()
+        page = None
+        tracking = None
+        try:
+            page = await pooled.context.new_page()
+            if self.blocker:
+                tracking = await self.blocker.install(page)
+            if document_url and document_body is not None:
+                await self._serve_document(page, document_url, document_body, document_content_type)
+            yield page
+        finally:
+            if tracking:
+                self.blocker.finish(tracking)
+            if page:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            await self._checkin(pooled)
+
+    async def _serve_document(self, page, url: str, body: bytes, content_type: str):
+        """Перехватывает запрос основного документа и отдаёт HTML из памяти"""
+        target = url.split('#')[0]
+
+        async def fulfill_document(route):
+            await route.fulfill(
+                status=200,
+                headers={'Content-Type': content_type},
+                body=body
+            )
+
+        # Зарегистрирован после блокировщика - Playwright проверяет его первым
+        await page.route(lambda request_url: request_url.split('#')[0] == target, fulfill_document)
+
+    @property
+    def busy_count(self) -> int:
+        """Количество браузеров, выданных в работу"""
+        idle = self._idle.qsize() if self._idle is not None else 0
+        return self._created - idle
+
+    async def warm_up(self):
+        """Запускает все браузеры пула заранее"""
+        await self._start()
+        while self._created < self.size:
+            self._idle.put_nowait(await self._new_browser())
+
+    async def close(self):
+        """Закрывает все браузеры и Playwright"""
+        if self._idle is not None:
+            while not self._idle.empty():
+                await self._idle.get_nowait().close()
+        self._created = 0
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class BrowserService:
+    """Долгоживущий поток с event loop, в котором работает пул браузеров
+
+    Любой код (синхронный или из другого event loop) отправляет корутины
+    через submit()/call()/run_async(). Параллельные парсы делят один поток
+    и один пул, не создавая потоки и event loop на каждый запрос.
+    """
+
+    def __init__(self, pool: BrowserPool = None):
+        """Инициализация сервиса
+
+        Args:
+            pool: Пул браузеров (по умолчанию создаётся из config)
+        """
+        self.pool = pool or BrowserPool()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        # Метрики вызовов
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._durations = deque(maxlen=100)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Запускает фоновый поток с event loop (один раз)"""
+        with self._thread_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="browser-service",
+                    daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    async def _timed(self, coro_fn, args: tuple):
+        """Выполняет корутину и собирает метрики (работает в loop сервиса)"""
+        start = time.time()
+        try:
+            result = await coro_fn(*args)
+            self._completed += 1
+            return result
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            self._durations.append(time.time() - start)
+
+    def _call_done(self, future: concurrent.futures.Future):
+        """Снимает вызов из in_flight (в том числе отменённый до старта _timed)"""
+        with self._thread_lock:
+            self._in_flight -= 1
+
+    def submit(self, coro_fn, *args) -> concurrent.futures.Future:
+        """Отправляет coro_fn(*args) в поток сервиса
+
+        Args:
+            coro_fn: Async функция (получает браузер через service.pool.page())
+            *args: Аргументы функции
+
+        Returns:
+            concurrent.futures.Future с результатом
+        """
+        loop = self._ensure_loop()
+        with self._thread_lock:
+            self._in_flight += 1
+        future = asyncio.run_coroutine_threadsafe(self._timed(coro_fn, args), loop)
+        future.add_done_callback(self._call_done)
+        return future
+
+    def call(self, coro_fn, *args, timeout: float = None):
+        """Синхронно выполняет coro_fn(*args) и ждёт результат
+
+        Args:
+            coro_fn: Async функция
+            *args: Аргументы функции
+            timeout: Таймаут ожидания результата в секундах
+
+        Returns:
+            Результат корутины
+        """
+        future = self.submit(coro_fn, *args)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro_fn, *args, timeout: float = None):
+        """Выполняет coro_fn(*args) в потоке сервиса и ждёт из текущего event loop
+
+        Args:
+            coro_fn: Async функция
+            *args: Аргументы функции
+            timeout: Таймаут ожидания результата в секундах
+
+        Returns:
+            Результат корутины
+        """
+        future = self.submit(coro_fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict:
+        """Метрики сервиса: глубина очереди и время вызовов"""
+        durations = sorted(self._durations)
+        waits = list(self.pool.checkout_waits)
+        return {
+            'in_flight': self._in_flight,
+            'queue_depth': max(0, self._in_flight - self.pool.busy_count),
+            'completed': self._completed,
+            'failed': self._failed,
+            'avg_call_sec': round(sum(durations) / len(durations), 2) if durations else 0.0,
+            'p95_call_sec': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 2) if durations else 0.0,
+            'avg_browser_wait_sec': round(sum(waits) / len(waits), 2) if waits else 0.0,
+            **self.pool.stats,
+            **(self.pool.blocker.stats() if self.pool.blocker else {}),
+        }
+
+    def warm_up(self):
+        """Синхронный прогрев пула (вызывается при старте бота)"""
+        start = time.time()
+        self.call(self.pool.warm_up, timeout=60 * self.pool.size)
+        logger.info(f"🔥 Пул браузеров прогрет: {self.pool.size} шт. за {time.time() - start:.1f} сек")
+
+    def close(self):
+        """Закрывает пул и останавливает поток сервиса"""
+        if self._loop is None:
+            return
+        try:
+            self.call(self.pool.close, timeout=30)
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка закрытия пула браузеров: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
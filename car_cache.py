@@ -0,0 +1,142 @@
+"""
+Кэш результатов parse_car_data на диске (SQLite)
+Ключ - нормализованный номер объявления BeForward, поэтому ссылки,
+отличающиеся query string, www. или tp_country_id, попадают в одну запись
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_stock_key(url: str) -> str:
+    """Строит стабильный ключ объявления из ссылки BeForward
+
+    https://www.beforward.jp/toyota/vitz/bh873012/id/4512345/?tp_country_id=88
+    и beforward.jp/toyota/vitz/bh873012/id/4512345 дают один ключ "id:4512345"
+
+    Args:
+        url: Ссылка на объявление в любом варианте
+
+    Returns:
+        Ключ объявления
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    parsed = urlparse(url)
+    host = parsed.netloc.lower().split(':')[0]
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parsed.path.lower().rstrip('/')
+
+    # /id/4512345 - внутренний ID объявления
+    match = re.search(r'/id/(\d+)', path)
+    if match:
+        return f"id:{match.group(1)}"
+
+    # Stock reference (BH873012, CB123456...)
+    match = re.search(r'/([a-z]{2}\d{5,})(?:/|$)', path)
+    if match:
+        return f"ref:{match.group(1).upper()}"
+
+    return f"{host}{path}"
+
+
+def price_ttl(price: Optional[str]) -> float:
+    """Сколько цена считается свежей
+
+    ASK или отсутствующая цена живут недолго: цена может появиться
+    на странице в любой момент, и её нужно подхватить.
+    """
+    if not price or price == 'ASK':
+        return config.CAR_CACHE_NO_PRICE_TTL
+    return config.CAR_CACHE_PRICE_TTL
+
+
+class CarDataCache:
+    """SQLite кэш данных автомобиля
+
+    Название, характеристики и ссылки на фото хранятся долго, цена -
+    отдельно со своим временем обновления (она меняется чаще).
+    """
+
+    def __init__(self, path: str = None):
+        """Инициализация кэша
+
+        Args:
+            path: Путь к файлу SQLite (по умолчанию config.CAR_CACHE_PATH)
+        """
+        self.path = path or config.CAR_CACHE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Кэш используется из потоков executor - одно соединение под блокировкой
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS car_data (
+                stock_key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                data_at REAL NOT NULL,
+                price TEXT,
+                price_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+        self.stats = {'hit': 0, 'stale_price': 0, 'miss': 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Возвращает запись кэша
+
+        Returns:
+            {'data': dict, 'data_age': сек, 'price': str, 'price_age': сек} или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, data_at, price, price_at FROM car_data WHERE stock_key = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        data, data_at, price, price_at = row
+        now = time.time()
+        return {
+            'data': json.loads(data),
+            'data_age': now - data_at,
+            'price': price,
+            'price_age': now - price_at if price_at else float('inf'),
+        }
+
+    def put(self, key: str, car_data: Dict):
+        """Сохраняет результат парсинга (данные и цену)"""
+        data = {k: v for k, v in car_data.items() if k not in ('lusaka_price', 'url')}
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO car_data (stock_key, data, data_at, price, price_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(data, ensure_ascii=False), now, car_data.get('lusaka_price'), now)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Закрывает соединение с базой"""
+        with self._lock:
+            self._conn.close()
@@ -30,6 +30,11 @@ IOPAINT_URL = os.getenv('IOPAINT_HOST', 'http://127.0.0.1:8080')
 IOPAINT_INPAINT_ENDPOINT = "/api/v1/inpaint"
 IOPAINT_UPSCALE_ENDPOINT = "/api/v1/run_plugin_gen_image"
 IOPAINT_CONFIG_ENDPOINT = "/api/v1/server-config"
+IOPAINT_MODEL_ENDPOINT = "/api/v1/model"
+
+# Модели по умолчанию (если сервер не сообщил свои) - входят в ключ кэша фото
+IOPAINT_MODEL = os.getenv('IOPAINT_MODEL', 'lama')
+IOPAINT_REALESRGAN_MODEL = os.getenv('IOPAINT_REALESRGAN_MODEL', 'realesr-general-x4v3')
 
 # IOPaint device (cuda/cpu) - автоматически определяется в handler.py
 IOPAINT_DEVICE = os.getenv('IOPAINT_DEVICE', 'cuda')
@@ -56,6 +61,20 @@ UPSCALE_FACTOR = 2
 WATERMARK_WIDTH = 300
 WATERMARK_HEIGHT = 30
 
+# Inpainting водяного знака: crop - в IOPaint уходит только область вокруг знака
+# с запасом контекста INPAINT_CROP_PADDING пикселей, full - всё фото
+INPAINT_MODE = os.getenv('INPAINT_MODE', 'crop')
+INPAINT_CROP_PADDING = int(os.getenv('INPAINT_CROP_PADDING', '128'))
+
+# Формат фото и маски в запросах к IOPaint (см. image_codec.py):
+# фото - png, webp (без потерь) или jpeg (исходный JPEG без перекодирования),
+# маска - png (8 бит) или png1 (1 бит)
+TRANSPORT_IMAGE_CODEC = os.getenv('TRANSPORT_IMAGE_CODEC', 'png')
+TRANSPORT_MASK_CODEC = os.getenv('TRANSPORT_MASK_CODEC', 'png1')
+
+# Сколько масок (размер фото + геометрия знака) держать готовыми в памяти
+MASK_CACHE_SIZE = int(os.getenv('MASK_CACHE_SIZE', '32'))
+
 # Поддерживаемые форматы изображений
 SUPPORTED_IMAGE_EXTENSIONS = ['*.jpg', '*.jpeg', '*.png', '*.JPG', '*.JPEG', '*.PNG']
 
@@ -72,6 +91,54 @@ ZAMBIA_COUNTRY_ID = 88
 # User Agent для запросов
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 
+# HTML парсер для экстракторов: bs4, bs4-lxml, lxml, selectolax
+# (при отсутствии библиотеки используется bs4)
+HTML_PARSER_BACKEND = os.getenv('HTML_PARSER_BACKEND', 'bs4')
+
+# Частичный парсинг (только нужные блоки страницы по id) - для bs4 бэкендов
+HTML_PARTIAL_PARSE = os.getenv('HTML_PARTIAL_PARSE', '0') == '1'
+
+# Кэш результатов парсинга (SQLite) - повторные ссылки на ту же машину не парсятся заново
+CAR_CACHE_ENABLED = os.getenv('CAR_CACHE_ENABLED', '1') == '1'
+CAR_CACHE_PATH = os.getenv('CAR_CACHE_PATH', 'cache/car_data.sqlite3')
+CAR_CACHE_DATA_TTL = 7 * 24 * 3600  # секунд (название, характеристики, фото)
+CAR_CACHE_PRICE_TTL = 30 * 60  # секунд (цена считается свежей)
+CAR_CACHE_NO_PRICE_TTL = 5 * 60  # секунд (ASK или цены нет - проверяем снова чаще)
+CAR_CACHE_PRICE_STALE_TTL = 24 * 3600  # секунд (устаревшая цена отдаётся, пока обновляется в фоне)
+
+# HTTP кэш страниц и ZIP архивов с условной ревалидацией (ETag / Last-Modified)
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', '1') == '1'
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', 'cache/http')
+HTTP_CACHE_MAX_MB = int(os.getenv('HTTP_CACHE_MAX_MB', '2048'))
+
+# Кэш обработанных фото по хэшу содержимого - повторные фото не идут в LaMa/RealESRGAN
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', '1') == '1'
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', 'cache/results')
+RESULT_CACHE_MAX_MB = int(os.getenv('RESULT_CACHE_MAX_MB', '1024'))
+
+# Скачивание из ZIP с фото только выбранных файлов через HTTP Range
+# (если сервер не поддерживает Range - архив качается целиком).
+# Range и HTTP кэш архивов взаимоисключающие: частичные ответы в кэш не пишутся,
+# поэтому при HTTP_CACHE_ENABLED архив качается целиком один раз и дальше
+# ревалидируется через 304, а Range используется только без HTTP кэша
+PHOTO_RANGE_DOWNLOAD = os.getenv('PHOTO_RANGE_DOWNLOAD', '1') == '1'
+PHOTO_RANGE_TAIL_BYTES = 256 * 1024  # хвост архива с центральным каталогом
+PHOTO_RANGE_WORKERS = 4  # параллельных Range запросов
+
+# Потоковое скачивание архива: до лимита в памяти, дальше во временный файл
+PHOTO_DOWNLOAD_MEMORY_MB = int(os.getenv('PHOTO_DOWNLOAD_MEMORY_MB', '32'))
+PHOTO_DOWNLOAD_CHUNK_KB = 256
+
+# Параллельное скачивание фото из слайдера (вторая версия страницы)
+PHOTO_FETCH_CONCURRENCY = 8  # одновременных запросов всего
+PHOTO_FETCH_PER_HOST = 4  # одновременных запросов к одному хосту
+PHOTO_FETCH_RETRIES = 2  # повторов при ошибке
+PHOTO_FETCH_TIMEOUT = 30  # секунд на одно фото
+
+# Пул соединений async HTTP клиента (parse_car_data_async)
+ASYNC_HTTP_POOL_SIZE = 20
+ASYNC_HTTP_POOL_SIZE_PER_HOST = 10
+
 # Таймауты для HTTP запросов
 REQUEST_TIMEOUT = 10  # секунд
 PHOTO_DOWNLOAD_TIMEOUT = 120  # секунд (ZIP с фото может быть большой)
@@ -79,6 +146,47 @@ INPAINT_TIMEOUT = 120  # секунд
 UPSCALE_TIMEOUT = 180  # секунд
 
 
+# ============================================================================
+# PLAYWRIGHT SETTINGS
+# ============================================================================
+# User Agent для Chromium (полный, чтобы BeForward не блокировал)
+PLAYWRIGHT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Количество постоянно запущенных браузеров в пуле
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '2'))
+
+# Браузер перезапускается после N использований (защита от утечек памяти Chromium)
+BROWSER_MAX_USES = int(os.getenv('BROWSER_MAX_USES', '50'))
+
+# Запускать браузеры при старте бота, а не при первом запросе
+BROWSER_POOL_WARMUP = os.getenv('BROWSER_POOL_WARMUP', '1') == '1'
+
+# Таймаут получения цены через Playwright
+PLAYWRIGHT_PRICE_TIMEOUT = 30  # секунд
+
+# Сколько ждать, пока JS заменит "ASK" в #selected_total_price на цену
+PLAYWRIGHT_PRICE_READY_TIMEOUT = 5  # секунд
+
+# Отдавать браузеру уже скачанный HTML страницы (без повторной загрузки с сервера)
+PLAYWRIGHT_REUSE_HTML = os.getenv('PLAYWRIGHT_REUSE_HTML', '1') == '1'
+
+# Блокировка ресурсов страницы, не нужных для цены (картинки, шрифты, аналитика)
+PLAYWRIGHT_BLOCK_RESOURCES = os.getenv('PLAYWRIGHT_BLOCK_RESOURCES', '1') == '1'
+PLAYWRIGHT_BLOCKED_RESOURCE_TYPES = os.getenv(
+    'PLAYWRIGHT_BLOCKED_RESOURCE_TYPES',
+    'image,media,font,stylesheet'
+).split(',')
+# Подстроки URL (скрипты аналитики, рекламы, чатов)
+PLAYWRIGHT_BLOCKED_URL_PATTERNS = os.getenv(
+    'PLAYWRIGHT_BLOCKED_URL_PATTERNS',
+    'google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,'
+    'connect.facebook,hotjar.com,clarity.ms,criteo,yandex.ru/metrika,livechatinc.com'
+).split(',')
+
+# Режим замера: блокировка включается через страницу, в логах видна экономия байт и времени
+PLAYWRIGHT_BLOCKING_MEASURE = os.getenv('PLAYWRIGHT_BLOCKING_MEASURE', '0') == '1'
+
+
 # ============================================================================
 # OPENAI PROMPT SETTINGS
 # ============================================================================
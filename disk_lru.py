@@ -0,0 +1,105 @@
+"""
+LRU учёт файлов дискового кэша с лимитом по размеру
+Директория сканируется один раз при создании кэша; дальше суммарный размер
+и порядок использования ведутся в памяти - промах кэша не стоит listdir
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLru:
+    """Записи кэш-директории в порядке последнего использования
+
+    Время использования дублируется в mtime файла, чтобы порядок
+    восстанавливался после перезапуска.
+    """
+
+    def __init__(self, directory: str, suffix: str, max_bytes: int,
+                 companions: Iterable[str] = (), label: str = 'Кэш'):
+        """Инициализация и начальное сканирование директории
+
+        Args:
+            directory: Директория кэша
+            suffix: Расширение файлов записей (например '.body')
+            max_bytes: Лимит суммарного размера записей
+            companions: Расширения сопутствующих файлов, удаляемых вместе с записью
+            label: Название кэша для логов
+        """
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.companions = tuple(companions)
+        self.label = label
+
+        # Реентерабельный - владелец кэша может открыть файл под тем же замком
+        self.lock = threading.RLock()
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self.total = 0
+        self._scan()
+
+    def _scan(self):
+        """Заполняет учёт из файлов на диске (самые старые по mtime - первыми)"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(self.suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            found.append((stat.st_mtime, entry.path, stat.st_size))
+
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self.total += size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def touch(self, path: str):
+        """Отмечает использование записи"""
+        with self.lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def add(self, path: str, size: int):
+        """Учитывает новую или перезаписанную запись и вытесняет старые"""
+        with self.lock:
+            self.total -= self._entries.pop(path, 0)
+            self._entries[path] = size
+            self.total += size
+            self.evict()
+
+    def evict(self):
+        """Удаляет давно не использованные записи сверх лимита размера"""
+        with self.lock:
+            for path, size in list(self._entries.items()):
+                if self.total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    # Windows не удаляет открытый файл (тело выдано CachedResponse) - пропускаем
+                    logger.warning(f"⚠️ {self.label}: запись {os.path.basename(path)} занята ({e})")
+                    continue
+
+                del self._entries[path]
+                self.total -= size
+                base = path[:-len(self.suffix)]
+                for file_path in tuple(base + ext for ext in self.companions):
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        pass
+                logger.info(f"🗑️ {self.label}: удалена запись {os.path.basename(path)} ({size / 1024:.0f} KB)")
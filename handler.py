@@ -1,21 +1,31 @@
 """
 RunPod Serverless Worker - только обработка фото
-Принимает список base64 фото → очищает через IOPaint → возвращает ZIP
+Принимает список base64 фото или источники (ZIP / ссылки на фото) → очищает через IOPaint → возвращает ZIP
 """
 import asyncio
 import base64
-import glob
 import io
 import logging
 import os
 import subprocess
 import tempfile
+import threading
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
+import aiohttp
 import requests
 import runpod
-from PIL import Image, ImageDraw
+from PIL import Image
+
+from photo_archive import download_archive, read_selected_photos, read_selected_photos_ranged, select_photos_smart
+from image_codec import encode_image, encode_mask, to_base64
+from inpaint_engine import LOCAL_ENGINE_AVAILABLE, LocalInpaintEngine, detect_device
+from photo_fetcher import PhotoFetcher
+from result_cache import PhotoResultCache
+from watermark import apply_watermark, encoded_watermark_mask, inpaint_watermark, mask_cache_info, prepare_watermark
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,90 +40,192 @@ IOPAINT_INPAINT_ENDPOINT = "/api/v1/inpaint"
 IOPAINT_UPSCALE_ENDPOINT = "/api/v1/run_plugin_gen_image"
 WATERMARK_WIDTH = 300
 WATERMARK_HEIGHT = 30
+# local - LaMa/RealESRGAN в процессе воркера, http - через сервер `iopaint start`
+INPAINT_ENGINE = os.getenv('INPAINT_ENGINE', 'local')
+INPAINT_MODEL = os.getenv('INPAINT_MODEL', 'lama')
+REALESRGAN_MODEL = os.getenv('REALESRGAN_MODEL', 'realesr-general-x4v3')
+INPAINT_MODE = os.getenv('INPAINT_MODE', 'crop')  # crop - только область вокруг знака, full - всё фото
+INPAINT_CROP_PADDING = int(os.getenv('INPAINT_CROP_PADDING', '128'))
+# Пачки для модели в процессе: до N фото одного размера, не больше M мегапикселей
+INPAINT_BATCH_SIZE = int(os.getenv('INPAINT_BATCH_SIZE', '8'))  # 1 - без пачек
+INPAINT_BATCH_MAX_MPIX = float(os.getenv('INPAINT_BATCH_MAX_MPIX', '16'))
+# Конвейер обработки: декодирование/JPEG в потоках, к модели не больше N запросов сразу
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '4'))
+MODEL_MAX_INFLIGHT = int(os.getenv('MODEL_MAX_INFLIGHT', '2'))
+# Формат фото и маски в запросах к IOPaint: png / webp / jpeg (исходный файл), png / png1
+TRANSPORT_IMAGE_CODEC = os.getenv('TRANSPORT_IMAGE_CODEC', 'png')
+TRANSPORT_MASK_CODEC = os.getenv('TRANSPORT_MASK_CODEC', 'png1')
 INPAINT_TIMEOUT = 120
+IOPAINT_START_TIMEOUT = int(os.getenv('IOPAINT_START_TIMEOUT', '180'))  # ожидание готовности IOPaint
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', '1') == '1'  # пробный inference при старте воркера
 UPSCALE_TIMEOUT = 180
 UPSCALE_FACTOR = 2
 MIN_RESOLUTION_WIDTH = 1920
 MIN_RESOLUTION_HEIGHT = 1080
+# Кэш готовых фото по хэшу содержимого (на network volume переживает перезапуск воркера)
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', '1') == '1'
+RESULT_CACHE_DIR = os.getenv(
+    'RESULT_CACHE_DIR',
+    '/runpod-volume/photo_cache' if os.path.isdir('/runpod-volume') else 'cache/results'
+)
+RESULT_CACHE_MAX_MB = int(os.getenv('RESULT_CACHE_MAX_MB', '4096'))
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+PHOTO_DOWNLOAD_TIMEOUT = 120
 
 iopaint_process = None
+engine = None  # LocalInpaintEngine (если INPAINT_ENGINE=local и модели загрузились)
+cold_start = {}  # фазы холодного старта воркера (сек) - отдаются в выводе задачи
+result_cache = PhotoResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB * 1024 * 1024) if RESULT_CACHE_ENABLED else None
+
+# Всё, что влияет на результат обработки фото, - часть ключа кэша
+# (движок известен только после start_engine - см. result_params())
+RESULT_PARAMS = {
+    'watermark': [WATERMARK_WIDTH, WATERMARK_HEIGHT],
+    'mode': INPAINT_MODE,
+    'padding': INPAINT_CROP_PADDING,
+    'model': INPAINT_MODEL,
+    'upscaler': REALESRGAN_MODEL,
+    'upscale': UPSCALE_FACTOR,
+    'min_resolution': [MIN_RESOLUTION_WIDTH, MIN_RESOLUTION_HEIGHT],
+    'format': 'jpeg95',
+    'transport': TRANSPORT_IMAGE_CODEC,  # IOPaint отвечает webp/jpeg с потерями
+}
+
+
+def result_params() -> dict:
+    """Параметры ключа кэша фото с фактическим движком (local или iopaint)
+
+    INPAINT_ENGINE=local может откатиться на IOPaint HTTP, если модели
+    не загрузились, - результаты движков отличаются, ключи тоже.
+    """
+    return dict(RESULT_PARAMS, engine='local' if engine else 'iopaint')
 
 
-def create_watermark_mask(img_width: int, img_height: int) -> Image.Image:
-    """Создает маску для удаления водяного знака BeForward (внизу по центру)"""
-    mask = Image.new('L', (img_width, img_height), 0)
-    draw = ImageDraw.Draw(mask)
-
-    x1 = (img_width - WATERMARK_WIDTH) // 2
-    y1 = img_height - WATERMARK_HEIGHT
-    x2 = x1 + WATERMARK_WIDTH
-    y2 = img_height
-
-    draw.rectangle([x1, y1, x2, y2], fill=255)
-    return mask
-
+def image_to_base64(img: Image.Image, source: bytes = None) -> str:
+    """Конвертирует изображение в base64 (формат TRANSPORT_IMAGE_CODEC)"""
+    return to_base64(encode_image(img, TRANSPORT_IMAGE_CODEC, source))
 
-def image_to_base64(img: Image.Image) -> str:
-    """Конвертирует изображение в base64"""
-    buffer = io.BytesIO()
-    if img.mode == 'RGBA':
-        img = img.convert('RGB')
-    img.save(buffer, format='PNG')
-    return base64.b64encode(buffer.getvalue()).decode('utf-8')
 
+def inpaint_request(
+    img: Image.Image,
+    mask: Image.Image,
+    source: bytes = None,
+    mask_base64: str = None
+) -> Optional[Image.Image]:
+    """Отправляет изображение и маску в IOPaint, None при ошибке
 
-def remove_watermark(img: Image.Image) -> Image.Image:
-    """Удаляет водяной знак с изображения через IOPaint"""
+    source - исходный файл, если img - это он без изменений (передача JPEG как есть),
+    mask_base64 - уже закодированная маска из кэша масок
+    """
+    # Конвертируем изображение и маску в base64
+    img_base64 = image_to_base64(img, source)
+    mask_base64 = mask_base64 or to_base64(encode_mask(mask, TRANSPORT_MASK_CODEC))
+
+    # Отправляем в IOPaint
+    payload = {
+        'image': img_base64,
+        'mask': mask_base64,
+        'ldmSampler': 'plms',
+        'hdStrategy': 'Original',
+    }
+
+    response = requests.post(
+        f"{IOPAINT_URL}{IOPAINT_INPAINT_ENDPOINT}",
+        json=payload,
+        timeout=INPAINT_TIMEOUT
+    )
+
+    if response.status_code != 200:
+        logger.error(f"❌ Ошибка IOPaint: HTTP {response.status_code}")
+        logger.error(f"Response body: {response.text}")
+        logger.error(f"Request payload keys: image_len={len(img_base64)}, mask_len={len(mask_base64)}")
+        return None
+
+    # IOPaint API возвращает изображение напрямую в виде байтов
+    result_bytes = response.content
+    logger.info(f"✅ Получено {len(result_bytes)} байт от IOPaint ({img.size[0]}x{img.size[1]})")
+
+    return Image.open(io.BytesIO(result_bytes))
+
+
+def remove_watermark(img: Image.Image, source: bytes = None) -> Image.Image:
+    """Удаляет водяной знак с изображения через IOPaint
+
+    В режиме INPAINT_MODE=crop в IOPaint уходит только область вокруг знака,
+    в режиме full - всё фото (исходный файл source, если формат передачи jpeg)
+    """
     try:
-        img_width, img_height = img.size
+        if not engine:
+            # Маски одного размера фото кодируются один раз (LRU кэш)
+            mask_base64 = encoded_watermark_mask(
+                img.size[0], img.size[1], TRANSPORT_MASK_CODEC,
+                INPAINT_MODE, INPAINT_CROP_PADDING, WATERMARK_WIDTH, WATERMARK_HEIGHT
+            )
+
+        cleaned = inpaint_watermark(
+            img,
+            engine.inpaint if engine else (
+                lambda image, mask: inpaint_request(image, mask, source if image is img else None, mask_base64)
+            ),
+            mode=INPAINT_MODE,
+            padding=INPAINT_CROP_PADDING,
+            width=WATERMARK_WIDTH,
+            height=WATERMARK_HEIGHT
+        )
+        return cleaned if cleaned is not None else img  # Возвращаем оригинал при ошибке
 
-        # Конвертируем изображение и маску в base64
-        img_base64 = image_to_base64(img)
-        mask = create_watermark_mask(img_width, img_height)
-        mask_base64 = image_to_base64(mask)
+    except Exception as e:
+        logger.error(f"❌ Ошибка удаления watermark: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return img  # Возвращаем оригинал при ошибке
 
-        # Отправляем в IOPaint
-        payload = {
-            'image': img_base64,
-            'mask': mask_base64,
-            'ldmSampler': 'plms',
-            'hdStrategy': 'Original',
-        }
 
-        response = requests.post(
-            f"{IOPAINT_URL}{IOPAINT_INPAINT_ENDPOINT}",
-            json=payload,
-            timeout=INPAINT_TIMEOUT
-        )
+def remove_watermark_batch(images: list) -> list:
+    """Удаляет водяные знаки со всех фото задачи пачками (модель в процессе)
 
-        if response.status_code != 200:
-            logger.error(f"❌ Ошибка IOPaint: HTTP {response.status_code}")
-            logger.error(f"Response body: {response.text}")
-            logger.error(f"Request payload keys: image_len={len(img_base64)}, mask_len={len(mask_base64)}")
-            return img  # Возвращаем оригинал при ошибке
+    Args:
+        images: Список PIL изображений
 
-        # IOPaint API возвращает изображение напрямую в виде байтов
-        result_bytes = response.content
-        logger.info(f"✅ Получено {len(result_bytes)} байт от IOPaint")
+    Returns:
+        Очищенные изображения в том же порядке (оригинал при ошибке)
+    """
+    try:
+        prepared = [
+            prepare_watermark(img, INPAINT_MODE, INPAINT_CROP_PADDING, WATERMARK_WIDTH, WATERMARK_HEIGHT)
+            for img in images
+        ]
+        results = engine.inpaint_batch(
+            [(model_input, mask) for _, model_input, mask in prepared],
+            max_batch=INPAINT_BATCH_SIZE,
+            max_megapixels=INPAINT_BATCH_MAX_MPIX
+        )
 
-        return Image.open(io.BytesIO(result_bytes))
+        cleaned = []
+        for img, (region, _, mask), result in zip(images, prepared, results):
+            cleaned_img = apply_watermark(img, region, mask, result)
+            cleaned.append(cleaned_img if cleaned_img is not None else img)
+        return cleaned
 
     except Exception as e:
-        logger.error(f"❌ Ошибка удаления watermark: {e}")
+        logger.error(f"❌ Ошибка пакетного удаления watermark: {e}, обрабатываем по одному")
         import traceback
         logger.error(traceback.format_exc())
-        return img  # Возвращаем оригинал при ошибке
+        return [remove_watermark(img) for img in images]
 
 
 def upscale_image(img: Image.Image) -> Image.Image:
     """Увеличивает разрешение изображения через RealESRGAN"""
     try:
+        if engine:
+            return engine.upscale(img)
+
         img_base64 = image_to_base64(img)
 
         payload = {
             'name': 'RealESRGAN',
             'image': img_base64,
-            'model': 'realesr-general-x4v3'
+            'model': REALESRGAN_MODEL
         }
 
         response = requests.post(
@@ -149,94 +261,343 @@ def start_iopaint():
     try:
         logger.info("🎨 Запуск IOPaint сервера...")
 
-        device = "cuda" if os.path.exists("/usr/local/cuda") else "cpu"
+        device = detect_device()
         logger.info(f"🖥️ Используется device: {device}")
 
         iopaint_process = subprocess.Popen([
             "iopaint", "start",
-            "--model=lama",
+            f"--model={INPAINT_MODEL}",
             f"--device={device}",
             "--port=8080",
             "--host=0.0.0.0",
             "--enable-realesrgan",
-            "--realesrgan-model=realesr-general-x4v3"
+            f"--realesrgan-model={REALESRGAN_MODEL}"
         ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
         # Ждем запуска
-        logger.info("⏳ Ожидание запуска IOPaint (10 сек)...")
-        time.sleep(10)
+        logger.info(f"⏳ Ожидание готовности IOPaint (до {IOPAINT_START_TIMEOUT} сек)...")
+        wait_for_iopaint(IOPAINT_START_TIMEOUT)
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка запуска IOPaint: {e}")
+        raise
+
+
+def wait_for_iopaint(timeout: float):
+    """Опрашивает /api/v1/server-config с нарастающей паузой, пока IOPaint не ответит
+
+    Raises:
+        RuntimeError: процесс IOPaint завершился или не ответил за timeout секунд
+    """
+    started = time.time()
+    delay = 0.25
+    attempts = 0
+
+    while True:
+        attempts += 1
+        if iopaint_process is not None and iopaint_process.poll() is not None:
+            raise RuntimeError(f"IOPaint завершился с кодом {iopaint_process.returncode}")
 
-        # Проверяем что сервер запустился
         try:
-            test_response = requests.get(f"{IOPAINT_URL}/api/v1/server-config", timeout=5)
-            if test_response.status_code == 200:
-                logger.info("✅ IOPaint сервер запущен и отвечает")
-                logger.info(f"📋 Конфиг: {test_response.text[:200]}")
-            else:
-                logger.warning(f"⚠️ IOPaint запущен, но вернул статус {test_response.status_code}")
+            response = requests.get(f"{IOPAINT_URL}/api/v1/server-config", timeout=5)
+            if response.status_code == 200:
+                logger.info(f"✅ IOPaint сервер запущен и отвечает ({time.time() - started:.1f} сек, попыток: {attempts})")
+                logger.info(f"📋 Конфиг: {response.text[:200]}")
+                return
+        except requests.RequestException:
+            pass
+
+        if time.time() - started > timeout:
+            raise RuntimeError(f"IOPaint не ответил за {timeout} сек ({attempts} попыток)")
+
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+
+def warm_up():
+    """Пробный inference на заглушке: веса и CUDA ядра загружаются до первой задачи"""
+    dummy = Image.new('RGB', (1024, 768), (128, 128, 128))
+
+    started = time.time()
+    remove_watermark(dummy)
+    cold_start['warmup_inpaint'] = round(time.time() - started, 2)
+
+    # Маленькое фото - upscale не требует много времени, но загружает RealESRGAN
+    started = time.time()
+    upscale_image(dummy.resize((256, 192)))
+    cold_start['warmup_upscale'] = round(time.time() - started, 2)
+
+    logger.info(
+        f"🔥 Прогрев: inpaint {cold_start['warmup_inpaint']} сек, "
+        f"upscale {cold_start['warmup_upscale']} сек"
+    )
+
+
+def start_engine():
+    """Загружает модели в процесс воркера, при неудаче - запускает IOPaint сервер
+
+    Вызывается при старте воркера (до runpod.serverless.start), затем прогрев -
+    первая задача не платит за загрузку моделей. Фазы пишутся в cold_start.
+    """
+    global engine
+
+    boot_started = time.time()
+    started = time.time()
+
+    if INPAINT_ENGINE == 'local' and LOCAL_ENGINE_AVAILABLE:
+        try:
+            logger.info("🎨 Загрузка LaMa и RealESRGAN в процесс воркера...")
+            engine = LocalInpaintEngine(
+                model=INPAINT_MODEL,
+                upscaler_model=REALESRGAN_MODEL,
+                upscale_factor=UPSCALE_FACTOR
+            )
         except Exception as e:
-            logger.error(f"❌ IOPaint не отвечает на запросы: {e}")
+            logger.error(f"❌ Не удалось загрузить модели в процесс: {e}, используем IOPaint HTTP")
+            import traceback
+            logger.error(traceback.format_exc())
+    elif INPAINT_ENGINE == 'local':
+        logger.warning("⚠️ iopaint/torch не импортируются, используем IOPaint HTTP")
+
+    if engine is None:
+        started = time.time()
+        start_iopaint()
+
+    cold_start['engine'] = 'local' if engine else 'iopaint'
+    cold_start['load'] = round(time.time() - started, 2)
+
+    if WARMUP_ENABLED:
+        warm_up()
+
+    cold_start['total'] = round(time.time() - boot_started, 2)
+    logger.info(f"🚀 Воркер готов: {cold_start}")
+
+
+async def _fetch_image_urls(image_urls: list) -> list:
+    """Параллельно скачивает фото по ссылкам (порядок сохраняется)"""
+    async with aiohttp.ClientSession(headers={'User-Agent': USER_AGENT}) as session:
+        results = await PhotoFetcher(session).fetch_all(image_urls)
+    return [content for content in results if content is not None]
+
+
+def load_photo_sources(sources: dict) -> list:
+    """
+    Скачивает и выбирает фото (≤ 20) по источникам из задачи
+
+    Args:
+        sources: {"zip_url": "...", "referer": "..."} или {"image_urls": [...]}
+
+    Returns:
+        Список байтов фото
+    """
+    started = time.time()
+
+    if sources.get("zip_url"):
+        zip_url = sources["zip_url"]
+        headers = {'Referer': sources["referer"]} if sources.get("referer") else None
+        logger.info(f"📥 Скачивание фото из ZIP: {zip_url}")
+
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        try:
+            # Только выбранные фото через Range, иначе архив целиком (потоково)
+            photos = read_selected_photos_ranged(session, zip_url, headers=headers, timeout=PHOTO_DOWNLOAD_TIMEOUT)
+            if photos is None:
+                with download_archive(session, zip_url, headers=headers, timeout=PHOTO_DOWNLOAD_TIMEOUT) as archive:
+                    photos = read_selected_photos(archive)
+        finally:
+            session.close()
+        photo_bytes = [content for _, content in photos]
+
+    elif sources.get("image_urls"):
+        image_urls = select_photos_smart(sources["image_urls"])
+        logger.info(f"📥 Скачивание {len(image_urls)} фото по ссылкам")
+        photo_bytes = asyncio.run(_fetch_image_urls(image_urls))
+
+    else:
+        raise ValueError("sources: нужен zip_url или image_urls")
+
+    logger.info(f"✅ Получено {len(photo_bytes)} фото за {time.time() - started:.1f} сек")
+    return photo_bytes
+
+
+def decode_photo(photo_data) -> Image.Image:
+    """Декодирует фото (base64 строка или байты) в загруженное изображение"""
+    if isinstance(photo_data, str):
+        photo_data = base64.b64decode(photo_data)
+    img = Image.open(io.BytesIO(photo_data))
+    img.load()
+    return img
+
 
+def _decode_or_none(idx: int, photo_data) -> Optional[Image.Image]:
+    try:
+        return decode_photo(photo_data)
     except Exception as e:
-        logger.error(f"❌ Ошибка запуска IOPaint: {e}")
-        raise
+        logger.error(f"❌ Ошибка декодирования фото {idx + 1}: {e}")
+        return None
+
+
+def process_single_photo(
+    idx: int,
+    photo,
+    total: int,
+    temp_dir: str,
+    model_slots: threading.Semaphore,
+    cleaned_img: Image.Image = None,
+    cache_key: str = None
+) -> Optional[str]:
+    """Одно фото: декодирование, удаление знака, upscale, JPEG
+
+    Вызовы модели (IOPaint или в процессе) ограничены model_slots,
+    декодирование и JPEG других фото идут параллельно с ними.
+
+    Args:
+        idx: Номер фото в задаче
+        photo: Изображение или base64/байты
+        total: Всего фото в задаче
+        temp_dir: Папка для результата
+        model_slots: Семафор одновременных вызовов модели
+        cleaned_img: Уже очищенное изображение (пакетный режим)
+        cache_key: Ключ кэша результатов (None - не кэшировать)
+
+    Returns:
+        Путь к сохранённому JPEG или None при ошибке
+    """
+    try:
+        logger.info(f"📥 Обработка фото {idx + 1}/{total}")
+        source = None
+        if isinstance(photo, Image.Image):
+            img = photo
+        else:
+            source = base64.b64decode(photo) if isinstance(photo, str) else photo
+            img = decode_photo(source)
+        img_width, img_height = img.size
+        logger.info(f"📊 Размер изображения: {img.size}")
+
+        if cleaned_img is None:
+            # Удаляем водяной знак через IOPaint
+            logger.info("🧹 Удаление watermark...")
+            with model_slots:
+                cleaned_img = remove_watermark(img, source)
+        # При ошибке возвращается оригинал - такой результат не кэшируем
+        complete = cleaned_img is not img
+
+        # Upscale если разрешение меньше Full HD
+        if img_width * img_height < MIN_RESOLUTION_WIDTH * MIN_RESOLUTION_HEIGHT:
+            logger.info(f"📈 Upscaling {img_width}x{img_height} → {img_width*UPSCALE_FACTOR}x{img_height*UPSCALE_FACTOR}...")
+            with model_slots:
+                upscaled_img = upscale_image(cleaned_img)
+            complete = complete and upscaled_img is not cleaned_img
+            cleaned_img = upscaled_img
+        else:
+            logger.info(f"✓ Upscale не требуется (разрешение {img_width}x{img_height})")
+
+        # Сохраняем очищенное фото
+        buffer = io.BytesIO()
+        cleaned_img.save(buffer, 'JPEG', quality=95)
+        cleaned_path = os.path.join(temp_dir, f"cleaned_{idx:03d}.jpg")
+        with open(cleaned_path, 'wb') as f:
+            f.write(buffer.getvalue())
+
+        if cache_key and complete:
+            result_cache.put(cache_key, buffer.getvalue())
+
+        logger.info(f"✅ Фото {idx + 1} обработано")
+        return cleaned_path
+
+    except Exception as e:
+        logger.error(f"❌ Ошибка обработки фото {idx + 1}: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return None
 
 
 def process_photos(photo_data_list: list) -> bytes:
     """
     Обрабатывает список фото через IOPaint
 
+    Фото идут конвейером в PIPELINE_WORKERS потоках: пока одно ждёт модель,
+    другие декодируются и кодируются в JPEG. Порядок в архиве сохраняется.
+
     Args:
-        photo_data_list: Список base64-encoded фото
+        photo_data_list: Список фото (base64 строки или байты)
 
     Returns:
         bytes: ZIP архив с очищенными фото
     """
-    logger.info(f"🎨 Обработка {len(photo_data_list)} фото...")
+    total = len(photo_data_list)
+    logger.info(f"🎨 Обработка {total} фото...")
 
     temp_dir = tempfile.mkdtemp()
-    cleaned_photos = []
+    model_slots = threading.BoundedSemaphore(max(1, MODEL_MAX_INFLIGHT))
+    started = time.time()
 
     try:
-        for idx, photo_base64 in enumerate(photo_data_list):
-            try:
-                logger.info(f"📥 Обработка фото {idx + 1}/{len(photo_data_list)}")
-
-                # Декодируем base64 в изображение
-                photo_bytes = base64.b64decode(photo_base64)
-                img = Image.open(io.BytesIO(photo_bytes))
-                img_width, img_height = img.size
-                logger.info(f"📊 Размер изображения: {img.size}")
-
-                # Удаляем водяной знак через IOPaint
-                logger.info(f"🧹 Удаление watermark...")
-                cleaned_img = remove_watermark(img)
-
-                # Upscale если разрешение меньше Full HD
-                if img_width * img_height < MIN_RESOLUTION_WIDTH * MIN_RESOLUTION_HEIGHT:
-                    logger.info(f"📈 Upscaling {img_width}x{img_height} → {img_width*UPSCALE_FACTOR}x{img_height*UPSCALE_FACTOR}...")
-                    cleaned_img = upscale_image(cleaned_img)
-                else:
-                    logger.info(f"✓ Upscale не требуется (разрешение {img_width}x{img_height})")
-
-                # Сохраняем очищенное фото
-                cleaned_path = os.path.join(temp_dir, f"cleaned_{idx:03d}.jpg")
-                cleaned_img.save(cleaned_path, 'JPEG', quality=95)
-                cleaned_photos.append(cleaned_path)
-
-                logger.info(f"✅ Фото {idx + 1} обработано")
-
-            except Exception as e:
-                logger.error(f"❌ Ошибка обработки фото {idx + 1}: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                continue
+        photos = list(photo_data_list)
+        keys = [None] * total
+        cached_paths = {}
+
+        # Фото, уже обработанные с теми же параметрами, берём из кэша
+        if result_cache:
+            params = result_params()
+            for idx, photo in enumerate(photos):
+                photo_bytes = base64.b64decode(photo) if isinstance(photo, str) else photo
+                keys[idx] = result_cache.key(photo_bytes, params)
+                cached = result_cache.get(keys[idx])
+                if cached is None:
+                    photos[idx] = photo_bytes
+                    continue
+
+                cached_paths[idx] = os.path.join(temp_dir, f"cleaned_{idx:03d}.jpg")
+                with open(cached_paths[idx], 'wb') as f:
+                    f.write(cached)
+                photos[idx] = None
+
+            logger.info(f"🗄️ Из кэша {len(cached_paths)}/{total} фото (попаданий всего {result_cache.hit_rate:.0%})")
+
+        with ThreadPoolExecutor(max_workers=max(1, PIPELINE_WORKERS)) as pool:
+            batched = [None] * total
+
+            # Модель в процессе обрабатывает все фото задачи пачками
+            if engine and INPAINT_BATCH_SIZE > 1 and len(cached_paths) < total:
+                decoded = list(pool.map(
+                    lambda photo: _decode_or_none(*photo) if photo[1] is not None else None,
+                    enumerate(photos)
+                ))
+                ready = [idx for idx, img in enumerate(decoded) if img is not None]
+
+                logger.info(f"🧹 Удаление watermark пачками (до {INPAINT_BATCH_SIZE} фото)...")
+                for idx, cleaned_img in zip(ready, remove_watermark_batch([decoded[idx] for idx in ready])):
+                    batched[idx] = cleaned_img
+                photos = decoded
+
+            futures = {
+                idx: pool.submit(
+                    process_single_photo, idx, photo, total, temp_dir, model_slots, batched[idx], keys[idx]
+                )
+                for idx, photo in enumerate(photos)
+                if photo is not None
+            }
+            # Результаты в порядке фото, а не в порядке завершения
+            cleaned_photos = []
+            for idx in range(total):
+                path = futures[idx].result() if idx in futures else cached_paths.get(idx)
+                if path:
+                    cleaned_photos.append(path)
+
+        elapsed = time.time() - started
+        logger.info(
+            f"⏱️ {len(cleaned_photos)}/{total} фото за {elapsed:.1f} сек "
+            f"({len(cleaned_photos) / elapsed if elapsed else 0:.2f} фото/сек, "
+            f"потоков: {PIPELINE_WORKERS}, запросов к модели: {MODEL_MAX_INFLIGHT})"
+        )
 
         # Создаем ZIP архив
         logger.info(f"📦 Создание ZIP архива из {len(cleaned_photos)} фото...")
 
         if not cleaned_photos:
-            logger.warning(f"⚠️ Нет очищенных фото для архивации! Обработано 0 из {len(photo_data_list)}")
+            logger.warning(f"⚠️ Нет очищенных фото для архивации! Обработано 0 из {total}")
 
         zip_buffer = io.BytesIO()
 
@@ -265,6 +626,10 @@ def handler(event):
         {
             "photo_urls": ["base64_1", "base64_2", ...]
         }
+        или
+        {
+            "sources": {"zip_url": "...", "referer": "..."}  # или {"image_urls": [...]}
+        }
 
     Output:
         {
@@ -272,19 +637,22 @@ def handler(event):
             "zip_base64": "..."  # ZIP архив в base64
         }
     """
-    global iopaint_process
-
-    # Запускаем IOPaint при первом запуске
-    if iopaint_process is None:
-        start_iopaint()
+    # Модели загружаются при старте воркера; здесь - если handler вызван напрямую
+    if engine is None and iopaint_process is None:
+        start_engine()
 
     input_data = event.get("input", {})
     photo_data = input_data.get("photo_urls", [])
+    sources = input_data.get("sources")
 
-    if not photo_data:
-        return {"error": "No photo_urls provided"}
+    if not photo_data and not sources:
+        return {"error": "No photo_urls or sources provided"}
 
     try:
+        # Воркер сам скачивает фото - в задаче только ссылки
+        if sources:
+            photo_data = load_photo_sources(sources)
+
         # Обрабатываем фото
         zip_bytes = process_photos(photo_data)
 
@@ -295,7 +663,11 @@ def handler(event):
             "status": "success",
             "photo_count": len(photo_data),
             "zip_base64": zip_base64,
-            "zip_size": len(zip_bytes)
+            "zip_size": len(zip_bytes),
+            "inpaint_batches": engine.last_batches if engine and INPAINT_BATCH_SIZE > 1 else None,
+            "cold_start": cold_start,
+            "mask_cache": mask_cache_info(),
+            "result_cache": dict(result_cache.stats, hit_rate=round(result_cache.hit_rate, 3)) if result_cache else None
         }
 
     except Exception as e:
@@ -311,4 +683,7 @@ def handler(event):
 
 if __name__ == "__main__":
     logger.info("🚀 Запуск RunPod Photo Processing Worker")
+
+    # Модели загружаются и прогреваются до приёма задач
+    start_engine()
     runpod.serverless.start({"handler": handler})
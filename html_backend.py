@@ -0,0 +1,226 @@
+"""
+Бэкенды HTML парсинга для экстракторов страницы BeForward
+Одни и те же экстракторы работают поверх BeautifulSoup, lxml или selectolax
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve
+
+import config
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Элементы страницы, которые читают экстракторы (для частичного парсинга)
+PARTIAL_PARSE_IDS = [
+    'list-detail',
+    'content',
+    'spec',
+    'vehicle-photo-slider',
+    'change-country-port-modal',
+    'selected_total_price',
+]
+
+
+class HtmlBackend(ABC):
+    """Базовый интерфейс бэкенда
+
+    Узлы дерева непрозрачны для экстракторов - вся работа с ними идёт
+    через методы бэкенда. text() повторяет get_text(strip=True) из bs4:
+    каждый текстовый фрагмент обрезается, фрагменты склеиваются без разделителя.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def parse(self, content: bytes, partial: bool = False):
+        """Парсит HTML и возвращает корневой узел"""
+
+    @abstractmethod
+    def select_one(self, node, selector: str):
+        """Первый узел по CSS селектору или None"""
+
+    @abstractmethod
+    def select(self, node, selector: str) -> List:
+        """Все узлы по CSS селектору в порядке документа"""
+
+    @abstractmethod
+    def text(self, node) -> str:
+        """Текст узла (аналог get_text(strip=True))"""
+
+    @abstractmethod
+    def attr(self, node, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Значение атрибута узла"""
+
+    @abstractmethod
+    def closest(self, node, tag: str):
+        """Ближайший предок с указанным тегом или None"""
+
+
+class Bs4Backend(HtmlBackend):
+    """BeautifulSoup + soupsieve с предкомпилированными селекторами"""
+
+    def __init__(self, features: str = 'html.parser'):
+        """Инициализация бэкенда
+
+        Args:
+            features: Парсер BeautifulSoup (html.parser, lxml)
+        """
+        self.features = features
+        self.name = f'bs4:{features}'
+        self._compiled: Dict[str, soupsieve.SoupSieve] = {}
+
+    def _compile(self, selector: str) -> soupsieve.SoupSieve:
+        compiled = self._compiled.get(selector)
+        if compiled is None:
+            compiled = soupsieve.compile(selector)
+            self._compiled[selector] = compiled
+        return compiled
+
+    def parse(self, content: bytes, partial: bool = False):
+        # Частичный парсинг: в дерево попадают только нужные поддеревья по id
+        parse_only = SoupStrainer(id=PARTIAL_PARSE_IDS) if partial else None
+        return BeautifulSoup(content, self.features, parse_only=parse_only)
+
+    def select_one(self, node, selector: str):
+        return self._compile(selector).select_one(node)
+
+    def select(self, node, selector: str) -> List:
+        return self._compile(selector).select(node)
+
+    def text(self, node) -> str:
+        return node.get_text(strip=True)
+
+    def attr(self, node, name: str, default: Optional[str] = None) -> Optional[str]:
+        return node.get(name, default)
+
+    def closest(self, node, tag: str):
+        return node.find_parent(tag)
+
+
+class LxmlBackend(HtmlBackend):
+    """lxml.html + cssselect: селекторы компилируются в XPath один раз"""
+
+    name = 'lxml'
+
+    # Текст без содержимого script/style (как get_text в bs4)
+    _TEXT_XPATH = None
+
+    def __init__(self):
+        self._compiled: Dict[str, 'CSSSelector'] = {}
+        if LxmlBackend._TEXT_XPATH is None:
+            LxmlBackend._TEXT_XPATH = etree.XPath(
+                './/text()[not(ancestor::script)][not(ancestor::style)]'
+            )
+
+    def _compile(self, selector: str) -> 'CSSSelector':
+        compiled = self._compiled.get(selector)
+        if compiled is None:
+            compiled = CSSSelector(selector)
+            self._compiled[selector] = compiled
+        return compiled
+
+    def parse(self, content: bytes, partial: bool = False):
+        # lxml парсит всю страницу за миллисекунды - частичный режим не нужен
+        return lxml.html.fromstring(content)
+
+    def select_one(self, node, selector: str):
+        found = self._compile(selector)(node)
+        return found[0] if found else None
+
+    def select(self, node, selector: str) -> List:
+        return self._compile(selector)(node)
+
+    def text(self, node) -> str:
+        return ''.join(fragment.strip() for fragment in self._TEXT_XPATH(node))
+
+    def attr(self, node, name: str, default: Optional[str] = None) -> Optional[str]:
+        return node.get(name, default)
+
+    def closest(self, node, tag: str):
+        return next(node.iterancestors(tag), None)
+
+
+class SelectolaxBackend(HtmlBackend):
+    """selectolax (Modest): самый быстрый парсер, селекторы не компилируются"""
+
+    name = 'selectolax'
+
+    def parse(self, content: bytes, partial: bool = False):
+        return HTMLParser(content)
+
+    def select_one(self, node, selector: str):
+        return node.css_first(selector)
+
+    def select(self, node, selector: str) -> List:
+        return node.css(selector)
+
+    def text(self, node) -> str:
+        return node.text(deep=True, separator='', strip=True)
+
+    def attr(self, node, name: str, default: Optional[str] = None) -> Optional[str]:
+        value = node.attributes.get(name, default)
+        return default if value is None else value
+
+    def closest(self, node, tag: str):
+        parent = node.parent
+        while parent is not None and parent.tag != tag:
+            parent = parent.parent
+        return parent
+
+
+def available_backends() -> List[str]:
+    """Имена бэкендов, доступных в текущем окружении"""
+    names = ['bs4']
+    if LXML_AVAILABLE:
+        names += ['bs4-lxml', 'lxml']
+    if SELECTOLAX_AVAILABLE:
+        names.append('selectolax')
+    return names
+
+
+_backends: Dict[str, HtmlBackend] = {}
+
+
+def get_backend(name: str = None) -> HtmlBackend:
+    """Возвращает бэкенд по имени (по умолчанию из config.HTML_PARSER_BACKEND)
+
+    Args:
+        name: bs4, bs4-lxml, lxml или selectolax
+
+    Returns:
+        Экземпляр бэкенда (один на имя - кэш скомпилированных селекторов общий)
+    """
+    name = name or config.HTML_PARSER_BACKEND
+
+    if name not in available_backends():
+        logger.warning(f"⚠️ HTML бэкенд '{name}' недоступен, используем bs4")
+        name = 'bs4'
+
+    if name not in _backends:
+        if name == 'bs4-lxml':
+            _backends[name] = Bs4Backend('lxml')
+        elif name == 'lxml':
+            _backends[name] = LxmlBackend()
+        elif name == 'selectolax':
+            _backends[name] = SelectolaxBackend()
+        else:
+            _backends[name] = Bs4Backend('html.parser')
+
+    return _backends[name]
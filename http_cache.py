@@ -0,0 +1,337 @@
+"""
+HTTP кэш с условной ревалидацией (ETag / Last-Modified) для запросов к BeForward
+Страницы и ZIP архивы с фото хранятся на диске; повторный запрос неизменённого
+объявления стоит ответа 304 вместо полного HTML и многомегабайтного архива
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Dict, Optional
+
+import aiohttp
+import requests
+
+import config
+from disk_lru import DiskLru
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Ответ из HTTP кэша - открытый файл с телом на диске
+
+    Файл открывается под замком кэша, поэтому вытеснение записи после выдачи
+    ответа не мешает его чтению (удалённый файл живёт до закрытия дескриптора).
+    Ответ нужно закрыть - удобнее всего через with.
+    """
+
+    def __init__(self, url: str, file: BinaryIO, headers: Dict, cache_status: str):
+        """Инициализация ответа
+
+        Args:
+            url: URL запроса
+            file: Открытый на чтение файл с телом ответа
+            headers: Заголовки ответа (Content-Type, ETag, Last-Modified...)
+            cache_status: hit, revalidated или miss
+        """
+        self.url = url
+        self.file = file
+        self.path = file.name
+        self.headers = headers
+        self.cache_status = cache_status
+        self.status_code = 200
+
+    @property
+    def content(self) -> bytes:
+        """Тело ответа (читается с диска)"""
+        return self.read()
+
+    def read(self) -> bytes:
+        """Читает тело целиком (метод - удобно передать в asyncio.to_thread)"""
+        self.file.seek(0)
+        return self.file.read()
+
+    @property
+    def size(self) -> int:
+        """Размер тела в байтах"""
+        return os.fstat(self.file.fileno()).st_size
+
+    def raise_for_status(self):
+        """Совместимость с requests.Response (ошибки поднимаются в get())"""
+
+    def close(self):
+        """Закрывает файл с телом"""
+        self.file.close()
+
+    def __enter__(self) -> 'CachedResponse':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ConditionalHttpCache:
+    """Дисковый HTTP кэш поверх requests.Session
+
+    - свежий ответ (Cache-Control: max-age) отдаётся без запроса (hit)
+    - иначе запрос идёт с If-None-Match / If-Modified-Since, 304 → тело из кэша (revalidated)
+    - 200 → тело потоково пишется на диск (miss)
+    """
+
+    _STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+    def __init__(self, session: requests.Session, cache_dir: str = None, max_bytes: int = None):
+        """Инициализация кэша
+
+        Args:
+            session: HTTP сессия парсера
+            cache_dir: Директория кэша (по умолчанию config.HTTP_CACHE_DIR)
+            max_bytes: Лимит размера кэша (по умолчанию config.HTTP_CACHE_MAX_MB)
+        """
+        self.session = session
+        self.cache_dir = cache_dir or config.HTTP_CACHE_DIR
+        self.max_bytes = max_bytes or config.HTTP_CACHE_MAX_MB * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._lru = DiskLru(self.cache_dir, '.body', self.max_bytes, companions=('.json',), label='HTTP кэш')
+        self.stats = {'hit': 0, 'revalidated': 0, 'miss': 0}
+
+    def _paths(self, url: str):
+        """Пути к файлам тела и метаданных для URL"""
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, name)
+        return base + '.body', base + '.json'
+
+    def _load_meta(self, meta_path: str, body_path: str) -> Optional[Dict]:
+        """Читает метаданные записи (None если записи нет или она повреждена)"""
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _save_meta(self, meta_path: str, meta: Dict):
+        """Атомарно записывает метаданные"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _max_age(self, headers: Dict) -> int:
+        """max-age из Cache-Control (0 если нет или no-cache)"""
+        cache_control = (headers.get('Cache-Control') or '').lower()
+        if 'no-cache' in cache_control or 'no-store' in cache_control:
+            return 0
+        match = re.search(r'max-age=(\d+)', cache_control)
+        return int(match.group(1)) if match else 0
+
+    def _open_body(self, body_path: str) -> Optional[BinaryIO]:
+        """Открывает тело записи под замком вытеснения (None если запись уже вытеснена)"""
+        with self._lru.lock:
+            try:
+                body = open(body_path, 'rb')
+            except FileNotFoundError:
+                return None
+            self._lru.touch(body_path)
+            return body
+
+    def _lookup(self, url: str, headers: Dict = None, revalidate: bool = False):
+        """Ищет запись и готовит условный запрос (revalidate - игнорировать max-age)
+
+        Returns:
+            (body_path, meta_path, meta, открытое тело записи или None,
+             свежий CachedResponse или None, заголовки запроса)
+        """
+        body_path, meta_path = self._paths(url)
+        meta = self._load_meta(meta_path, body_path)
+        body = self._open_body(body_path) if meta else None
+        if body is None:
+            meta = None
+
+        # Свежая запись - без запроса к серверу
+        if meta and not revalidate and time.time() - meta['stored_at'] < meta.get('max_age', 0):
+            self._count('hit', url)
+            return body_path, meta_path, meta, body, CachedResponse(url, body, meta['headers'], 'hit'), None
+
+        request_headers = dict(headers or {})
+        if meta:
+            if meta['headers'].get('ETag'):
+                request_headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        return body_path, meta_path, meta, body, None, request_headers
+
+    def _not_modified(self, url: str, body: BinaryIO, meta_path: str, meta: Dict, response_headers) -> CachedResponse:
+        """Обрабатывает 304: обновляет время записи и отдаёт тело из кэша"""
+        stored = dict(meta['headers'])
+        if response_headers.get('Cache-Control'):
+            stored['Cache-Control'] = response_headers['Cache-Control']
+        self._save_meta(meta_path, {
+            'url': url,
+            'headers': stored,
+            'stored_at': time.time(),
+            'max_age': self._max_age(stored),
+        })
+        self._count('revalidated', url)
+        return CachedResponse(url, body, stored, 'revalidated')
+
+    def _stored(self, url: str, tmp_path: str, body_path: str, meta_path: str, response_headers) -> CachedResponse:
+        """Переносит скачанное тело в кэш и сохраняет метаданные
+
+        Тело открывается до вытеснения - даже вытесненная сразу запись
+        (архив больше лимита кэша) остаётся читаемой через ответ.
+        """
+        stored = {
+            name: response_headers[name]
+            for name in self._STORED_HEADERS
+            if response_headers.get(name)
+        }
+        with self._lru.lock:
+            try:
+                os.replace(tmp_path, body_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._save_meta(meta_path, {
+                'url': url,
+                'headers': stored,
+                'stored_at': time.time(),
+                'max_age': self._max_age(stored),
+            })
+            body = open(body_path, 'rb')
+            self._lru.add(body_path, os.fstat(body.fileno()).st_size)
+        self._count('miss', url)
+        return CachedResponse(url, body, stored, 'miss')
+
+    def _new_tmp(self):
+        """Временный файл для тела ответа в директории кэша"""
+        return tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+
+    def get(self, url: str, headers: Dict = None, timeout: float = None, revalidate: bool = False) -> CachedResponse:
+        """GET с кэшем и условной ревалидацией
+
+        Args:
+            url: URL запроса
+            headers: Дополнительные заголовки (например Referer)
+            timeout: Таймаут запроса
+            revalidate: Всегда спрашивать сервер, даже если запись свежая по max-age
+
+        Returns:
+            CachedResponse с открытым телом на диске (закрыть после чтения)
+
+        Raises:
+            requests.HTTPError: при ответе сервера с ошибкой
+        """
+        body_path, meta_path, meta, body, fresh, request_headers = self._lookup(url, headers, revalidate)
+        if fresh:
+            return fresh
+
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout, stream=True)
+            try:
+                if response.status_code == 304 and body:
+                    not_modified = self._not_modified(url, body, meta_path, meta, response.headers)
+                    body = None
+                    return not_modified
+
+                response.raise_for_status()
+
+                # Тело пишем на диск потоково - архив не держится в памяти целиком
+                fd, tmp_path = self._new_tmp()
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            if chunk:
+                                f.write(chunk)
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+            finally:
+                response.close()
+        finally:
+            # Старое тело нужно только для ответа 304
+            if body:
+                body.close()
+
+        return self._stored(url, tmp_path, body_path, meta_path, response.headers)
+
+    async def get_async(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict = None,
+        timeout: float = None,
+        revalidate: bool = False
+    ) -> CachedResponse:
+        """Async вариант get() поверх aiohttp
+
+        Args:
+            session: aiohttp сессия парсера
+            url: URL запроса
+            headers: Дополнительные заголовки
+            timeout: Таймаут запроса
+            revalidate: Всегда спрашивать сервер, даже если запись свежая по max-age
+
+        Returns:
+            CachedResponse с открытым телом на диске (закрыть после чтения)
+
+        Raises:
+            aiohttp.ClientResponseError: при ответе сервера с ошибкой
+        """
+        # Работа с диском (метаданные, тело, вытеснение) - в потоке, не в event loop
+        body_path, meta_path, meta, body, fresh, request_headers = await asyncio.to_thread(
+            self._lookup, url, headers, revalidate
+        )
+        if fresh:
+            return fresh
+
+        try:
+            async with session.get(
+                url,
+                headers=request_headers,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                if response.status == 304 and body:
+                    not_modified = await asyncio.to_thread(
+                        self._not_modified, url, body, meta_path, meta, response.headers
+                    )
+                    body = None
+                    return not_modified
+
+                response.raise_for_status()
+
+                fd, tmp_path = await asyncio.to_thread(self._new_tmp)
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(64 * 1024):
+                            await asyncio.to_thread(f.write, chunk)
+                except Exception:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    raise
+
+                stored_headers = response.headers
+        finally:
+            # Старое тело нужно только для ответа 304
+            if body:
+                body.close()
+
+        return await asyncio.to_thread(self._stored, url, tmp_path, body_path, meta_path, stored_headers)
+
+    def _count(self, status: str, url: str):
+        """Обновляет счётчики и пишет их в лог"""
+        with self._lock:
+            self.stats[status] += 1
+        logger.info(f"🗄️ HTTP кэш: {status} {url[:80]} {self.stats}")
@@ -0,0 +1,77 @@
+"""
+Кодирование фото и масок для передачи в IOPaint (base64 внутри JSON)
+PNG исходного фото на 1-3 MP кодируется долго и в разы больше JPEG источника,
+поэтому формат настраивается: png, webp (без потерь) или jpeg (исходные байты
+без перекодирования); маска - 8-битный или 1-битный PNG
+"""
+import base64
+import io
+from typing import Optional
+
+from PIL import Image
+
+import config
+
+IMAGE_CODECS = ('png', 'webp', 'jpeg')
+MASK_CODECS = ('png', 'png1')
+
+JPEG_MAGIC = b'\xff\xd8\xff'
+
+
+def encode_image(img: Image.Image, codec: str = None, source: Optional[bytes] = None) -> bytes:
+    """Кодирует изображение для запроса к IOPaint
+
+    IOPaint отвечает в формате запроса: на webp и jpeg ответ приходит
+    с потерями (quality 95), на png - без потерь.
+
+    Args:
+        img: Изображение
+        codec: png, webp или jpeg (по умолчанию config.TRANSPORT_IMAGE_CODEC)
+        source: Исходные байты файла, если img - это он без изменений.
+            Для jpeg отправляются как есть; без них jpeg кодируется как png
+
+    Returns:
+        Байты файла изображения
+    """
+    codec = codec or config.TRANSPORT_IMAGE_CODEC
+    # IOPaint поворачивает фото по EXIF Orientation, а маска считается без поворота
+    if codec == 'jpeg' and source and source.startswith(JPEG_MAGIC) and img.getexif().get(0x0112, 1) == 1:
+        return source
+
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    buffer = io.BytesIO()
+    if codec == 'webp':
+        # method=0 - самый быстрый режим кодера, размер всё равно меньше png
+        img.save(buffer, format='WEBP', lossless=True, quality=0, method=0)
+    else:
+        img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def encode_mask(mask: Image.Image, codec: str = None) -> bytes:
+    """Кодирует маску (0 / 255) для запроса к IOPaint
+
+    Args:
+        mask: Маска
+        codec: png (8 бит) или png1 (1 бит, в 8 раз меньше пикселей в файле)
+            (по умолчанию config.TRANSPORT_MASK_CODEC)
+
+    Returns:
+        Байты PNG
+    """
+    codec = codec or config.TRANSPORT_MASK_CODEC
+    if codec == 'png1':
+        mask = mask.convert('L').convert('1', dither=Image.NONE)
+    elif mask.mode == 'RGBA':
+        mask = mask.convert('RGB')
+
+    buffer = io.BytesIO()
+    mask.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def to_base64(data: bytes) -> str:
+    """Байты файла в base64 строку для JSON"""
+    return base64.b64encode(data).decode('utf-8')
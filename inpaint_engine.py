@@ -0,0 +1,186 @@
+"""
+LaMa inpainting и RealESRGAN upscaling внутри процесса (без IOPaint HTTP сервера)
+Модели загружаются один раз через iopaint ModelManager / RealESRGANUpscaler,
+изображения передаются numpy массивами - без PNG, base64 и localhost HTTP
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+try:
+    import numpy as np
+    import torch
+    from iopaint.model_manager import ModelManager
+    from iopaint.plugins.realesrgan import RealESRGANUpscaler
+    from iopaint.schema import HDStrategy, InpaintRequest, LDMSampler
+    LOCAL_ENGINE_AVAILABLE = True
+except ImportError:
+    LOCAL_ENGINE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def detect_device() -> str:
+    """cuda если в контейнере есть CUDA, иначе cpu"""
+    return "cuda" if os.path.exists("/usr/local/cuda") else "cpu"
+
+
+class LocalInpaintEngine:
+    """LaMa + RealESRGAN в текущем процессе
+
+    Интерфейс совпадает с HTTP функциями handler.py: inpaint(image, mask)
+    и upscale(image) принимают и возвращают PIL изображения (RGB).
+    ModelManager и RealESRGANUpscaler отдают BGR - переворачиваем каналы.
+    """
+
+    def __init__(
+        self,
+        device: str = None,
+        model: str = 'lama',
+        upscaler_model: str = 'realesr-general-x4v3',
+        upscale_factor: float = 2
+    ):
+        """Загружает модели
+
+        Args:
+            device: cuda или cpu (по умолчанию detect_device())
+            model: Модель inpainting iopaint
+            upscaler_model: Модель RealESRGAN
+            upscale_factor: Множитель увеличения
+        """
+        if not LOCAL_ENGINE_AVAILABLE:
+            raise RuntimeError("iopaint/torch не установлены")
+
+        self.device = torch.device(device or detect_device())
+        self.upscale_factor = upscale_factor
+
+        started = time.time()
+        self.model = ModelManager(name=model, device=self.device)
+        self.request = InpaintRequest(hd_strategy=HDStrategy.ORIGINAL, ldm_sampler=LDMSampler.plms)
+        logger.info(f"✅ {model} загружена на {self.device} за {time.time() - started:.1f} сек")
+
+        started = time.time()
+        self.upscaler = RealESRGANUpscaler(upscaler_model, self.device)
+        logger.info(f"✅ RealESRGAN {upscaler_model} загружен за {time.time() - started:.1f} сек")
+
+        # Модели не рассчитаны на параллельные вызовы из разных потоков
+        self._lock = threading.Lock()
+
+        # Тайминги пачек последнего inpaint_batch (для вывода задачи)
+        self.last_batches: List[Dict] = []
+
+    @staticmethod
+    def _bgr_to_image(bgr) -> Image.Image:
+        return Image.fromarray(np.ascontiguousarray(bgr[:, :, ::-1].astype(np.uint8)))
+
+    def inpaint(self, img: Image.Image, mask: Image.Image) -> Optional[Image.Image]:
+        """Inpainting по маске (255 - закрасить)"""
+        rgb = np.asarray(img.convert('RGB'))
+        mask_np = np.asarray(mask.convert('L'))
+
+        with self._lock, torch.no_grad():
+            bgr = self.model(rgb, mask_np, self.request)
+        return self._bgr_to_image(bgr)
+
+    def upscale(self, img: Image.Image) -> Optional[Image.Image]:
+        """Увеличение разрешения в upscale_factor раз"""
+        bgr = np.ascontiguousarray(np.asarray(img.convert('RGB'))[:, :, ::-1])
+
+        with self._lock, torch.no_grad():
+            result = self.upscaler.forward(bgr, self.upscale_factor)
+        return self._bgr_to_image(result)
+
+    def inpaint_batch(
+        self,
+        items: List[Tuple[Image.Image, Image.Image]],
+        max_batch: int = 8,
+        max_megapixels: float = 16
+    ) -> List[Optional[Image.Image]]:
+        """Inpainting нескольких фото пачками
+
+        Фото группируются по размеру (у кропов вокруг знака он почти всегда
+        одинаковый), пачка ограничена max_batch и суммарным числом пикселей.
+        Пачка идёт прямо в torch модель LaMa - как LaMa.forward, но с batch > 1.
+
+        Args:
+            items: Список (изображение, маска)
+            max_batch: Максимум фото в пачке
+            max_megapixels: Лимит пикселей пачки (ограничение памяти)
+
+        Returns:
+            Результаты в порядке items
+        """
+        self.last_batches = []
+        lama = getattr(self.model.model, 'model', None)
+        if lama is None or max_batch <= 1:
+            return [self.inpaint(img, mask) for img, mask in items]
+
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for idx, (img, _) in enumerate(items):
+            groups.setdefault(img.size, []).append(idx)
+
+        results: List[Optional[Image.Image]] = [None] * len(items)
+        for (width, height), indices in groups.items():
+            per_batch = max(1, min(max_batch, int(max_megapixels * 1_000_000 // (width * height))))
+            for start in range(0, len(indices), per_batch):
+                batch = indices[start:start + per_batch]
+                started = time.perf_counter()
+                try:
+                    outputs = self._forward_batch(lama, [items[idx] for idx in batch])
+                except RuntimeError as e:
+                    # Нехватка памяти GPU - эта пачка по одному фото
+                    if 'out of memory' not in str(e):
+                        raise
+                    logger.warning(f"⚠️ Пачка {len(batch)}x{width}x{height} не влезла в память - по одному")
+                    if self.device.type == 'cuda':
+                        torch.cuda.empty_cache()
+                    outputs = [self.inpaint(*items[idx]) for idx in batch]
+
+                for idx, output in zip(batch, outputs):
+                    results[idx] = output
+
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.last_batches.append({
+                    'size': f"{width}x{height}",
+                    'count': len(batch),
+                    'ms': round(elapsed_ms),
+                })
+                logger.info(
+                    f"🧩 Пачка {len(batch)} x {width}x{height}: {elapsed_ms:.0f} мс "
+                    f"({elapsed_ms / len(batch):.0f} мс/фото)"
+                )
+
+        return results
+
+    def _forward_batch(self, lama, items: List[Tuple[Image.Image, Image.Image]]) -> List[Image.Image]:
+        """Одна пачка фото одного размера через torch модель LaMa"""
+        width, height = items[0][0].size
+        # LaMa требует стороны кратные 8 - дополняем зеркально, как iopaint
+        pad = ((0, -height % 8), (0, -width % 8))
+
+        images = np.stack([
+            np.pad(np.asarray(img.convert('RGB')), pad + ((0, 0),), mode='symmetric')
+            for img, _ in items
+        ])
+        masks = np.stack([
+            np.pad(np.asarray(mask.convert('L')), pad, mode='symmetric')
+            for _, mask in items
+        ])
+
+        image_t = torch.from_numpy(images).permute(0, 3, 1, 2).float().div(255).to(self.device)
+        mask_t = torch.from_numpy((masks > 0).astype(np.float32))[:, None].to(self.device)
+
+        with self._lock, torch.no_grad():
+            output = lama(image_t, mask_t)
+
+        rgb = np.clip(output.permute(0, 2, 3, 1).cpu().numpy() * 255, 0, 255).astype(np.uint8)
+
+        # Вне маски оставляем исходные пиксели (как sd_keep_unmasked_area в iopaint)
+        return [
+            Image.composite(Image.fromarray(rgb[i, :height, :width]), img.convert('RGB'), mask.convert('L'))
+            for i, (img, mask) in enumerate(items)
+        ]
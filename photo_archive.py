@@ -0,0 +1,375 @@
+"""
+Выбор фото прямо из ZIP архива BeForward
+Сортировка и отбор (≤ 20 фото) идут по списку файлов архива, в память
+читаются только выбранные фото - архив не распаковывается на диск.
+Если сервер поддерживает Range, скачиваются только выбранные фото
+"""
+import bisect
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Расширения фото в архиве
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def photo_sort_key(name: str) -> int:
+    """Ключ натуральной сортировки по числу в имени файла (1.jpg, 2.jpg, ..., 10.jpg)
+
+    Args:
+        name: Имя файла или путь внутри архива
+
+    Returns:
+        Число из имени (0 если чисел нет)
+    """
+    filename = os.path.basename(name)
+    # Ищем число перед расширением: XXX_123.jpg -> 123
+    match = re.search(r'_?(\d+)\.(jpg|jpeg|png)$', filename, re.IGNORECASE)
+    if match:
+        return int(match.group(1))
+    # Если не найдено, ищем любое число в имени
+    numbers = re.findall(r'\d+', filename)
+    return int(numbers[-1]) if numbers else 0
+
+
+def select_photos_smart(photos: list) -> list:
+    """
+    Умный выбор фото по правилам:
+    1-20 фото: все фото
+    21-29 фото: первые 10 + последние 10
+    30+ фото: первые 10 + фото с 20 по 30
+
+    Args:
+        photos: Отсортированный список (пути, имена в архиве и т.п.)
+
+    Returns:
+        Список выбранных элементов (всегда ≤ 20)
+    """
+    total = len(photos)
+
+    # 1-20 фото: берём все
+    if total <= 20:
+        logger.info(f"📸 Выбрано {total} фото (все доступные)")
+        return photos
+
+    # 21-29 фото: первые 10 + последние 10
+    elif total < 30:
+        selected = photos[:10] + photos[-10:]
+        logger.info(f"📸 Выбрано 20 фото из {total}: первые 10 + последние 10")
+        return selected
+
+    # 30+ фото: первые 10 + фото с 20 по 30
+    else:
+        selected = photos[:10] + photos[19:29]  # индексы 19-28 = фото 20-29
+        logger.info(f"📸 Выбрано 20 фото из {total}: первые 10 + с 20 по 29")
+        return selected
+
+
+def list_photo_members(zip_file: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """Фото в архиве в порядке натуральной сортировки"""
+    members = [
+        info for info in zip_file.infolist()
+        if not info.is_dir() and info.filename.lower().endswith(PHOTO_EXTENSIONS)
+    ]
+    members.sort(key=lambda info: photo_sort_key(info.filename))
+    return members
+
+
+def unique_photo_names(members: List[zipfile.ZipInfo]) -> List[str]:
+    """Имена фото без папок архива, без совпадений
+
+    Одинаковые имена из разных папок получают номер: a/1.jpg, b/1.jpg → 1.jpg, 1_2.jpg
+
+    Args:
+        members: Выбранные файлы архива
+
+    Returns:
+        Имена в том же порядке
+    """
+    names = []
+    seen = set()
+    for info in members:
+        name = os.path.basename(info.filename)
+        stem, ext = os.path.splitext(name)
+        copy = 1
+        while name.lower() in seen:
+            copy += 1
+            name = f"{stem}_{copy}{ext}"
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+def read_selected_photos(source: Union[str, BinaryIO]) -> List[Tuple[str, bytes]]:
+    """Выбирает фото по списку файлов архива и читает только их
+
+    Args:
+        source: Путь к ZIP или файловый объект (BytesIO, кэш на диске)
+
+    Returns:
+        Список (имя файла, байты фото) в порядке натуральной сортировки
+    """
+    with zipfile.ZipFile(source, 'r') as zip_file:
+        members = list_photo_members(zip_file)
+        if not members:
+            return []
+
+        selected = select_photos_smart(members)
+        total_size = sum(info.file_size for info in members)
+        selected_size = sum(info.file_size for info in selected)
+        logger.info(
+            f"📦 Из архива читается {len(selected)}/{len(members)} фото "
+            f"({selected_size / 1024 / 1024:.1f} из {total_size / 1024 / 1024:.1f} MB)"
+        )
+
+        return [
+            (name, zip_file.read(info))
+            for name, info in zip(unique_photo_names(selected), selected)
+        ]
+
+
+def download_archive(session, url: str, headers: Dict = None, timeout: float = None) -> BinaryIO:
+    """Потоково скачивает архив в SpooledTemporaryFile
+
+    Чанки пишутся сразу в файл: до config.PHOTO_DOWNLOAD_MEMORY_MB архив
+    лежит в памяти, больше - автоматически уходит во временный файл на диске.
+    Пиковая память не зависит от размера архива.
+
+    Args:
+        session: requests.Session
+        url: URL ZIP архива
+        headers: Дополнительные заголовки (Referer)
+        timeout: Таймаут запроса
+
+    Returns:
+        Файловый объект, перемотанный в начало (закрывает вызывающий)
+    """
+    started = time.time()
+    response = session.get(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        connect_time = time.time() - started
+
+        max_in_memory = config.PHOTO_DOWNLOAD_MEMORY_MB * 1024 * 1024
+        spool = tempfile.SpooledTemporaryFile(max_size=max_in_memory)
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size=config.PHOTO_DOWNLOAD_CHUNK_KB * 1024):
+                if chunk:
+                    spool.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            spool.close()
+            raise
+    finally:
+        response.close()
+
+    spool.seek(0)
+    download_time = time.time() - started
+    size_mb = size / (1024 * 1024)
+    # SpooledTemporaryFile уходит на диск, как только размер превысил max_size
+    on_disk = size > max_in_memory
+    logger.info(
+        f"⏱️ Скачано {size_mb:.2f} MB за {download_time:.1f} сек "
+        f"({size_mb / max(download_time, 1e-6):.2f} MB/s, подключение {connect_time:.1f} сек, "
+        f"{'на диске' if on_disk else 'в памяти'})"
+    )
+    return spool
+
+
+class HttpRangeFile:
+    """Файловый объект поверх HTTP Range запросов (для zipfile)
+
+    Скачанные диапазоны хранятся в памяти; чтение внутри уже скачанного
+    диапазона не делает запросов. prefetch() качает несколько диапазонов
+    параллельно - так zipfile читает выбранные фото без ожидания сети.
+    """
+
+    # Минимальный размер запроса при чтении вне скачанных диапазонов
+    MIN_FETCH = 64 * 1024
+
+    def __init__(self, session, url: str, size: int, headers: Dict = None, timeout: float = None):
+        """Инициализация файла
+
+        Args:
+            session: requests.Session
+            url: URL архива
+            size: Полный размер архива (из Content-Range)
+            headers: Дополнительные заголовки (Referer)
+            timeout: Таймаут одного запроса
+        """
+        self.session = session
+        self.url = url
+        self.size = size
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.position = 0
+
+        self._spans: List[Tuple[int, bytes]] = []
+        self._lock = threading.Lock()
+        self.bytes_fetched = 0
+        self.requests = 0
+
+    def add_span(self, start: int, data: bytes):
+        """Добавляет уже скачанный диапазон"""
+        with self._lock:
+            self._spans.append((start, data))
+            self.bytes_fetched += len(data)
+            self.requests += 1
+
+    def fetch(self, start: int, end: int):
+        """Скачивает диапазон [start, end) одним запросом"""
+        headers = dict(self.headers, Range=f'bytes={start}-{end - 1}')
+        response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"Сервер не вернул 206 на Range {start}-{end - 1}")
+        self.add_span(start, response.content)
+
+    def prefetch(self, ranges: List[Tuple[int, int]], workers: int):
+        """Параллельно скачивает диапазоны [start, end)"""
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(self.fetch, start, end) for start, end in ranges]:
+                future.result()
+
+    def _find(self, start: int, end: int) -> Optional[bytes]:
+        with self._lock:
+            for span_start, data in self._spans:
+                if span_start <= start and end <= span_start + len(data):
+                    return data[start - span_start:end - span_start]
+        return None
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.position
+        end = min(self.position + size, self.size)
+        if end <= self.position:
+            return b''
+
+        data = self._find(self.position, end)
+        if data is None:
+            self.fetch(self.position, min(max(end, self.position + self.MIN_FETCH), self.size))
+            data = self._find(self.position, end)
+
+        self.position = end
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self):
+        self._spans = []
+
+
+def _member_ranges(zip_file: zipfile.ZipFile, selected: List[zipfile.ZipInfo]) -> List[Tuple[int, int]]:
+    """Диапазоны байт выбранных файлов (локальный заголовок + данные)
+
+    Конец файла - начало следующего файла архива (или центрального каталога),
+    поэтому длина extra поля в локальном заголовке не важна. Соседние
+    файлы склеиваются в один запрос.
+    """
+    offsets = sorted(info.header_offset for info in zip_file.infolist())
+    offsets.append(zip_file.start_dir)
+
+    ranges = []
+    for info in sorted(selected, key=lambda item: item.header_offset):
+        start = info.header_offset
+        end = offsets[bisect.bisect_right(offsets, start)]
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def read_selected_photos_ranged(
+    session,
+    url: str,
+    headers: Dict = None,
+    timeout: float = None
+) -> Optional[List[Tuple[str, bytes]]]:
+    """Скачивает из архива только выбранные фото через HTTP Range
+
+    1. Хвост архива (центральный каталог) - один запрос bytes=-N
+    2. Выбор фото по списку файлов (те же правила, что read_selected_photos)
+    3. Параллельные Range запросы только за выбранными фото
+
+    Args:
+        session: requests.Session
+        url: URL ZIP архива
+        headers: Дополнительные заголовки (Referer)
+        timeout: Таймаут одного запроса
+
+    Returns:
+        Список (имя файла, байты фото) или None, если Range не удался
+        (сервер не поддерживает Range, ошибка запроса, каталог не в хвосте) -
+        тогда вызывающий качает архив целиком
+    """
+    started = time.time()
+    tail_headers = dict(headers or {}, Range=f'bytes=-{config.PHOTO_RANGE_TAIL_BYTES}')
+    response = session.get(url, headers=tail_headers, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        match = re.match(r'bytes (\d+)-(\d+)/(\d+)', response.headers.get('Content-Range', ''))
+        if response.status_code != 206 or not match:
+            logger.info("📦 Сервер не поддерживает Range - качаем архив целиком")
+            return None
+        tail = response.content
+    finally:
+        response.close()
+
+    tail_start, total_size = int(match.group(1)), int(match.group(3))
+    archive = HttpRangeFile(session, url, total_size, headers=headers, timeout=timeout)
+    archive.add_span(tail_start, tail)
+
+    try:
+        with zipfile.ZipFile(archive, 'r') as zip_file:
+            members = list_photo_members(zip_file)
+            if not members:
+                return []
+
+            selected = select_photos_smart(members)
+            archive.prefetch(_member_ranges(zip_file, selected), config.PHOTO_RANGE_WORKERS)
+
+            photos = [
+                (name, zip_file.read(info))
+                for name, info in zip(unique_photo_names(selected), selected)
+            ]
+    # requests.RequestException (HTTP ошибка, таймаут) - подкласс IOError
+    except (IOError, zipfile.BadZipFile) as e:
+        logger.warning(f"⚠️ Range не удался ({e}) - качаем архив целиком")
+        return None
+
+    elapsed = time.time() - started
+    logger.info(
+        f"📦 Range: {len(photos)}/{len(members)} фото, "
+        f"{archive.bytes_fetched / 1024 / 1024:.1f} из {total_size / 1024 / 1024:.1f} MB "
+        f"за {archive.requests} запросов, {elapsed:.1f} сек"
+    )
+    return photos
@@ -0,0 +1,119 @@
+"""
+Параллельное скачивание фото по ссылкам (слайдер второй версии страницы BeForward)
+Общий лимит и лимит на хост, повторы с backoff, порядок результатов сохраняется
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Коды ответа, после которых имеет смысл повторить запрос
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def photo_filename(index: int, url: str) -> str:
+    """Имя файла фото в архиве: photo_01.jpg, photo_02.png ..."""
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    if ext not in ('.jpg', '.jpeg', '.png'):
+        ext = '.jpg'  # по умолчанию
+    return f"photo_{index + 1:02d}{ext}"
+
+
+class PhotoFetcher:
+    """Скачивает список фото с ограничением параллельности
+
+    Общий семафор ограничивает число запросов, семафор на хост - нагрузку
+    на один сервер (CDN картинок BeForward режет слишком частые запросы).
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        concurrency: int = None,
+        per_host: int = None,
+        retries: int = None,
+        timeout: float = None
+    ):
+        """Инициализация
+
+        Args:
+            session: aiohttp сессия
+            concurrency: Общий лимит одновременных запросов
+            per_host: Лимит одновременных запросов к одному хосту
+            retries: Число повторов при ошибке
+            timeout: Таймаут одного запроса
+        """
+        self.session = session
+        self.retries = config.PHOTO_FETCH_RETRIES if retries is None else retries
+        self.per_host = per_host or config.PHOTO_FETCH_PER_HOST
+        self.timeout = aiohttp.ClientTimeout(total=timeout or config.PHOTO_FETCH_TIMEOUT)
+
+        self._total = asyncio.Semaphore(concurrency or config.PHOTO_FETCH_CONCURRENCY)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {'ok': 0, 'retried': 0, 'failed': 0, 'bytes': 0}
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    async def fetch_one(self, url: str, headers: Dict = None) -> Optional[bytes]:
+        """Скачивает одно фото с повторами
+
+        Returns:
+            Байты фото или None, если все попытки неудачны
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retried'] += 1
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+            try:
+                async with self._total, self._host_semaphore(url):
+                    async with self.session.get(url, headers=headers, timeout=self.timeout) as response:
+                        if response.status in RETRY_STATUSES:
+                            logger.warning(f"⚠️ Фото {url[-60:]}: HTTP {response.status}, попытка {attempt + 1}")
+                            continue
+                        response.raise_for_status()
+                        content = await response.read()
+            except aiohttp.ClientResponseError as e:
+                # Коды вне RETRY_STATUSES (403, 404...) повтор не исправит
+                logger.warning(f"⚠️ Фото {url[-60:]}: HTTP {e.status}, без повтора")
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"⚠️ Фото {url[-60:]}: {e}, попытка {attempt + 1}")
+                continue
+
+            self.stats['ok'] += 1
+            self.stats['bytes'] += len(content)
+            return content
+
+        self.stats['failed'] += 1
+        logger.error(f"❌ Не удалось скачать фото: {url}")
+        return None
+
+    async def fetch_all(self, urls: List[str], headers: Dict = None) -> List[Optional[bytes]]:
+        """Скачивает все фото параллельно
+
+        Returns:
+            Результаты в порядке urls (None для неудачных)
+        """
+        started = time.time()
+        results = await asyncio.gather(*(self.fetch_one(url, headers) for url in urls))
+
+        elapsed = time.time() - started
+        size_mb = self.stats['bytes'] / (1024 * 1024)
+        logger.info(
+            f"📷 Скачано {self.stats['ok']}/{len(urls)} фото, {size_mb:.2f} MB за {elapsed:.1f} сек "
+            f"(повторов: {self.stats['retried']}, ошибок: {self.stats['failed']})"
+        )
+        return results
@@ -0,0 +1,93 @@
+"""
+Кэш обработанных фото по содержимому (content-addressed)
+Ключ - sha256 байтов исходного фото + параметры обработки (геометрия знака,
+режим inpainting, upscale, модели, формат результата). Повторная задача с той
+же машиной отдаёт готовые фото с диска и не доходит до LaMa / RealESRGAN
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import config
+from disk_lru import DiskLru
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoResultCache:
+    """Дисковый кэш результатов обработки фото с LRU вытеснением по размеру
+
+    Запись - готовый файл (JPEG/PNG); размер и порядок использования ведёт DiskLru.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """Инициализация кэша
+
+        Args:
+            cache_dir: Директория кэша (по умолчанию config.RESULT_CACHE_DIR)
+            max_bytes: Лимит размера кэша (по умолчанию config.RESULT_CACHE_MAX_MB)
+        """
+        self.cache_dir = cache_dir or config.RESULT_CACHE_DIR
+        self.max_bytes = max_bytes or config.RESULT_CACHE_MAX_MB * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._lru = DiskLru(self.cache_dir, '.img', self.max_bytes, label='Кэш фото')
+        self.stats = {'hit': 0, 'miss': 0, 'stored': 0}
+
+    @staticmethod
+    def key(image_bytes: bytes, params: Dict) -> str:
+        """Ключ записи: хэш исходных байтов + параметров обработки"""
+        digest = hashlib.sha256(image_bytes)
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.img')
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий среди всех обращений (0..1)"""
+        lookups = self.stats['hit'] + self.stats['miss']
+        return self.stats['hit'] / lookups if lookups else 0.0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Готовое фото по ключу или None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self._lru.touch(path)
+        except FileNotFoundError:
+            self._count('miss', key)
+            return None
+
+        self._count('hit', key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Сохраняет готовое фото (атомарно) и вытесняет старые записи"""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self.stats['stored'] += 1
+        self._lru.add(path, len(data))
+
+    def _count(self, status: str, key: str):
+        """Обновляет счётчики и пишет их в лог"""
+        with self._lock:
+            self.stats[status] += 1
+        logger.info(f"🗄️ Кэш фото: {status} {key[:12]} {self.stats} (попаданий {self.hit_rate:.0%})")
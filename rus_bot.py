@@ -2,32 +2,35 @@
 BeForward Parser Bot - Telegram бот для парсинга автомобилей с BeForward.jp
 """
 import asyncio
-import base64
-import glob
+import concurrent.futures
 import io
 import logging
 import os
 import re
 import shutil
 import tempfile
+import threading
 import time
 import zipfile
 from typing import Dict, List, Optional, Tuple
 
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
-from PIL import Image, ImageDraw
+from PIL import Image
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ContextTypes
 from telegram.constants import ChatAction
 
-try:
-    from playwright.async_api import async_playwright
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    PLAYWRIGHT_AVAILABLE = False
-
 import config
+from browser_pool import BrowserService, PLAYWRIGHT_AVAILABLE
+from car_cache import CarDataCache, canonical_stock_key, price_ttl
+from http_cache import ConditionalHttpCache
+from image_codec import encode_image, encode_mask, to_base64
+from result_cache import PhotoResultCache
+from photo_archive import download_archive, read_selected_photos, read_selected_photos_ranged, select_photos_smart
+from photo_fetcher import PhotoFetcher, photo_filename
+from watermark import encoded_watermark_mask, inpaint_watermark, mask_cache_info
+from html_backend import HtmlBackend, get_backend
 
 # Настройка логирования
 logging.basicConfig(
@@ -36,6 +39,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class PageDocument:
+    """Страница BeForward, скачанная один раз за парс
+
+    Хранит байты ответа и распарсенное дерево - все экстракторы и
+    Playwright fallback работают с ним без повторных запросов.
+    Дерево строится выбранным HTML бэкендом (bs4, lxml, selectolax).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        content: bytes,
+        content_type: str = None,
+        backend: HtmlBackend = None,
+        partial: bool = None
+    ):
+        """Инициализация документа
+
+        Args:
+            url: URL, по которому скачана страница (с tp_country_id)
+            content: Байты HTML
+            content_type: Content-Type ответа сервера
+            backend: HTML бэкенд (по умолчанию из config.HTML_PARSER_BACKEND)
+            partial: Парсить только нужные блоки (по умолчанию config.HTML_PARTIAL_PARSE)
+        """
+        if partial is None:
+            partial = config.HTML_PARTIAL_PARSE
+
+        self.url = url
+        self.content = content
+        self.content_type = content_type or 'text/html; charset=utf-8'
+        self.backend = backend or get_backend()
+        self.root = self.backend.parse(content, partial=partial)
+
+    def select_one(self, selector: str, node=None):
+        """Первый узел по CSS селектору (от корня или от node)"""
+        return self.backend.select_one(self.root if node is None else node, selector)
+
+    def select(self, selector: str, node=None) -> list:
+        """Все узлы по CSS селектору (от корня или от node)"""
+        return self.backend.select(self.root if node is None else node, selector)
+
+    def text(self, node) -> str:
+        """Текст узла без пробелов по краям фрагментов"""
+        return self.backend.text(node)
+
+    def attr(self, node, name: str, default: str = None) -> Optional[str]:
+        """Атрибут узла"""
+        return self.backend.attr(node, name, default)
+
+    def closest(self, node, tag: str):
+        """Ближайший предок с тегом"""
+        return self.backend.closest(node, tag)
+
+
 class BeForwardParser:
     """Парсер для BeForward.jp с AI обработкой изображений"""
 
@@ -56,6 +114,50 @@ class BeForwardParser:
 
         self.excluded_keywords = config.EXCLUDED_FIELDS
 
+        # Async HTTP сессия для parse_car_data_async (создаётся лениво в event loop бота)
+        self._aio_session: Optional[aiohttp.ClientSession] = None
+
+        # HTTP кэш: повторные запросы страниц и архивов ревалидируются через 304
+        self.http_cache = ConditionalHttpCache(self.session) if config.HTTP_CACHE_ENABLED else None
+
+        # Кэш результатов парсинга + фоновое обновление устаревших цен
+        self.car_cache = CarDataCache() if config.CAR_CACHE_ENABLED else None
+
+        # Кэш обработанных фото: ключ - хэш исходника + параметры обработки
+        self.result_cache = PhotoResultCache() if config.RESULT_CACHE_ENABLED else None
+        self.result_params = {
+            'watermark': [config.WATERMARK_WIDTH, config.WATERMARK_HEIGHT],
+            'mode': config.INPAINT_MODE,
+            'padding': config.INPAINT_CROP_PADDING,
+            'engine': 'iopaint',  # бот всегда обрабатывает через IOPaint HTTP
+            'model': config.IOPAINT_MODEL,  # уточняется у сервера в _check_iopaint_server
+            'upscaler': config.IOPAINT_REALESRGAN_MODEL,
+            'upscale': config.UPSCALE_FACTOR,
+            'min_resolution': config.MIN_RESOLUTION,
+            'format': 'png',
+            'transport': config.TRANSPORT_IMAGE_CODEC,  # IOPaint отвечает webp/jpeg с потерями
+        }
+        # Сервер, модели которого уже записаны в result_params (сбрасывается, если сервер недоступен)
+        self._result_models_url = None
+        self._refresh_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="car-refresh"
+        )
+        self._refreshing = set()
+        # parse_car_data вызывается из потоков executor - проверка и добавление атомарны
+        self._refreshing_lock = threading.Lock()
+        # Фоновые async обновления (event loop хранит только слабые ссылки на задачи)
+        self._background_tasks = set()
+
+        # Счётчики источников цены (как часто нужен Playwright fallback)
+        # http / playwright / not_found - итог поиска (ровно один на поиск),
+        # playwright_attempts - сколько раз понадобился fallback
+        self.price_stats = {'http': 0, 'playwright': 0, 'not_found': 0, 'playwright_attempts': 0}
+
+        # Сервис браузеров Playwright: один поток с event loop и пул браузеров,
+        # общий для всех парсов (браузеры запускаются один раз и переиспользуются)
+        self.browser_service = BrowserService() if PLAYWRIGHT_AVAILABLE else None
+
         # НЕ создаем постоянный WebDriver - создаем по требованию и закрываем
         # Selenium отключен из-за проблем с segfault на серверах
         self.selenium_available = False  # self._check_selenium_available()
@@ -121,6 +223,23 @@ class BeForwardParser:
 
         return webdriver.Chrome(service=service, options=options)
 
+    def warm_up(self):
+        """Прогревает пул браузеров (вызывается при старте бота)"""
+        if not self.browser_service or not config.BROWSER_POOL_WARMUP:
+            return
+        try:
+            self.browser_service.warm_up()
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось прогреть пул браузеров: {e}")
+
+    def shutdown(self):
+        """Закрывает сервис браузеров (вызывается при остановке бота)"""
+        if self.browser_service:
+            self.browser_service.close()
+        self._refresh_executor.shutdown(wait=False)
+        if self.car_cache:
+            self.car_cache.close()
+
     def __del__(self):
         """Закрытие ресурсов при удалении объекта"""
         try:
@@ -130,73 +249,342 @@ class BeForwardParser:
             pass
     
     def parse_car_data(self, url: str) -> Dict:
-        """Парсит данные автомобиля с BeForward"""
+        """Парсит данные автомобиля с BeForward (с кэшем по номеру объявления)
+
+        Свежая запись кэша возвращается сразу. Если устарела только цена,
+        данные отдаются мгновенно, а цена обновляется в фоне.
+        """
+        if not self.car_cache:
+            return self._parse_car_data_uncached(url)
+
+        key, car_data, stale = self._get_cached_car_data(url)
+        if car_data is not None:
+            if stale:
+                self._refresh_in_background(key, url)
+            return car_data
+
+        car_data = self._parse_car_data_uncached(url)
+        if 'error' not in car_data:
+            self.car_cache.put(key, car_data)
+        return car_data
+
+    async def parse_car_data_async(self, url: str) -> Dict:
+        """Async вариант parse_car_data - не блокирует event loop бота
+
+        Страница качается через aiohttp (пул соединений, keep-alive),
+        Playwright fallback ждётся через BrowserService без потоков на запрос.
+        """
+        if not self.car_cache:
+            return await self._parse_car_data_uncached_async(url)
+
+        # SQLite - блокирующий вызов, в event loop не выполняется
+        key, car_data, stale = await asyncio.to_thread(self._get_cached_car_data, url)
+        if car_data is not None:
+            if stale:
+                self._refresh_in_background_async(key, url)
+            return car_data
+
+        car_data = await self._parse_car_data_uncached_async(url)
+        if 'error' not in car_data:
+            await asyncio.to_thread(self.car_cache.put, key, car_data)
+        return car_data
+
+    async def parse_car_data_staged(self, url: str) -> Tuple[Dict, 'asyncio.Future']:
+        """Поэтапный парсинг: статичные данные сразу, цена - отдельной задачей
+
+        Ссылка на ZIP с фото известна сразу после разбора HTML, а цена
+        может ждать рендера Playwright. Вызывающий начинает качать фото,
+        пока цена считается в фоне.
+
+        Returns:
+            (car_data без цены, задача с ценой). Когда задача завершится,
+            цена уже записана в car_data['lusaka_price'] и в кэш.
+        """
+        loop = asyncio.get_running_loop()
+
+        key = None
+        if self.car_cache:
+            key, car_data, stale = await asyncio.to_thread(self._get_cached_car_data, url)
+            if car_data is not None:
+                if stale:
+                    self._refresh_in_background_async(key, url)
+                price = loop.create_future()
+                price.set_result(car_data['lusaka_price'])
+                return car_data, price
+
         try:
-            # Добавляем параметр для Замбии чтобы получить африканские порты
             url_with_zambia = self._add_zambia_country_param(url)
             logger.info(f"🌍 URL с параметром страны: {url_with_zambia}")
 
-            response = self.session.get(url_with_zambia, timeout=10)
-            response.raise_for_status()
+            doc = await self._fetch_document_async(url_with_zambia)
+            car_data = self._extract_page_data(doc, url)
+        except Exception as e:
+            logger.error(f"Ошибка парсинга: {e}")
+            price = loop.create_future()
+            price.set_result(None)
+            return {'error': str(e)}, price
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+        async def extract_price():
+            logger.info("💰 Извлечение цены...")
+            car_data['lusaka_price'] = await self._extract_lusaka_price_async(doc)
+            logger.info(f"✅ Цена получена: {car_data['lusaka_price']}")
+            if self.car_cache:
+                await asyncio.to_thread(self.car_cache.put, key, car_data)
+            return car_data['lusaka_price']
 
-            car_data = {
-                'car_name': None,
-                'specs': {},
-                'lusaka_price': None,  # Цена доставки (Dar es Salaam RORO)
-                'photo_download_url': None,
-                'photo_urls': [],  # Для второй версии
-                'url': url
-            }
+        return car_data, asyncio.create_task(extract_price())
+
+    def _get_cached_car_data(self, url: str) -> Tuple[str, Optional[Dict], bool]:
+        """Ищет объявление в кэше
+
+        Returns:
+            (ключ объявления, данные или None, нужно ли обновить цену в фоне)
+        """
+        key = canonical_stock_key(url)
+        cached = self.car_cache.get(key)
+
+        if cached and cached['data_age'] < config.CAR_CACHE_DATA_TTL:
+            car_data = dict(cached['data'], lusaka_price=cached['price'], url=url)
+
+            if cached['price_age'] < price_ttl(cached['price']):
+                self.car_cache.stats['hit'] += 1
+                logger.info(f"⚡ Кэш: {key} (цена {cached['price_age'] / 60:.0f} мин назад) {self.car_cache.stats}")
+                return key, car_data, False
+
+            if cached['price_age'] < config.CAR_CACHE_PRICE_STALE_TTL:
+                self.car_cache.stats['stale_price'] += 1
+                logger.info(f"⚡ Кэш: {key}, цена устарела - обновляем в фоне {self.car_cache.stats}")
+                return key, car_data, True
+
+        self.car_cache.stats['miss'] += 1
+        return key, None, False
+
+    def _claim_refresh(self, key: str) -> bool:
+        """Отмечает ключ как обновляемый (False - обновление уже идёт)"""
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
 
-            # Название автомобиля
-            logger.info("📝 Извлечение названия автомобиля...")
-            car_data['car_name'] = self._extract_car_name(soup)
-            logger.info(f"✅ Название: {car_data['car_name']}")
+    def _release_refresh(self, key: str):
+        with self._refreshing_lock:
+            self._refreshing.discard(key)
 
-            # Характеристики
-            logger.info("📋 Извлечение характеристик...")
-            car_data['specs'] = self._extract_specs(soup)
-            logger.info(f"✅ Характеристики получены: {len(car_data['specs'])} полей")
+    def _refresh_in_background(self, key: str, url: str):
+        """Перепарсивает объявление в фоне и обновляет кэш (одно обновление на ключ)"""
+        if not self._claim_refresh(key):
+            return
+
+        def refresh():
+            try:
+                car_data = self._parse_car_data_uncached(url)
+                if 'error' not in car_data:
+                    self.car_cache.put(key, car_data)
+                    logger.info(f"🔄 Кэш обновлён в фоне: {key}, цена {car_data.get('lusaka_price')}")
+            finally:
+                self._release_refresh(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def _refresh_in_background_async(self, key: str, url: str):
+        """Async вариант _refresh_in_background - задача в текущем event loop"""
+        if not self._claim_refresh(key):
+            return
+
+        async def refresh():
+            try:
+                car_data = await self._parse_car_data_uncached_async(url)
+                if 'error' not in car_data:
+                    await asyncio.to_thread(self.car_cache.put, key, car_data)
+                    logger.info(f"🔄 Кэш обновлён в фоне: {key}, цена {car_data.get('lusaka_price')}")
+            finally:
+                self._release_refresh(key)
+
+        # Ссылка на задачу держится до её завершения - иначе её может собрать GC
+        task = asyncio.create_task(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _parse_car_data_uncached(self, url: str) -> Dict:
+        """Парсит данные автомобиля с BeForward"""
+        try:
+            # Добавляем параметр для Замбии чтобы получить африканские порты
+            url_with_zambia = self._add_zambia_country_param(url)
+            logger.info(f"🌍 URL с параметром страны: {url_with_zambia}")
+
+            # Страница скачивается один раз - дальше все шаги работают с документом
+            doc = self._fetch_document(url_with_zambia)
+            car_data = self._extract_page_data(doc, url)
 
-            # Цена для Dar es Salaam (RORO) - используем Selenium для точности
+            # Цена для Dar es Salaam (RORO) - из HTML, Playwright только как fallback
             logger.info("💰 Извлечение цены...")
-            car_data['lusaka_price'] = self._extract_lusaka_price(url_with_zambia)
+            car_data['lusaka_price'] = self._extract_lusaka_price(doc)
             logger.info(f"✅ Цена получена: {car_data['lusaka_price']}")
 
-            # Ссылка на скачивание фото
-            logger.info("📸 Извлечение ссылки на фото...")
-            car_data['photo_download_url'] = self._extract_photo_download_url(soup)
-            logger.info(f"✅ Ссылка на фото: {car_data['photo_download_url']}")
+            logger.info("✅ Парсинг завершён успешно")
+            return car_data
+            
+        except Exception as e:
+            logger.error(f"Ошибка парсинга: {e}")
+            return {'error': str(e)}
+
+    async def _parse_car_data_uncached_async(self, url: str) -> Dict:
+        """Async вариант _parse_car_data_uncached"""
+        try:
+            url_with_zambia = self._add_zambia_country_param(url)
+            logger.info(f"🌍 URL с параметром страны: {url_with_zambia}")
+
+            doc = await self._fetch_document_async(url_with_zambia)
+            car_data = self._extract_page_data(doc, url)
 
-            # Если вторая версия, собираем ссылки на фото
-            if car_data['photo_download_url'] == "COLLECT_PHOTOS":
-                car_data['photo_urls'] = self._collect_photo_urls(soup)
+            logger.info("💰 Извлечение цены...")
+            car_data['lusaka_price'] = await self._extract_lusaka_price_async(doc)
+            logger.info(f"✅ Цена получена: {car_data['lusaka_price']}")
 
             logger.info("✅ Парсинг завершён успешно")
             return car_data
-            
+
         except Exception as e:
             logger.error(f"Ошибка парсинга: {e}")
             return {'error': str(e)}
-    
-    def _extract_car_name(self, soup: BeautifulSoup) -> Optional[str]:
+
+    def _extract_page_data(self, doc: PageDocument, url: str) -> Dict:
+        """Извлекает из страницы всё, кроме цены
+
+        Args:
+            doc: Скачанная страница автомобиля
+            url: Исходная ссылка пользователя
+
+        Returns:
+            car_data с пустой lusaka_price
+        """
+        car_data = {
+            'car_name': None,
+            'specs': {},
+            'lusaka_price': None,  # Цена доставки (Dar es Salaam RORO)
+            'photo_download_url': None,
+            'photo_urls': [],  # Для второй версии
+            'url': url
+        }
+
+        # Название автомобиля
+        logger.info("📝 Извлечение названия автомобиля...")
+        car_data['car_name'] = self._extract_car_name(doc)
+        logger.info(f"✅ Название: {car_data['car_name']}")
+
+        # Характеристики
+        logger.info("📋 Извлечение характеристик...")
+        car_data['specs'] = self._extract_specs(doc)
+        logger.info(f"✅ Характеристики получены: {len(car_data['specs'])} полей")
+
+        # Ссылка на скачивание фото
+        logger.info("📸 Извлечение ссылки на фото...")
+        car_data['photo_download_url'] = self._extract_photo_download_url(doc)
+        logger.info(f"✅ Ссылка на фото: {car_data['photo_download_url']}")
+
+        # Если вторая версия, собираем ссылки на фото
+        if car_data['photo_download_url'] == "COLLECT_PHOTOS":
+            car_data['photo_urls'] = self._collect_photo_urls(doc)
+
+        return car_data
+
+    def _fetch_document(self, url: str) -> PageDocument:
+        """Скачивает страницу автомобиля
+
+        Args:
+            url: URL страницы (с tp_country_id)
+
+        Returns:
+            PageDocument с байтами и распарсенным деревом
+        """
+        if self.http_cache:
+            # Страница всегда ревалидируется: цена на ней меняется в пределах max-age,
+            # а сроки жизни цены задаёт кэш объявлений (CAR_CACHE_*_TTL)
+            with self.http_cache.get(url, timeout=config.REQUEST_TIMEOUT, revalidate=True) as response:
+                return PageDocument(url, response.content, response.headers.get('Content-Type'))
+
+        response = self.session.get(url, timeout=config.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return PageDocument(url, response.content, response.headers.get('Content-Type'))
+
+    async def _get_aio_session(self) -> aiohttp.ClientSession:
+        """Async HTTP сессия с пулом соединений (создаётся в event loop бота)"""
+        if self._aio_session is None or self._aio_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=config.ASYNC_HTTP_POOL_SIZE,
+                limit_per_host=config.ASYNC_HTTP_POOL_SIZE_PER_HOST,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._aio_session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': config.USER_AGENT}
+            )
+        return self._aio_session
+
+    async def _fetch_document_async(self, url: str) -> PageDocument:
+        """Async вариант _fetch_document
+
+        HTML разбирается в executor - парсинг большой страницы занимает
+        сотни миллисекунд и не должен останавливать event loop.
+        """
+        session = await self._get_aio_session()
+
+        if self.http_cache:
+            with await self.http_cache.get_async(
+                session, url, timeout=config.REQUEST_TIMEOUT, revalidate=True
+            ) as response:
+                content = await asyncio.to_thread(response.read)
+                content_type = response.headers.get('Content-Type')
+        else:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=config.REQUEST_TIMEOUT)) as response:
+                response.raise_for_status()
+                content = await response.read()
+                content_type = response.headers.get('Content-Type')
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, PageDocument, url, content, content_type)
+
+    async def fetch_photo_urls_async(self, photo_urls: List[str]) -> List[Tuple[str, bytes]]:
+        """Параллельно скачивает фото по ссылкам (вторая версия страницы)
+
+        Args:
+            photo_urls: Ссылки на фото в порядке слайдера
+
+        Returns:
+            Список (имя файла, байты фото) в исходном порядке, без неудачных
+        """
+        session = await self._get_aio_session()
+        fetcher = PhotoFetcher(session)
+        results = await fetcher.fetch_all(photo_urls)
+        return [
+            (photo_filename(idx, url), content)
+            for idx, (url, content) in enumerate(zip(photo_urls, results))
+            if content is not None
+        ]
+
+    async def aclose(self):
+        """Закрывает async HTTP сессию (вызывается в event loop бота при остановке)"""
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+
+    def _extract_car_name(self, doc: PageDocument) -> Optional[str]:
         """Извлекает название автомобиля"""
         # Первая версия страницы
         h1_selector_v1 = "#list-detail > div.list-detail-right.list-detail-right-renewal > div.car-info-area.cf > div.car-info-flex-area > div > div > h1"
-        h1_elem = soup.select_one(h1_selector_v1)
+        h1_elem = doc.select_one(h1_selector_v1)
         
-        if h1_elem:
-            return h1_elem.get_text(strip=True)
+        if h1_elem is not None:
+            return doc.text(h1_elem)
         
         # Вторая версия страницы - раздельные селекторы
-        make_elem = soup.select_one("#content > h1 > div.make")
-        model_elem = soup.select_one("#content > h1 > div.model-year")
+        make_elem = doc.select_one("#content > h1 > div.make")
+        model_elem = doc.select_one("#content > h1 > div.model-year")
         
-        if make_elem and model_elem:
-            make = make_elem.get_text(strip=True)
-            model_text = model_elem.get_text(strip=True)
+        if make_elem is not None and model_elem is not None:
+            make = doc.text(make_elem)
+            model_text = doc.text(model_elem)
             
             # Если есть "part model:", берем только первую строку
             if "part model:" in model_text.lower():
@@ -208,10 +596,10 @@ class BeForwardParser:
         
         # Если раздельные не найдены, попробовать общий h1
         h1_selector_v2 = "#content > h1"
-        h1_elem = soup.select_one(h1_selector_v2)
+        h1_elem = doc.select_one(h1_selector_v2)
         
-        if h1_elem:
-            return h1_elem.get_text(strip=True)
+        if h1_elem is not None:
+            return doc.text(h1_elem)
         
         return None
     
@@ -232,19 +620,96 @@ class BeForwardParser:
             return re.sub(r'tp_country_id=\d+', country_param, url)
         return f'{url}?{country_param}'
     
-    def _extract_lusaka_price(self, url: str) -> Optional[str]:
-        """Извлекает цену для DAR ES SALAAM используя Playwright"""
+    def _extract_lusaka_price(self, doc: PageDocument) -> Optional[str]:
+        """Извлекает цену для DAR ES SALAAM
+
+        Основной путь - чистый HTTP (цена из уже скачанного HTML), Chromium
+        запускается только если в HTML цены нет.
 
-        if PLAYWRIGHT_AVAILABLE:
-            # Playwright - стабильный JS-рендеринг
-            price = self._extract_price_with_playwright(url)
-            if price and price != "ASK":
-                return price
-            logger.warning("⚠️ Playwright вернул ASK")
+        Args:
+            doc: Скачанная страница автомобиля
+
+        Returns:
+            Цена, "ASK" или None
+        """
+        http_price = self._http_price(doc)
+        if not self._needs_browser_price(http_price):
+            return http_price
+
+        return self._browser_price_result(http_price, self._extract_price_with_playwright(doc))
+
+    async def _extract_lusaka_price_async(self, doc: PageDocument) -> Optional[str]:
+        """Async вариант _extract_lusaka_price - Playwright ждётся без блокировки потока"""
+        http_price = self._http_price(doc)
+        if not self._needs_browser_price(http_price):
+            return http_price
+
+        try:
+            price = await self.browser_service.run_async(
+                self._fetch_price_with_playwright,
+                doc,
+                timeout=config.PLAYWRIGHT_PRICE_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка Playwright: {e}")
+            price = None
+        finally:
+            logger.info(f"📊 Browser service: {self.browser_service.stats()}")
+
+        return self._browser_price_result(http_price, price)
+
+    def _http_price(self, doc: PageDocument) -> Optional[str]:
+        """Цена из модального окна в уже скачанном HTML (без браузера)"""
+        try:
+            return self._extract_price_from_document(doc)
+        except Exception as e:
+            logger.error(f"Ошибка извлечения цены: {e}")
+            return None
+
+    def _needs_browser_price(self, http_price: Optional[str]) -> bool:
+        """Нужен ли Playwright fallback (False - итоговая цена уже http_price)"""
+        if self._is_valid_price(http_price):
+            self._count_price_source('http')
+            return False
 
-        # Fallback - BeautifulSoup
-        logger.warning("⚠️ Используем BeautifulSoup fallback")
-        return self._extract_price_with_bs4(url)
+        # Playwright - редкий путь для страниц, где цену подставляет JS
+        if not PLAYWRIGHT_AVAILABLE:
+            self._count_price_source('not_found')
+            return False
+
+        logger.warning(f"⚠️ HTTP не нашёл цену ({http_price}), используем Playwright")
+        self.price_stats['playwright_attempts'] += 1
+        return True
+
+    def _browser_price_result(self, http_price: Optional[str], price: Optional[str]) -> Optional[str]:
+        """Итог Playwright fallback: его цена или то, что нашлось в HTML (ASK/None)"""
+        if self._is_valid_price(price):
+            self._count_price_source('playwright')
+            return price
+
+        logger.warning("⚠️ Playwright вернул ASK")
+        self._count_price_source('not_found')
+        return http_price
+
+    def _is_valid_price(self, price_text: Optional[str]) -> bool:
+        """Проверяет, что строка - настоящая цена, а не ASK/пусто"""
+        return bool(price_text) and price_text != "ASK" and "$" in price_text
+
+    def _count_price_source(self, source: str):
+        """Увеличивает счётчик итога поиска цены и пишет статистику fallback
+
+        Частота fallback - доля поисков, где запускался Playwright (не только
+        успешных); успешность - доля этих запусков, нашедших цену.
+        """
+        self.price_stats[source] += 1
+        lookups = self.price_stats['http'] + self.price_stats['playwright'] + self.price_stats['not_found']
+        attempts = self.price_stats['playwright_attempts']
+        fallback_rate = attempts / lookups * 100
+        success_rate = self.price_stats['playwright'] / attempts * 100 if attempts else 0.0
+        logger.info(
+            f"📊 Источники цены: {self.price_stats} "
+            f"(Playwright fallback: {fallback_rate:.0f}% поисков, находит цену: {success_rate:.0f}%)"
+        )
 
     def _extract_price_with_selenium(self, url: str) -> Optional[str]:
         """Извлекает цену используя Selenium (дожидается JS)"""
@@ -308,17 +773,20 @@ class BeForwardParser:
                 except:
                     pass
 
-    def _extract_price_with_playwright(self, url: str) -> Optional[str]:
+    def _extract_price_with_playwright(self, doc: PageDocument) -> Optional[str]:
         """Извлекает цену используя Playwright (стабильный JS-рендеринг)"""
         try:
             logger.info("🌐 Загрузка страницы через Playwright...")
 
-            # Запускаем в отдельном потоке, чтобы избежать конфликта event loops
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(self._run_playwright_in_thread, url)
-                result = future.result(timeout=30)
-                return result
+            # Браузеры живут в event loop сервиса (один долгоживущий поток)
+            try:
+                return self.browser_service.call(
+                    self._fetch_price_with_playwright,
+                    doc,
+                    timeout=config.PLAYWRIGHT_PRICE_TIMEOUT
+                )
+            finally:
+                logger.info(f"📊 Browser service: {self.browser_service.stats()}")
 
         except Exception as e:
             logger.error(f"❌ Ошибка Playwright: {e}")
@@ -326,228 +794,234 @@ class BeForwardParser:
             logger.error(traceback.format_exc())
             return None
 
-    def _run_playwright_in_thread(self, url: str) -> Optional[str]:
-        """Запускает Playwright в отдельном потоке с новым event loop"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(self._fetch_price_with_playwright(url))
-            return result
-        finally:
-            loop.close()
+    async def _fetch_price_with_playwright(self, doc: PageDocument) -> Optional[str]:
+        """Async метод для Playwright парсинга (браузер берётся из пула)"""
+        # HTML страницы уже скачан - отдаём его браузеру из памяти, с сервера грузятся только скрипты
+        if config.PLAYWRIGHT_REUSE_HTML:
+            page_context = self.browser_service.pool.page(
+                document_url=doc.url,
+                document_body=doc.content,
+                document_content_type=doc.content_type
+            )
+        else:
+            page_context = self.browser_service.pool.page()
 
-    async def _fetch_price_with_playwright(self, url: str) -> Optional[str]:
-        """Async метод для Playwright парсинга"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        async with page_context as page:
+            # Загружаем страницу (domcontentloaded быстрее чем networkidle)
+            await page.goto(doc.url, wait_until='domcontentloaded', timeout=30000)
 
-            # Устанавливаем user-agent чтобы не блокировали
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            })
+            # Ждем появления модального окна с ценами
+            await page.wait_for_selector('#change-country-port-modal', timeout=15000)
 
+            # МЕТОД 1: #selected_total_price - ждём ровно до момента, когда JS подставит цену
             try:
-                # Загружаем страницу (domcontentloaded быстрее чем networkidle)
-                await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-
-                # Ждем появления модального окна с ценами
-                await page.wait_for_selector('#change-country-port-modal', timeout=15000)
-
-                # Даем время JS отработать
-                await page.wait_for_timeout(2000)
+                price_text = await self._wait_for_selected_price(page)
+                if price_text:
+                    logger.info(f"✅ Playwright: цена из #selected_total_price: {price_text}")
+                    return price_text
+            except:
+                pass
 
-                # МЕТОД 1: #selected_total_price
-                try:
-                    price_elem = await page.query_selector('#selected_total_price')
-                    if price_elem:
-                        price_text = await price_elem.inner_text()
-                        price_text = price_text.strip()
-                        if price_text and price_text != "ASK" and "$" in price_text:
-                            logger.info(f"✅ Playwright: цена из #selected_total_price: {price_text}")
-                            await browser.close()
-                            return price_text
-                except:
-                    pass
+            # МЕТОД 2: Ищем checked radio и его цену
+            try:
+                checked_input = await page.query_selector('input[type="radio"][checked]')
+                if checked_input:
+                    # Получаем родительский tr
+                    parent_row = await checked_input.evaluate_handle('el => el.closest("tr")')
+                    # Ищем цену в строке
+                    price_span = await parent_row.query_selector('span.fn-total-price-display')
+                    if price_span:
+                        price_text = await price_span.inner_text()
+                        price_text = price_text.strip().replace('\xa0', '').replace(' ', '')
+                        logger.info(f"✅ Playwright: цена из checked input: {price_text}")
+                        return price_text
+            except:
+                pass
 
-                # МЕТОД 2: Ищем checked radio и его цену
-                try:
-                    checked_input = await page.query_selector('input[type="radio"][checked]')
-                    if checked_input:
-                        # Получаем родительский tr
-                        parent_row = await checked_input.evaluate_handle('el => el.closest("tr")')
-                        # Ищем цену в строке
-                        price_span = await parent_row.query_selector('span.fn-total-price-display')
-                        if price_span:
-                            price_text = await price_span.inner_text()
-                            price_text = price_text.strip().replace('\xa0', '').replace(' ', '')
-                            logger.info(f"✅ Playwright: цена из checked input: {price_text}")
-                            await browser.close()
-                            return price_text
-                except:
-                    pass
+            logger.warning("⚠️ Playwright: цена не найдена")
+            return "ASK"
 
-                await browser.close()
-                logger.warning("⚠️ Playwright: цена не найдена")
-                return "ASK"
+    async def _wait_for_selected_price(self, page) -> Optional[str]:
+        """Ждёт, пока #selected_total_price перестанет быть "ASK"
 
-            except Exception as e:
-                await browser.close()
-                raise e
+        Args:
+            page: Страница Playwright с загруженным модальным окном цен
 
-    def _extract_price_with_bs4(self, url: str) -> Optional[str]:
-        """Fallback метод извлечения цены через BeautifulSoup (старый способ)"""
+        Returns:
+            Текст цены или None (элемента нет или цена так и не появилась)
+        """
+        # Возвращает цену, 'MISSING' если элемента нет (сразу выходим), иначе продолжаем ждать
+        script = """() => {
+            const elem = document.querySelector('#selected_total_price');
+            if (!elem) return 'MISSING';
+            const text = elem.innerText.trim();
+            return (text && text !== 'ASK' && text.includes('$')) ? text : false;
+        }"""
         try:
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            # Ищем модальное окно с ценами
-            modal = soup.select_one('#change-country-port-modal')
+            handle = await page.wait_for_function(
+                script,
+                timeout=config.PLAYWRIGHT_PRICE_READY_TIMEOUT * 1000
+            )
+        except Exception:
+            logger.warning(f"⚠️ Playwright: цена не появилась за {config.PLAYWRIGHT_PRICE_READY_TIMEOUT} сек")
+            return None
 
-            if not modal:
-                logger.warning("❌ Не найдено модальное окно #change-country-port-modal")
-                return None
+        price_text = await handle.json_value()
+        if price_text == 'MISSING':
+            logger.warning("⚠️ Playwright: на странице нет #selected_total_price")
+            return None
+        return price_text
 
-            logger.info("✅ Найдено модальное окно с ценами")
+    def _extract_price_from_document(self, doc: PageDocument) -> Optional[str]:
+        """Ищет цену DAR ES SALAAM (RORO) в модальном окне цен
 
-            # МЕТОД 0: Ищем прямо #selected_total_price (самый надёжный)
-            selected_price_elem = soup.select_one('#selected_total_price')
-            if selected_price_elem:
-                price_text = selected_price_elem.get_text(strip=True)
-                logger.info(f"💰 Найдена цена через #selected_total_price: '{price_text}'")
-                price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '').replace(',', '')
-                logger.info(f"✨ Очищенная цена: '{price_text}'")
-                return price_text
-            else:
-                logger.warning("⚠️ Не найден #selected_total_price")
+        Args:
+            doc: Скачанная страница автомобиля
 
-            # МЕТОД 1: Ищем ТОЧНО выбранную строку с двумя нужными классами
-            # td.destination-selected.fn-quote-form-row-bg-selected - это ТОЧНО выбранная ячейка
-            selected_cell = modal.select_one('td.destination-selected.fn-quote-form-row-bg-selected')
+        Returns:
+            Цена, "ASK" если сервер отдал только ASK, или None
+        """
+        # Ищем модальное окно с ценами
+        modal = doc.select_one('#change-country-port-modal')
 
-            if selected_cell:
-                logger.info("✅ Найдена ТОЧНО выбранная ячейка (destination-selected + fn-quote-form-row-bg-selected)")
+        if modal is None:
+            logger.warning("❌ Не найдено модальное окно #change-country-port-modal")
+            return None
 
-                # Ищем span с ценой в этой ячейке
-                price_span = selected_cell.select_one('span.fn-total-price-display')
+        logger.info("✅ Найдено модальное окно с ценами")
 
-                if price_span:
-                    price_text = price_span.get_text(strip=True)
-                    logger.info(f"💰 Найдена цена в выбранной ячейке: '{price_text}'")
+        # МЕТОД 1: input с data-port="DAR ES SALAAM" - точно нужный порт и способ доставки
+        logger.info("🔄 Ищем input с data-port='DAR ES SALAAM'...")
 
-                    # Удаляем &nbsp; и лишние пробелы
-                    price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
-                    logger.info(f"✨ Очищенная цена: '{price_text}'")
-                    return price_text
-                else:
-                    logger.warning("⚠️ Не найден span с ценой в выбранной ячейке")
-            else:
-                logger.warning("⚠️ Не найдена точно выбранная ячейка (destination-selected + fn-quote-form-row-bg-selected)")
+        # Ищем input элементы с data-port
+        dar_inputs = doc.select('input[data-port]', modal)
+        logger.info(f"📋 Найдено input элементов с data-port: {len(dar_inputs)}")
 
-                # МЕТОД 2: Пробуем просто по destination-selected
-                selected_cell = modal.select_one('td.destination-selected')
-                if selected_cell:
-                    logger.info("✅ Найдена ячейка только по destination-selected (без bg-selected)")
+        for input_elem in dar_inputs:
+            port_name = doc.attr(input_elem, 'data-port', '')
+            port_via = doc.attr(input_elem, 'data-via', '')
+            with_clearing = doc.attr(input_elem, 'data-with-clearing', '')
 
-                    price_span = selected_cell.select_one('span.fn-total-price-display')
-                    if price_span:
-                        price_text = price_span.get_text(strip=True)
-                        logger.info(f"💰 Найдена цена: '{price_text}'")
-                        price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
-                        logger.info(f"✨ Очищенная цена: '{price_text}'")
-                        return price_text
-                else:
-                    logger.warning("⚠️ Не найдена выбранная ячейка (destination-selected)")
+            if 'DAR ES SALAAM' in port_name.upper():
+                logger.info(f"✅ Найден input: port='{port_name}', via='{port_via}', with-clearing='{with_clearing}'")
 
-            # МЕТОД 3: Ищем выбранную строку целиком, потом ячейку цены
-            selected_row = modal.select_one('tr.fn-destination-price-row-bg-selected')
-            if selected_row:
-                logger.info("✅ Найдена выбранная строка (fn-destination-price-row-bg-selected)")
+                # Пропускаем "with customs clearance" - нам нужен базовый RORO
+                if with_clearing or 'customs' in port_via.lower():
+                    logger.info("⚠️ Пропускаем - это вариант с таможенной очисткой")
+                    continue
 
-                # Ищем ячейку с ценой в этой строке
-                price_cell = selected_row.select_one('td.table-total-price')
-                if price_cell:
-                    price_span = price_cell.select_one('span.fn-total-price-display')
-                    if price_span:
-                        price_text = price_span.get_text(strip=True)
-                        logger.info(f"💰 Найдена цена через выбранную строку: '{price_text}'")
-                        price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
-                        logger.info(f"✨ Очищенная цена: '{price_text}'")
-                        return price_text
-            else:
-                logger.warning("⚠️ Не найдена выбранная строка (fn-destination-price-row-bg-selected)")
+                # Проверяем что это RORO
+                if 'RORO' in port_via.upper() or 'pick up at port' in port_via.lower():
+                    logger.info("✅ Это базовый RORO метод (без customs)")
 
-            # Fallback: ищем через input с data-port="DAR ES SALAAM"
-            logger.info("🔄 Ищем input с data-port='DAR ES SALAAM'...")
+                    # Ищем родительскую строку (tr)
+                    parent_row = doc.closest(input_elem, 'tr')
 
-            # Ищем input элементы с data-port
-            dar_inputs = modal.select('input[data-port]')
-            logger.info(f"📋 Найдено input элементов с data-port: {len(dar_inputs)}")
+                    if parent_row is not None:
+                        # Ищем цену в этой строке
+                        price_span = doc.select_one('span.fn-total-price-display', parent_row)
 
-            for input_elem in dar_inputs:
-                port_name = input_elem.get('data-port', '')
-                port_via = input_elem.get('data-via', '')
-                with_clearing = input_elem.get('data-with-clearing', '')
+                        if price_span is not None:
+                            price_text = doc.text(price_span)
+                            price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
+                            logger.info(f"💰 Цена: '{price_text}'")
+                            if self._is_valid_price(price_text):
+                                return price_text
+                        else:
+                            logger.warning("⚠️ Не найден span с ценой в строке")
+                    else:
+                        logger.warning("⚠️ Не найден родительский tr для input")
+
+        # МЕТОД 2: #selected_total_price (на части страниц сервер отдаёт ASK - тогда идём дальше)
+        selected_price_elem = doc.select_one('#selected_total_price')
+        asked = False
+        if selected_price_elem is not None:
+            price_text = doc.text(selected_price_elem)
+            logger.info(f"💰 Найдена цена через #selected_total_price: '{price_text}'")
+            price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '').replace(',', '')
+            logger.info(f"✨ Очищенная цена: '{price_text}'")
+            if self._is_valid_price(price_text):
+                return price_text
+            asked = price_text == "ASK"
+        else:
+            logger.warning("⚠️ Не найден #selected_total_price")
 
-                if 'DAR ES SALAAM' in port_name.upper():
-                    logger.info(f"✅ Найден input: port='{port_name}', via='{port_via}', with-clearing='{with_clearing}'")
+        # МЕТОД 3: Ищем ТОЧНО выбранную строку с двумя нужными классами
+        # td.destination-selected.fn-quote-form-row-bg-selected - это ТОЧНО выбранная ячейка
+        selected_cell = doc.select_one('td.destination-selected.fn-quote-form-row-bg-selected', modal)
 
-                    # Пропускаем "with customs clearance" - нам нужен базовый RORO
-                    if with_clearing or 'customs' in port_via.lower():
-                        logger.info("⚠️ Пропускаем - это вариант с таможенной очисткой")
-                        continue
+        if selected_cell is not None:
+            logger.info("✅ Найдена ТОЧНО выбранная ячейка (destination-selected + fn-quote-form-row-bg-selected)")
+        else:
+            logger.warning("⚠️ Не найдена точно выбранная ячейка (destination-selected + fn-quote-form-row-bg-selected)")
 
-                    # Проверяем что это RORO
-                    if 'RORO' in port_via.upper() or 'pick up at port' in port_via.lower():
-                        logger.info("✅ Это базовый RORO метод (без customs)")
+            # Пробуем просто по destination-selected
+            selected_cell = doc.select_one('td.destination-selected', modal)
+            if selected_cell is not None:
+                logger.info("✅ Найдена ячейка только по destination-selected (без bg-selected)")
+            else:
+                logger.warning("⚠️ Не найдена выбранная ячейка (destination-selected)")
 
-                        # Ищем родительскую строку (tr)
-                        parent_row = input_elem.find_parent('tr')
+        if selected_cell is not None:
+            # Ищем span с ценой в этой ячейке
+            price_span = doc.select_one('span.fn-total-price-display', selected_cell)
 
-                        if parent_row:
-                            # Ищем цену в этой строке
-                            price_span = parent_row.select_one('span.fn-total-price-display')
+            if price_span is not None:
+                price_text = doc.text(price_span)
+                logger.info(f"💰 Найдена цена в выбранной ячейке: '{price_text}'")
 
-                            if price_span:
-                                price_text = price_span.get_text(strip=True)
-                                price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
-                                logger.info(f"💰 Цена: '{price_text}'")
-                                return price_text
-                            else:
-                                logger.warning("⚠️ Не найден span с ценой в строке")
-                        else:
-                            logger.warning("⚠️ Не найден родительский tr для input")
+                # Удаляем &nbsp; и лишние пробелы
+                price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
+                logger.info(f"✨ Очищенная цена: '{price_text}'")
+                if self._is_valid_price(price_text):
+                    return price_text
+            else:
+                logger.warning("⚠️ Не найден span с ценой в выбранной ячейке")
+
+        # МЕТОД 4: Ищем выбранную строку целиком, потом ячейку цены
+        selected_row = doc.select_one('tr.fn-destination-price-row-bg-selected', modal)
+        if selected_row is not None:
+            logger.info("✅ Найдена выбранная строка (fn-destination-price-row-bg-selected)")
+
+            # Ищем ячейку с ценой в этой строке
+            price_cell = doc.select_one('td.table-total-price', selected_row)
+            if price_cell is not None:
+                price_span = doc.select_one('span.fn-total-price-display', price_cell)
+                if price_span is not None:
+                    price_text = doc.text(price_span)
+                    logger.info(f"💰 Найдена цена через выбранную строку: '{price_text}'")
+                    price_text = price_text.replace('\xa0', '').replace('&nbsp;', '').replace(' ', '')
+                    logger.info(f"✨ Очищенная цена: '{price_text}'")
+                    if self._is_valid_price(price_text):
+                        return price_text
+        else:
+            logger.warning("⚠️ Не найдена выбранная строка (fn-destination-price-row-bg-selected)")
 
-            logger.error("❌ Не удалось найти цену для DAR ES SALAAM")
-            return None
+        logger.error("❌ Не удалось найти цену для DAR ES SALAAM в HTML")
+        return "ASK" if asked else None
 
-        except Exception as e:
-            logger.error(f"Ошибка извлечения цены: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return None
-    
-    def _extract_specs(self, soup: BeautifulSoup) -> Dict:
+    def _extract_specs(self, doc: PageDocument) -> Dict:
         """Извлекает характеристики"""
         specs = {}
         
         # Первая версия страницы
-        table_elem = soup.select_one("#spec > table")
+        table_elem = doc.select_one("#spec > table")
         
-        if not table_elem:
+        if table_elem is None:
             # Вторая версия страницы
-            table_elem = soup.select_one("#content > div.specs > table")
+            table_elem = doc.select_one("#content > div.specs > table")
         
-        if table_elem:
-            rows = table_elem.find_all('tr')
+        if table_elem is not None:
+            rows = doc.select('tr', table_elem)
             
             for row in rows:
-                cells = row.find_all(['td', 'th'])
+                cells = doc.select('td, th', row)
                 
                 # Обрабатываем все ячейки парами
                 i = 0
                 while i < len(cells) - 1:
-                    key = cells[i].get_text(strip=True)
-                    value = cells[i + 1].get_text(strip=True)
+                    key = doc.text(cells[i])
+                    value = doc.text(cells[i + 1])
                     
                     # Проверяем условия фильтрации
                     if key and value:
@@ -579,40 +1053,46 @@ class BeForwardParser:
         
         return specs
 
-    def _extract_photo_download_url(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_photo_download_url(self, doc: PageDocument) -> Optional[str]:
         """Извлекает ссылку на скачивание фото"""
         # Первая версия - прямая кнопка скачивания
         download_selector = "#list-detail > div.list-detail-left.list-detail-left-renewal > div.vehicle-share-content > div.dl-pic-area > a"
-        download_link = soup.select_one(download_selector)
+        download_link = doc.select_one(download_selector)
         
-        if download_link:
-            href = download_link.get('href')
+        if download_link is not None:
+            href = doc.attr(download_link, 'href')
             if href and href.startswith('/'):
                 return "https://www.beforward.jp" + href
             return href
         
         # Вторая версия - собираем фото из слайдера
-        slider_wrapper = soup.select_one("#vehicle-photo-slider > div.swiper-wrapper")
-        if slider_wrapper:
-            slides = slider_wrapper.select("div.swiper-slide")
+        slider_wrapper = doc.select_one("#vehicle-photo-slider > div.swiper-wrapper")
+        if slider_wrapper is not None:
+            slides = doc.select("div.swiper-slide", slider_wrapper)
             if slides:
                 # Возвращаем специальный маркер, что нужно собирать фото
                 return "COLLECT_PHOTOS"
         
         return None
     
-    def _collect_photo_urls(self, soup: BeautifulSoup) -> list:
+    def _collect_photo_urls(self, doc: PageDocument) -> list:
         """Собирает ссылки на фото из слайдера"""
         photo_urls = []
-        slider_wrapper = soup.select_one("#vehicle-photo-slider > div.swiper-wrapper")
+        slider_wrapper = doc.select_one("#vehicle-photo-slider > div.swiper-wrapper")
 
-        if slider_wrapper:
-            slides = slider_wrapper.select("div.swiper-slide")
+        if slider_wrapper is not None:
+            slides = doc.select("div.swiper-slide", slider_wrapper)
             for slide in slides:
                 # Ищем img в слайде
-                img = slide.select_one("img")
-                if img and img.get("src"):
-                    img_src = img.get("src")
+                img = doc.select_one("img", slide)
+                if img is None:
+                    continue
+
+                # src и data-src (для lazy loading)
+                for attr_name in ("src", "data-src"):
+                    img_src = doc.attr(img, attr_name)
+                    if not img_src:
+                        continue
                     # Если относительная ссылка, делаем абсолютной
                     if img_src.startswith("//"):
                         img_src = "https:" + img_src
@@ -620,15 +1100,6 @@ class BeForwardParser:
                         img_src = "https://www.beforward.jp" + img_src
                     photo_urls.append(img_src)
 
-                # Также ищем data-src (для lazy loading)
-                if img and img.get("data-src"):
-                    img_src = img.get("data-src")
-                    if img_src.startswith("//"):
-                        img_src = "https:" + img_src
-                    elif img_src.startswith("/"):
-                        img_src = "https://www.beforward.jp" + img_src
-                    photo_urls.append(img_src)
-
         # Убираем дубли с сохранением порядка
         seen = set()
         unique_photos = []
@@ -639,42 +1110,6 @@ class BeForwardParser:
 
         return unique_photos
 
-    def _select_photos_smart(self, photo_paths: list) -> list:
-        """
-        Умный выбор фото по правилам:
-        1-20 фото: все фото
-        21-29 фото: первые 10 + последние 10
-        30+ фото: первые 10 + фото с 20 по 30
-
-        Args:
-            photo_paths: Список путей к фото (отсортированный)
-
-        Returns:
-            Список выбранных путей (всегда ≤ 20)
-        """
-        total = len(photo_paths)
-
-        # 1-20 фото: берём все
-        if total <= 20:
-            logger.info(f"📸 Выбрано {total} фото (все доступные)")
-            return photo_paths
-
-        # 21-29 фото: первые 10 + последние 10
-        elif total < 30:
-            first_10 = photo_paths[:10]
-            last_10 = photo_paths[-10:]
-            selected = first_10 + last_10
-            logger.info(f"📸 Выбрано 20 фото из {total}: первые 10 + последние 10")
-            return selected
-
-        # 30+ фото: первые 10 + фото с 20 по 30
-        else:
-            first_10 = photo_paths[:10]
-            middle_10 = photo_paths[19:29]  # индексы 19-28 = фото 20-29
-            selected = first_10 + middle_10
-            logger.info(f"📸 Выбрано 20 фото из {total}: первые 10 + с 20 по 29")
-            return selected
-
     def _check_iopaint_server(self, iopaint_url: str) -> bool:
         """Проверяет доступность IOPaint сервера
 
@@ -691,103 +1126,132 @@ class BeForwardParser:
             )
             response.raise_for_status()
             logger.info("✅ IOPaint сервер доступен")
-            return True
         except Exception as e:
             logger.error(f"❌ IOPaint сервер не доступен на {iopaint_url}")
             logger.error("Запустите start_iopaint.bat в отдельном окне!")
+            # Сервер могли перезапустить с другими моделями - при следующей проверке спросим снова
+            self._result_models_url = None
             return False
 
-    def _create_watermark_mask(self, img_width: int, img_height: int) -> Image.Image:
-        """Создаёт маску для водяного знака
+        if self._result_models_url != iopaint_url:
+            self._update_result_models(iopaint_url, response)
+            self._result_models_url = iopaint_url
+        return True
 
-        Args:
-            img_width: Ширина изображения
-            img_height: Высота изображения
+    def _update_result_models(self, iopaint_url: str, config_response):
+        """Записывает в ключ кэша фото модели, загруженные на IOPaint сервере
 
-        Returns:
-            PIL Image с маской водяного знака
+        Args:
+            iopaint_url: URL IOPaint сервера
+            config_response: Ответ server-config (realesrganModel - модель upscale)
         """
-        mask = Image.new('L', (img_width, img_height), 0)
-        draw = ImageDraw.Draw(mask)
-
-        x1 = (img_width - config.WATERMARK_WIDTH) // 2
-        y1 = img_height - config.WATERMARK_HEIGHT
-        x2 = x1 + config.WATERMARK_WIDTH
-        y2 = img_height
+        try:
+            upscaler = config_response.json().get('realesrganModel')
+            response = self.session.get(f"{iopaint_url}{config.IOPAINT_MODEL_ENDPOINT}", timeout=5)
+            response.raise_for_status()
+            model = response.json().get('name')
+        except Exception as e:
+            logger.warning(f"⚠️ Модели IOPaint не определены ({e}), в ключе кэша {self.result_params['model']}")
+            return
 
-        draw.rectangle([x1, y1, x2, y2], fill=255)
-        return mask
+        self.result_params['upscaler'] = upscaler or config.IOPAINT_REALESRGAN_MODEL
+        self.result_params['model'] = model or config.IOPAINT_MODEL
 
-    def _image_to_base64(self, img: Image.Image) -> str:
-        """Конвертирует изображение в base64
+    def _image_to_base64(self, img: Image.Image, source: bytes = None) -> str:
+        """Конвертирует изображение в base64 (формат config.TRANSPORT_IMAGE_CODEC)
 
         Args:
             img: PIL Image объект
+            source: Исходный файл, если img - это он без изменений
 
         Returns:
             Base64 строка
         """
-        buffer = io.BytesIO()
-        if img.mode == 'RGBA':
-            img = img.convert('RGB')
-        img.save(buffer, format='PNG')
-        return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        return to_base64(encode_image(img, source=source))
 
     def _remove_watermark(
         self,
         img: Image.Image,
-        iopaint_url: str
+        iopaint_url: str,
+        source: bytes = None
     ) -> Optional[Image.Image]:
         """Удаляет водяной знак с изображения через IOPaint
 
         Args:
             img: PIL Image объект
             iopaint_url: URL IOPaint сервера
+            source: Исходный файл фото (для передачи JPEG как есть в режиме full)
 
         Returns:
             Изображение без водяного знака или None при ошибке
         """
         try:
-            img_width, img_height = img.size
-
-            # Конвертируем изображение и маску в base64
-            img_base64 = self._image_to_base64(img)
-            mask = self._create_watermark_mask(img_width, img_height)
-            mask_base64 = self._image_to_base64(mask)
-
-            # Отправляем в IOPaint
-            payload = {
-                'image': img_base64,
-                'mask': mask_base64,
-                'ldmSampler': 'plms',
-                'hdStrategy': 'Original',
-            }
-
-            response = self.session.post(
-                f"{iopaint_url}{config.IOPAINT_INPAINT_ENDPOINT}",
-                json=payload,
-                timeout=config.INPAINT_TIMEOUT
+            # В режиме config.INPAINT_MODE=crop в IOPaint уходит только область вокруг знака
+            mask_base64 = encoded_watermark_mask(img.size[0], img.size[1])
+            return inpaint_watermark(
+                img,
+                lambda image, mask: self._inpaint_request(
+                    image, mask, iopaint_url, source if image is img else None, mask_base64
+                )
             )
 
-            if response.status_code != 200:
-                logger.error(f"❌ Ошибка удаления водяного знака: HTTP {response.status_code}")
-                logger.error(f"Response: {response.text[:500]}")
-                return None
-
-            # IOPaint API возвращает изображение напрямую в виде байтов (PNG)
-            # Согласно документации: сервер конвертирует BGR->RGB, добавляет альфа-канал
-            # и возвращает закодированные байты изображения
-            result_bytes = response.content
-            logger.info(f"✅ Получено {len(result_bytes)} байт от IOPaint")
-
-            return Image.open(io.BytesIO(result_bytes))
-
         except Exception as e:
             logger.error(f"❌ Ошибка при удалении водяного знака: {e}")
             import traceback
             logger.error(traceback.format_exc())
             return None
 
+    def _inpaint_request(
+        self,
+        img: Image.Image,
+        mask: Image.Image,
+        iopaint_url: str,
+        source: bytes = None,
+        mask_base64: str = None
+    ) -> Optional[Image.Image]:
+        """Отправляет изображение и маску в IOPaint
+
+        Args:
+            img: Изображение (целиком или область вокруг знака)
+            mask: Маска того же размера
+            iopaint_url: URL IOPaint сервера
+            source: Исходный файл, если img - это он без изменений
+            mask_base64: Уже закодированная маска (из кэша масок)
+
+        Returns:
+            Результат inpainting или None при ошибке
+        """
+        # Конвертируем изображение и маску в base64
+        img_base64 = self._image_to_base64(img, source)
+        mask_base64 = mask_base64 or to_base64(encode_mask(mask))
+
+        # Отправляем в IOPaint
+        payload = {
+            'image': img_base64,
+            'mask': mask_base64,
+            'ldmSampler': 'plms',
+            'hdStrategy': 'Original',
+        }
+
+        response = self.session.post(
+            f"{iopaint_url}{config.IOPAINT_INPAINT_ENDPOINT}",
+            json=payload,
+            timeout=config.INPAINT_TIMEOUT
+        )
+
+        if response.status_code != 200:
+            logger.error(f"❌ Ошибка удаления водяного знака: HTTP {response.status_code}")
+            logger.error(f"Response: {response.text[:500]}")
+            return None
+
+        # IOPaint API возвращает изображение напрямую в виде байтов (PNG)
+        # Согласно документации: сервер конвертирует BGR->RGB, добавляет альфа-канал
+        # и возвращает закодированные байты изображения
+        result_bytes = response.content
+        logger.info(f"✅ Получено {len(result_bytes)} байт от IOPaint")
+
+        return Image.open(io.BytesIO(result_bytes))
+
     def _upscale_image(
         self,
         img: Image.Image,
@@ -834,7 +1298,8 @@ class BeForwardParser:
 
     def _process_single_image(
         self,
-        image_path: str,
+        image_bytes: bytes,
+        filename: str,
         output_dir: str,
         iopaint_url: str,
         idx: int,
@@ -843,7 +1308,8 @@ class BeForwardParser:
         """Обрабатывает одно изображение: удаление водяного знака + upscaling
 
         Args:
-            image_path: Путь к исходному изображению
+            image_bytes: Исходное изображение (прочитано прямо из архива)
+            filename: Имя файла фото
             output_dir: Директория для сохранения результата
             iopaint_url: URL IOPaint сервера
             idx: Индекс текущего изображения
@@ -852,18 +1318,29 @@ class BeForwardParser:
         Returns:
             True если обработка успешна, False иначе
         """
-        filename = os.path.basename(image_path)
         img = None  # Для finally блока
+        output_path = os.path.join(output_dir, filename)
 
         try:
+            # Это фото уже обрабатывалось - берём результат из кэша
+            cache_key = None
+            if self.result_cache:
+                cache_key = self.result_cache.key(image_bytes, self.result_params)
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    with open(output_path, 'wb') as f:
+                        f.write(cached)
+                    logger.info(f"⚡ Из кэша {idx + 1}/{total}: {filename}")
+                    return True
+
             # Открываем изображение
-            img = Image.open(image_path)
+            img = Image.open(io.BytesIO(image_bytes))
             img_width, img_height = img.size
             logger.info(f"📸 Фото {filename}: {img_width}x{img_height}")
 
             # ШАГ 1: Удаляем водяной знак
             logger.info(f"🎭 Удаляем водяной знак...")
-            cleaned_img = self._remove_watermark(img, iopaint_url)
+            cleaned_img = self._remove_watermark(img, iopaint_url, image_bytes)
 
             if cleaned_img is None:
                 logger.error(f"❌ Не удалось удалить водяной знак с {filename}")
@@ -876,6 +1353,7 @@ class BeForwardParser:
 
             # ШАГ 2: Проверяем разрешение и делаем upscaling если нужно
             current_resolution = img_width * img_height
+            complete = True  # в кэш попадают только полностью обработанные фото
 
             if current_resolution < config.MIN_RESOLUTION:
                 logger.info(f"🔍 Разрешение {img_width}x{img_height} < Full HD - делаем upscaling...")
@@ -888,11 +1366,11 @@ class BeForwardParser:
                     logger.info(f"✨ Upscaling выполнен: {img_width}x{img_height}")
                 else:
                     logger.warning(f"⚠️ Сохраняем без upscaling")
+                    complete = False
             else:
                 logger.info(f"✅ Разрешение {img_width}x{img_height} - хорошее, upscaling не требуется")
 
             # ШАГ 3: Сохраняем результат
-            output_path = os.path.join(output_dir, filename)
             final_buffer = io.BytesIO()
 
             if img.mode == 'RGBA':
@@ -902,6 +1380,9 @@ class BeForwardParser:
             with open(output_path, 'wb') as f:
                 f.write(final_buffer.getvalue())
 
+            if cache_key and complete:
+                self.result_cache.put(cache_key, final_buffer.getvalue())
+
             logger.info(f"💾 Сохранено {idx + 1}/{total}: {filename}")
             return True
 
@@ -918,6 +1399,46 @@ class BeForwardParser:
                 except:
                     pass
 
+    def _download_selected_photos(self, photo_download_url: str, referer_url: str = None) -> List[Tuple[str, bytes]]:
+        """Скачивает архив с фото и возвращает выбранные фото (≤ 20)
+
+        С HTTP кэшем архив качается целиком и дальше ревалидируется (304),
+        без кэша - Range (только выбранные фото), затем полное скачивание.
+        Range ответы в кэш не пишутся, поэтому вместе они не используются.
+
+        Args:
+            photo_download_url: URL ZIP архива с фото
+            referer_url: Страница автомобиля (Referer для всех запросов архива)
+
+        Returns:
+            Список (имя файла, байты фото)
+        """
+        headers = {'Referer': referer_url} if referer_url else None
+
+        if config.PHOTO_RANGE_DOWNLOAD and not self.http_cache:
+            photos = read_selected_photos_ranged(
+                self.session,
+                photo_download_url,
+                headers=headers,
+                timeout=config.PHOTO_DOWNLOAD_TIMEOUT
+            )
+            if photos is not None:
+                return photos
+
+        if self.http_cache:
+            # Повторное скачивание неизменённого архива - 304 и файл из кэша
+            # (Range и потоковое скачивание пишут свои тайминги сами)
+            download_start = time.time()
+            with self.http_cache.get(photo_download_url, headers=headers, timeout=config.PHOTO_DOWNLOAD_TIMEOUT) as cached:
+                download_time = time.time() - download_start
+                file_size_mb = cached.size / (1024 * 1024)
+                logger.info(f"⏱️ Архив {file_size_mb:.2f} MB получен за {download_time:.1f} сек (HTTP кэш: {cached.cache_status})")
+                return read_selected_photos(cached.file)
+
+        # Потоковое скачивание - память ограничена config.PHOTO_DOWNLOAD_MEMORY_MB
+        with download_archive(self.session, photo_download_url, headers=headers, timeout=config.PHOTO_DOWNLOAD_TIMEOUT) as archive:
+            return read_selected_photos(archive)
+
     async def download_and_process_photos(
         self,
         photo_download_url: str,
@@ -925,17 +1446,22 @@ class BeForwardParser:
         chat_id: int = None,
         progress_message=None,
         iopaint_url: str = None,
-        car_data_text: str = None
+        car_data_text: str = None,
+        photo_urls: List[str] = None,
+        referer_url: str = None
     ) -> Optional[Tuple[bytes, List[str]]]:
         """Скачивает фото ZIP, удаляет водяные знаки через IOPaint HTTP API
 
         Args:
             photo_download_url: URL для скачивания ZIP архива с фото
+                (или "COLLECT_PHOTOS" - фото берутся из photo_urls)
             bot: Telegram Bot для отправки статуса
             chat_id: ID чата для отправки статуса
             progress_message: Сообщение для обновления прогресса
             iopaint_url: URL IOPaint сервера (по умолчанию из config)
             car_data_text: Текст с данными автомобиля для добавления в ZIP
+            photo_urls: Ссылки на фото из слайдера (вторая версия страницы)
+            referer_url: Страница автомобиля - Referer для запросов архива
 
         Returns:
             Кортеж из (ZIP архив в байтах, список путей к обработанным фото) или None при ошибке
@@ -943,19 +1469,16 @@ class BeForwardParser:
         if iopaint_url is None:
             iopaint_url = config.IOPAINT_URL
 
-        # Проверяем доступность IOPaint сервера
-        if not self._check_iopaint_server(iopaint_url):
+        # Проверяем доступность IOPaint сервера (и его модели для ключа кэша фото)
+        if not await asyncio.to_thread(self._check_iopaint_server, iopaint_url):
             return None
 
         # КРИТИЧНО: Используем TemporaryDirectory для автоматической очистки
         temp_base_dir = tempfile.TemporaryDirectory()
         try:
             temp_dir = temp_base_dir.name
-            zip_path = os.path.join(temp_dir, "photos.zip")
-            extract_dir = os.path.join(temp_dir, "extracted")
             output_dir = os.path.join(temp_dir, "cleaned")
 
-            os.makedirs(extract_dir, exist_ok=True)
             os.makedirs(output_dir, exist_ok=True)
 
             # 1. Скачиваем ZIP
@@ -971,79 +1494,28 @@ class BeForwardParser:
                 except Exception as e:
                     logger.warning(f"⚠️ Не удалось обновить статус скачивания: {e}")
 
-            # Выполняем синхронный HTTP запрос в executor
-            download_start = time.time()
             loop = asyncio.get_event_loop()
-
-            # Используем stream=True для эффективной загрузки больших файлов
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.session.get(photo_download_url, timeout=config.PHOTO_DOWNLOAD_TIMEOUT, stream=True)
-            )
-            response.raise_for_status()
-
-            # Скачиваем контент чанками
-            content_chunks = []
-            chunk_start = time.time()
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    content_chunks.append(chunk)
-            content = b''.join(content_chunks)
-
-            download_time = time.time() - download_start
-            chunk_time = time.time() - chunk_start
-
-            file_size_mb = len(content) / (1024 * 1024)
-            logger.info(f"⏱️ Скачано {file_size_mb:.2f} MB за {download_time:.1f} сек ({file_size_mb/download_time:.2f} MB/s)")
-            logger.info(f"   └─ Время на чтение контента: {chunk_time:.1f} сек, подключение: {download_time - chunk_time:.1f} сек")
-
-            with open(zip_path, 'wb') as f:
-                f.write(content)
-
-            # 2. Распаковываем
-            logger.info("📦 Распаковываем архив...")
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-
-            # 3. Находим все изображения
-            image_files = []
-            for ext in config.SUPPORTED_IMAGE_EXTENSIONS:
-                image_files.extend(
-                    glob.glob(os.path.join(extract_dir, '**', ext), recursive=True)
+            if photo_download_url == "COLLECT_PHOTOS":
+                # 2. Вторая версия: выбираем ссылки (≤ 20) и качаем их параллельно
+                image_files_limited = await self.fetch_photo_urls_async(
+                    select_photos_smart(photo_urls or [])
+                )
+            else:
+                # 2. Скачивание и выбор фото (≤ 20) - синхронные, выполняем в executor
+                image_files_limited = await loop.run_in_executor(
+                    None,
+                    self._download_selected_photos,
+                    photo_download_url,
+                    referer_url
                 )
 
-            if not image_files:
+            if not image_files_limited:
                 logger.warning("⚠️ Не найдено изображений в архиве")
                 return None
 
-            total_photos = len(image_files)
-            logger.info(f"📸 Найдено изображений: {total_photos}")
-
-            # 4. Выбираем изображения по новой логике
-            if total_photos <= 20:
-                # 1-20 фото: берём все
-                image_files_limited = image_files
-                logger.info(f"🎨 Обрабатываем все {total_photos} изображений")
-            elif total_photos < 30:
-                # 21-29 фото: первые 10 + последние 10
-                first_10 = image_files[:10]
-                last_10 = image_files[-10:]
-                image_files_limited = first_10 + last_10
-                logger.info(
-                    f"🎨 Обрабатываем 20 изображений из {total_photos}: "
-                    f"первые 10 + последние 10"
-                )
-            else:
-                # 30+ фото: первые 10 + диапазон 20-30 (индексы 19-29)
-                first_10 = image_files[:10]
-                range_20_30 = image_files[19:29]  # индексы 19-28 (фото 20-29)
-                image_files_limited = first_10 + range_20_30
-                logger.info(
-                    f"🎨 Обрабатываем 20 изображений из {total_photos}: "
-                    f"первые 10 + фото 20-29"
-                )
+            logger.info(f"🎨 Обрабатываем {len(image_files_limited)} изображений")
 
-            for idx, image_path in enumerate(image_files_limited):
+            for idx, (filename, image_bytes) in enumerate(image_files_limited):
                 # Обновляем прогресс-бар в сообщении (добавляем к спекам)
                 if progress_message and car_data_text:
                     try:
@@ -1080,7 +1552,8 @@ class BeForwardParser:
                 await loop.run_in_executor(
                     None,
                     self._process_single_image,
-                    image_path,
+                    image_bytes,
+                    filename,
                     output_dir,
                     iopaint_url,
                     idx,
@@ -1088,6 +1561,12 @@ class BeForwardParser:
                 )
 
             logger.info("✅ IOPaint обработка завершена")
+            if self.result_cache:
+                logger.info(
+                    f"🗄️ Кэш фото: {self.result_cache.stats} "
+                    f"(попаданий {self.result_cache.hit_rate:.0%})"
+                )
+            logger.info(f"🎭 Кэш масок: {mask_cache_info()}")
 
             # Обновляем прогресс на 100% (добавляем к спекам)
             if progress_message and car_data_text:
@@ -1289,8 +1768,8 @@ class TelegramBot:
                 await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
 
                 try:
-                    # Парсим данные
-                    car_data = self.parser.parse_car_data(url)
+                    # Парсим данные (async - не блокируем event loop бота)
+                    car_data = await self.parser.parse_car_data_async(url)
 
                     # Форматируем результат
                     result_text = self.parser.format_car_data(car_data, url)
@@ -1299,16 +1778,18 @@ class TelegramBot:
                     cleaned_zip = None
                     cleaned_photos_paths = None
 
-                    if car_data.get('photo_download_url') and car_data['photo_download_url'] != "COLLECT_PHOTOS":
-                        logger.info(f"🎨 Начинаем очистку фото: {car_data['photo_download_url']}")
+                    photo_url = car_data.get('photo_download_url')
+                    if photo_url and (photo_url != "COLLECT_PHOTOS" or car_data.get('photo_urls')):
+                        logger.info(f"🎨 Начинаем очистку фото: {photo_url}")
 
-                        photo_url = car_data['photo_download_url']
                         result = await self.parser.download_and_process_photos(
                             photo_url,
                             bot=context.bot,
                             chat_id=update.effective_chat.id,
                             progress_message=status_message,  # Показываем прогресс в статус-сообщении
-                            car_data_text="⏳ Обработка"  # Текст для прогресс-бара
+                            car_data_text="⏳ Обработка",  # Текст для прогресс-бара
+                            photo_urls=car_data.get('photo_urls'),
+                            referer_url=url
                         )
 
                         if result:
@@ -1564,29 +2045,15 @@ class TelegramBot:
                     text=f"📷 Скачиваю {len(photo_urls)} фото..."
                 )
                 
+                # Скачиваем фото параллельно (порядок сохраняется)
+                photos = await self.parser.fetch_photo_urls_async(photo_urls)
+
                 # Создаем ZIP архив с фото
                 zip_buffer = io.BytesIO()
-                
+
                 with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for i, photo_url in enumerate(photo_urls):
-                        try:
-                            # Скачиваем фото
-                            photo_response = self.parser.session.get(photo_url, timeout=10)
-                            if photo_response.status_code == 200:
-                                # Определяем расширение файла
-                                if '.jpg' in photo_url or '.jpeg' in photo_url:
-                                    ext = '.jpg'
-                                elif '.png' in photo_url:
-                                    ext = '.png'
-                                else:
-                                    ext = '.jpg'  # по умолчанию
-                                
-                                # Добавляем фото в архив
-                                filename = f"photo_{i+1:02d}{ext}"
-                                zip_file.writestr(filename, photo_response.content)
-                                
-                        except Exception as e:
-                            logger.error(f"Ошибка скачивания фото {i+1}: {e}")
+                    for filename, content in photos:
+                        zip_file.writestr(filename, content)
                 
                 # Отправляем ZIP файл
                 zip_buffer.seek(0)
@@ -1631,7 +2098,12 @@ class TelegramBot:
     
     def setup_application(self):
         """Настройка приложения"""
-        self.application = Application.builder().token(self.token).build()
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
         
         # Добавляем обработчики
         self.application.add_handler(CommandHandler("start", self.start_command))
@@ -1696,6 +2168,7 @@ class TelegramBot:
     
     async def post_shutdown(self, application):
         """Выполняется при завершении работы бота"""
+        await self.parser.aclose()
         await self.set_bot_status("🔴 Офлайн")
         logger.info("Бот завершил работу")
     
@@ -1704,9 +2177,15 @@ class TelegramBot:
         self.setup_application()
         
         logger.info("Запуск бота...")
-        
+
+        # Запускаем браузеры заранее, чтобы первый запрос не ждал холодный старт
+        self.parser.warm_up()
+
         # Простой запуск без async операций
-        self.application.run_polling(drop_pending_updates=True)
+        try:
+            self.application.run_polling(drop_pending_updates=True)
+        finally:
+            self.parser.shutdown()
 
 def main():
     """Главная функция запуска бота"""
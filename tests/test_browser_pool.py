@@ -0,0 +1,182 @@
+"""
+Тесты BrowserPool без Playwright: браузеры подменяются заглушками через _launch
+"""
+import asyncio
+
+from browser_pool import BrowserPool, PooledBrowser
+
+
+class FakePage:
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePool(BrowserPool):
+    """Пул, который «запускает» заглушки вместо Chromium"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.blocker = None
+        self._playwright = object()  # драйвер не нужен
+
+    async def _launch(self) -> PooledBrowser:
+        self.stats['launched'] += 1
+        await asyncio.sleep(0)
+        return PooledBrowser(FakeBrowser(), FakeContext())
+
+
+async def use_page(pool: BrowserPool):
+    async with pool.page():
+        await asyncio.sleep(0.01)
+
+
+def test_recycled_browser_wakes_waiting_checkout():
+    async def scenario():
+        pool = FakePool(size=1, max_uses=1)
+        await asyncio.wait_for(asyncio.gather(use_page(pool), use_page(pool)), timeout=2)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.stats['checkouts'] == 2
+    assert pool.stats['recycled'] == 2
+    assert pool.stats['launched'] == 2
+    assert pool._created == 0
+
+
+def test_crashed_browser_wakes_waiting_checkout():
+    async def scenario():
+        pool = FakePool(size=1, max_uses=100)
+        original_checkout = pool._checkout
+
+        async def checkout_and_crash():
+            pooled = await original_checkout()
+            pooled.browser.connected = False  # «упал» во время работы
+            return pooled
+
+        pool._checkout = checkout_and_crash
+        await asyncio.wait_for(asyncio.gather(use_page(pool), use_page(pool)), timeout=2)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.stats['crashed'] == 2
+    assert pool._created == 0
+
+
+def test_idle_browser_is_reused():
+    async def scenario():
+        pool = FakePool(size=2, max_uses=100)
+        for _ in range(3):
+            await use_page(pool)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.stats['launched'] == 1
+    assert pool.stats['checkouts'] == 3
+    assert pool.busy_count == 0
+
+
+def test_service_in_flight_released_on_cancel():
+    import threading
+    import time
+
+    from browser_pool import BrowserService
+
+    service = BrowserService(pool=FakePool(size=1))
+    gate = threading.Event()
+
+    async def blocker():
+        # Занимает loop сервиса, пока следующий вызов не отменён
+        gate.wait(2)
+
+    async def noop():
+        return 1
+
+    first = service.submit(blocker)
+    second = service.submit(noop)
+    second.cancel()
+    gate.set()
+    first.result(timeout=2)
+
+    # done-callback выполняется сразу после выдачи результата
+    for _ in range(100):
+        if service.stats()['in_flight'] == 0:
+            break
+        time.sleep(0.01)
+    assert service.stats()['in_flight'] == 0
+    service._loop.call_soon_threadsafe(service._loop.stop)
+
+
+class SlowContextBrowser(FakeBrowser):
+    """Браузер, контекст которого создаётся дольше таймаута"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    async def new_context(self, user_agent=None):
+        await asyncio.sleep(self.delay)
+        return FakeContext()
+
+
+class FakeChromium:
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.browsers = []
+
+    async def launch(self, headless=True):
+        browser = SlowContextBrowser(self.delays.pop(0))
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self, delays):
+        self.chromium = FakeChromium(delays)
+
+
+def test_cancelled_launch_releases_slot_and_closes_browser():
+    async def scenario():
+        pool = BrowserPool(size=1, max_uses=100)
+        pool.blocker = None
+        pool._playwright = FakePlaywright([10, 0])
+
+        # Таймаут BrowserService отменяет запуск посреди new_context
+        checkout = asyncio.ensure_future(pool._checkout())
+        await asyncio.sleep(0.01)
+        checkout.cancel()
+        try:
+            await checkout
+        except asyncio.CancelledError:
+            pass
+
+        assert pool._created == 0
+        assert not pool._playwright.chromium.browsers[0].is_connected()
+
+        pooled = await asyncio.wait_for(pool._checkout(), timeout=2)
+        return pool, pooled
+
+    pool, pooled = asyncio.run(scenario())
+    assert pooled.is_healthy()
+    assert pool._created == 1
@@ -0,0 +1,35 @@
+"""
+Тесты кэша результатов парсинга (SQLite) и ключей объявлений
+"""
+
+import config
+from car_cache import CarDataCache, canonical_stock_key, price_ttl
+
+
+def test_canonical_key_ignores_url_variants():
+    key = canonical_stock_key('https://www.beforward.jp/toyota/vitz/bh873012/id/4512345/?tp_country_id=88')
+    assert key == 'id:4512345'
+    assert canonical_stock_key('beforward.jp/toyota/vitz/bh873012/id/4512345') == key
+
+
+def test_canonical_key_stock_reference():
+    assert canonical_stock_key('https://www.beforward.jp/toyota/vitz/BH873012/') == 'ref:BH873012'
+
+
+def test_put_get_roundtrip(tmp_path):
+    cache = CarDataCache(str(tmp_path / 'cars.sqlite3'))
+    cache.put('id:1', {'car_name': 'TOYOTA VITZ', 'url': 'https://x', 'lusaka_price': 'US$6,540'})
+
+    cached = cache.get('id:1')
+    assert cached['data'] == {'car_name': 'TOYOTA VITZ'}
+    assert cached['price'] == 'US$6,540'
+    assert cached['data_age'] < 5 and cached['price_age'] < 5
+    assert cache.get('id:2') is None
+    cache.close()
+
+
+def test_missing_price_expires_sooner():
+    assert price_ttl('US$6,540') == config.CAR_CACHE_PRICE_TTL
+    assert price_ttl('ASK') == config.CAR_CACHE_NO_PRICE_TTL
+    assert price_ttl(None) == config.CAR_CACHE_NO_PRICE_TTL
+    assert config.CAR_CACHE_NO_PRICE_TTL < config.CAR_CACHE_PRICE_TTL
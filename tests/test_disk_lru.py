@@ -0,0 +1,50 @@
+"""
+Тесты LRU учёта дискового кэша
+"""
+import os
+
+from disk_lru import DiskLru
+
+
+def test_lru_scans_directory_once(tmp_path):
+    for name, size in (('old', 300), ('new', 300)):
+        path = tmp_path / (name + '.body')
+        path.write_bytes(b'x' * size)
+        (tmp_path / (name + '.json')).write_text('{}')
+    os.utime(tmp_path / 'old.body', (1, 1))
+
+    lru = DiskLru(str(tmp_path), '.body', 700, companions=('.json',))
+    assert lru.total == 600
+
+    fresh = tmp_path / 'fresh.body'
+    fresh.write_bytes(b'y' * 200)
+    lru.add(str(fresh), 200)
+
+    assert not (tmp_path / 'old.body').exists()
+    assert not (tmp_path / 'old.json').exists()
+    assert (tmp_path / 'new.body').exists()
+    assert lru.total == 500
+
+
+def test_busy_entry_is_skipped(tmp_path, monkeypatch):
+    for name in ('busy', 'free'):
+        (tmp_path / (name + '.body')).write_bytes(b'x' * 300)
+    os.utime(tmp_path / 'busy.body', (1, 1))
+    lru = DiskLru(str(tmp_path), '.body', 700)
+
+    real_remove = os.remove
+
+    def remove(path):
+        # Как на Windows: открытый файл не удаляется
+        if path.endswith('busy.body'):
+            raise PermissionError(path)
+        real_remove(path)
+
+    monkeypatch.setattr(os, 'remove', remove)
+    fresh = tmp_path / 'fresh.body'
+    fresh.write_bytes(b'y' * 300)
+    lru.add(str(fresh), 300)
+
+    assert (tmp_path / 'busy.body').exists()
+    assert not (tmp_path / 'free.body').exists()
+    assert lru.total == 600
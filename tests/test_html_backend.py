@@ -0,0 +1,87 @@
+"""
+Тесты HTML бэкендов: все доступные бэкенды дают одинаковые результаты
+на синтетических страницах BeForward из benchmarks/fixtures/
+"""
+import os
+
+import pytest
+
+pytest.importorskip('bs4')
+
+from html_backend import HtmlBackend, available_backends, get_backend
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures')
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def extract(backend: HtmlBackend, content: bytes, partial: bool = False) -> dict:
+    """Те же обращения к дереву, что делают экстракторы BeForwardParser"""
+    root = backend.parse(content, partial=partial)
+
+    result = {}
+    h1 = backend.select_one(root, '#content > h1 > div.make')
+    result['make'] = backend.text(h1) if h1 is not None else None
+
+    table = backend.select_one(root, '#spec > table')
+    if table is None:
+        table = backend.select_one(root, '#content > div.specs > table')
+    result['specs'] = [
+        [backend.text(cell) for cell in backend.select(row, 'td, th')]
+        for row in backend.select(table, 'tr')
+    ]
+
+    modal = backend.select_one(root, '#change-country-port-modal')
+    ports = []
+    for input_elem in backend.select(modal, 'input[data-port]'):
+        row = backend.closest(input_elem, 'tr')
+        span = backend.select_one(row, 'span.fn-total-price-display')
+        ports.append((
+            backend.attr(input_elem, 'data-port', ''),
+            backend.attr(input_elem, 'data-with-clearing', ''),
+            backend.text(span).replace('\xa0', ''),
+        ))
+    result['ports'] = ports
+
+    result['photos'] = [
+        backend.attr(img, 'src') or backend.attr(img, 'data-src')
+        for img in backend.select(root, '#vehicle-photo-slider div.swiper-slide img')
+    ]
+    result['missing_attr'] = backend.attr(modal, 'data-nothing', 'default')
+    return result
+
+
+@pytest.mark.parametrize('page', ['page_v1.html', 'page_v2.html'])
+def test_backends_agree(page):
+    content = read_fixture(page)
+    reference = extract(get_backend('bs4'), content)
+
+    assert reference['specs']
+    assert reference['ports']
+    assert reference['missing_attr'] == 'default'
+
+    for name in available_backends():
+        assert extract(get_backend(name), content) == reference, name
+
+
+def test_partial_parse_keeps_extracted_blocks():
+    content = read_fixture('page_v1.html')
+    backend = get_backend('bs4')
+    assert extract(backend, content, partial=True) == extract(backend, content)
+
+
+def test_v1_price_row():
+    ports = extract(get_backend('bs4'), read_fixture('page_v1.html'))['ports']
+    assert ports[0] == ('DAR ES SALAAM', '', 'US$6,540')
+
+
+def test_backend_interface_is_abstract():
+    class Incomplete(HtmlBackend):
+        def parse(self, content, partial=False):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
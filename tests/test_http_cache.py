@@ -0,0 +1,81 @@
+"""
+Тесты HTTP кэша: учёт размера в памяти и чтение вытесненного тела
+"""
+import os
+
+import pytest
+
+pytest.importorskip('requests')
+pytest.importorskip('aiohttp')
+
+from http_cache import ConditionalHttpCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses[url].pop(0)
+
+
+def test_revalidated_body_survives_eviction(tmp_path):
+    session = FakeSession({
+        'https://a': [FakeResponse(200, b'a' * 600, {'ETag': '"a"'}), FakeResponse(304)],
+        'https://b': [FakeResponse(200, b'b' * 600)],
+    })
+    cache = ConditionalHttpCache(session, str(tmp_path), max_bytes=1000)
+
+    with cache.get('https://a') as first:
+        assert first.cache_status == 'miss'
+
+    with cache.get('https://a') as cached:
+        assert cached.cache_status == 'revalidated'
+        assert session.requests[-1][1]['If-None-Match'] == '"a"'
+
+        # Новая запись вытесняет выданную - тело всё равно читается
+        cache.get('https://b').close()
+        assert not os.path.exists(cached.path)
+        assert cached.content == b'a' * 600
+        assert cached.size == 600
+
+    assert cache._lru.total == 600
+    assert len(cache._lru) == 1
+
+
+def test_revalidate_ignores_max_age(tmp_path):
+    session = FakeSession({
+        'https://page': [
+            FakeResponse(200, b'old', {'ETag': '"v1"', 'Cache-Control': 'max-age=3600'}),
+            FakeResponse(304, headers={'Cache-Control': 'max-age=3600'}),
+        ],
+    })
+    cache = ConditionalHttpCache(session, str(tmp_path), max_bytes=1000)
+    cache.get('https://page').close()
+
+    with cache.get('https://page') as fresh:
+        assert fresh.cache_status == 'hit'
+    with cache.get('https://page', revalidate=True) as cached:
+        assert cached.cache_status == 'revalidated'
+        assert cached.content == b'old'
+    assert len(session.requests) == 2
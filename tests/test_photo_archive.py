@@ -0,0 +1,112 @@
+"""
+Тесты чтения выбранных фото из ZIP архива (целиком и через Range)
+"""
+import io
+import logging
+import re
+import zipfile
+
+import config
+
+from photo_archive import download_archive, read_selected_photos, read_selected_photos_ranged, unique_photo_names
+
+
+def make_archive(names) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        for name in names:
+            zip_file.writestr(name, name.encode('utf-8'))
+    return buffer.getvalue()
+
+
+class RangeResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StreamResponse(RangeResponse):
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+class StreamSession:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        return StreamResponse(200, self.data, {})
+
+
+class RangeSession:
+    """Отдаёт архив из памяти с поддержкой Range"""
+
+    def __init__(self, data: bytes, tail_only: bool = False):
+        self.data = data
+        self.tail_only = tail_only
+        self.referers = []
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.referers.append(headers.get('Referer'))
+        if self.tail_only and not headers['Range'].startswith('bytes=-'):
+            return RangeResponse(200, self.data, {})
+        total = len(self.data)
+        suffix = re.match(r'bytes=-(\d+)', headers['Range'])
+        if suffix:
+            start, end = max(0, total - int(suffix.group(1))), total - 1
+        else:
+            start, end = map(int, re.match(r'bytes=(\d+)-(\d+)', headers['Range']).groups())
+        return RangeResponse(206, self.data[start:end + 1], {'Content-Range': f'bytes {start}-{end}/{total}'})
+
+
+def test_unique_names_for_members_from_different_folders():
+    with zipfile.ZipFile(io.BytesIO(make_archive(['a/1.jpg', 'b/1.jpg', 'b/1.JPG', 'b/2.jpg']))) as zip_file:
+        assert unique_photo_names(zip_file.infolist()) == ['1.jpg', '1_2.jpg', '1_3.JPG', '2.jpg']
+
+
+def test_same_named_members_do_not_collide():
+    data = make_archive(['front/1.jpg', 'rear/1.jpg', 'front/2.jpg'])
+
+    photos = read_selected_photos(io.BytesIO(data))
+    assert len({name for name, _ in photos}) == 3
+    assert sorted(content for _, content in photos) == [b'front/1.jpg', b'front/2.jpg', b'rear/1.jpg']
+
+
+def test_ranged_read_matches_full_read():
+    data = make_archive([f'{folder}/{idx}.jpg' for folder in ('a', 'b') for idx in range(1, 16)])
+
+    assert read_selected_photos_ranged(RangeSession(data), 'https://x/photos.zip') == read_selected_photos(io.BytesIO(data))
+
+
+def test_download_archive_reports_spill_to_disk(monkeypatch, caplog):
+    monkeypatch.setattr(config, 'PHOTO_DOWNLOAD_MEMORY_MB', 1)
+    monkeypatch.setattr(config, 'PHOTO_DOWNLOAD_CHUNK_KB', 256)
+    caplog.set_level(logging.INFO, logger='photo_archive')
+
+    with download_archive(StreamSession(b'x' * 1024), 'https://x/small.zip') as archive:
+        assert archive.read() == b'x' * 1024
+    assert 'в памяти' in caplog.records[-1].getMessage()
+
+    with download_archive(StreamSession(b'y' * (2 * 1024 * 1024)), 'https://x/big.zip') as archive:
+        assert len(archive.read()) == 2 * 1024 * 1024
+    assert 'на диске' in caplog.records[-1].getMessage()
+
+
+def test_ranged_read_falls_back_when_member_range_fails():
+    data = make_archive([f'{idx}.jpg' for idx in range(1, 6)])
+    session = RangeSession(data, tail_only=True)
+
+    assert read_selected_photos_ranged(session, 'https://x/photos.zip', headers={'Referer': 'https://car'}) is None
+    assert session.referers and set(session.referers) == {'https://car'}
+
+
+def test_ranged_read_falls_back_on_broken_archive():
+    assert read_selected_photos_ranged(RangeSession(b'not a zip' * 100), 'https://x/photos.zip') is None
@@ -0,0 +1,46 @@
+"""
+Тесты параллельного скачивания фото: повторы только для временных ошибок
+"""
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from photo_fetcher import PhotoFetcher
+
+
+def make_app(hits):
+    async def photo(request):
+        name = request.match_info['name']
+        hits[name] = hits.get(name, 0) + 1
+        if name == 'flaky.jpg' and hits[name] == 1:
+            return web.Response(status=503)
+        if name == 'missing.jpg':
+            return web.Response(status=404)
+        return web.Response(body=name.encode('utf-8'))
+
+    app = web.Application()
+    app.router.add_get('/{name}', photo)
+    return app
+
+
+async def fetch(names):
+    hits = {}
+    async with TestServer(make_app(hits)) as server:
+        async with aiohttp.ClientSession() as session:
+            fetcher = PhotoFetcher(session, concurrency=4, per_host=2, retries=2, timeout=5)
+            results = await fetcher.fetch_all([str(server.make_url('/' + name)) for name in names])
+    return results, fetcher.stats, hits
+
+
+def test_ok_retry_and_not_found():
+    results, stats, hits = asyncio.run(fetch(['ok.jpg', 'flaky.jpg', 'missing.jpg']))
+
+    assert results == [b'ok.jpg', b'flaky.jpg', None]
+    # 503 повторяется, 404 - нет
+    assert hits == {'ok.jpg': 1, 'flaky.jpg': 2, 'missing.jpg': 1}
+    assert stats['ok'] == 2 and stats['failed'] == 1 and stats['retried'] == 1
@@ -0,0 +1,28 @@
+"""
+Тесты потокового тела запроса RunPod
+"""
+import base64
+import json
+
+import pytest
+
+for module in ('aiohttp', 'requests', 'PIL', 'telegram'):
+    pytest.importorskip(module)
+
+from bot_local import PhotoPayload
+
+
+def test_payload_is_valid_json_with_exact_length():
+    photos = [('1.jpg', b'\xff\xd8' * 200000), ('2.jpg', b'x'), ('3.jpg', b'')]
+    payload = PhotoPayload(photos)
+
+    body = b''.join(payload)
+    assert len(body) == len(payload)
+    assert json.loads(body) == {'input': {'photo_urls': [base64.b64encode(data).decode() for _, data in photos]}}
+
+
+def test_payload_can_be_sent_twice():
+    payload = PhotoPayload([('1.jpg', b'abc'), ('2.jpg', b'defg')])
+
+    assert b''.join(payload) == b''.join(payload)
+    assert len(payload.photos) == 2
@@ -0,0 +1,40 @@
+"""
+Тесты кэша обработанных фото: ключи и LRU вытеснение
+"""
+import os
+
+from result_cache import PhotoResultCache
+
+PARAMS = {'mode': 'crop', 'model': 'lama', 'engine': 'local'}
+
+
+def test_key_depends_on_bytes_and_params():
+    key = PhotoResultCache.key(b'photo', PARAMS)
+    assert key == PhotoResultCache.key(b'photo', dict(reversed(list(PARAMS.items()))))
+    assert key != PhotoResultCache.key(b'photo2', PARAMS)
+    assert key != PhotoResultCache.key(b'photo', dict(PARAMS, engine='iopaint'))
+
+
+def test_get_put_and_hit_rate(tmp_path):
+    cache = PhotoResultCache(str(tmp_path), max_bytes=1024)
+    assert cache.get('a') is None
+
+    cache.put('a', b'result')
+    assert cache.get('a') == b'result'
+    assert cache.stats == {'hit': 1, 'miss': 1, 'stored': 1}
+    assert cache.hit_rate == 0.5
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = PhotoResultCache(str(tmp_path), max_bytes=1000)
+    cache.put('a', b'a' * 400)
+    cache.put('b', b'b' * 400)
+    cache.get('a')
+    cache.put('c', b'c' * 400)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'a' * 400
+    assert sorted(os.listdir(tmp_path)) == ['a.img', 'c.img']
+
+    # После перезапуска учёт восстанавливается по файлам на диске
+    assert PhotoResultCache(str(tmp_path), max_bytes=1000)._lru.total == 800
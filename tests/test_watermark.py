@@ -0,0 +1,87 @@
+"""
+Тесты геометрии водяного знака, вклейки результата и кэша масок
+"""
+import io
+
+import pytest
+
+pytest.importorskip('PIL')
+
+from PIL import Image
+
+from image_codec import encode_image, encode_mask
+from watermark import (
+    apply_watermark,
+    crop_box,
+    encoded_watermark_mask,
+    inpaint_watermark,
+    mask_cache_info,
+    prepare_watermark,
+    watermark_box,
+)
+
+
+def test_watermark_box_bottom_center():
+    assert watermark_box(1000, 800, 300, 30) == (350, 770, 650, 800)
+
+
+def test_crop_box_clamped_to_image():
+    assert crop_box(1000, 800, (350, 770, 650, 800), 128) == (222, 642, 779, 800)
+
+
+def test_crop_mode_changes_only_masked_pixels():
+    img = Image.new('RGB', (1000, 800), (10, 20, 30))
+
+    def paint_red(image, mask):
+        return Image.new('RGB', image.size, (255, 0, 0))
+
+    result = inpaint_watermark(img, paint_red, mode='crop', padding=64, width=300, height=30)
+    assert result.size == img.size
+    assert result.getpixel((500, 790)) == (255, 0, 0)
+    assert result.getpixel((500, 700)) == (10, 20, 30)
+    assert result.getpixel((10, 790)) == (10, 20, 30)
+
+
+def test_full_mode_returns_model_result():
+    img = Image.new('RGB', (640, 480))
+    region, model_input, mask = prepare_watermark(img, mode='full', width=300, height=30)
+    assert region is None and model_input is img and mask.size == img.size
+
+    result = Image.new('RGB', (640, 480), (1, 2, 3))
+    assert apply_watermark(img, region, mask, result) is result
+
+
+def test_failed_inpaint_returns_none():
+    img = Image.new('RGB', (640, 480))
+    assert inpaint_watermark(img, lambda image, mask: None, mode='crop') is None
+
+
+def test_masks_are_memoized():
+    before = mask_cache_info()
+    first = encoded_watermark_mask(777, 555, 'png1', 'crop', 64, 300, 30)
+    second = encoded_watermark_mask(777, 555, 'png1', 'crop', 64, 300, 30)
+    after = mask_cache_info()
+
+    assert first == second
+    assert after['encoded']['hits'] == before['encoded']['hits'] + 1
+    assert after['encoded']['misses'] == before['encoded']['misses'] + 1
+
+
+def test_one_bit_mask_is_lossless():
+    img = Image.new('RGB', (640, 480))
+    _, _, mask = prepare_watermark(img, mode='crop', padding=32, width=300, height=30)
+
+    decoded = Image.open(io.BytesIO(encode_mask(mask, 'png1'))).convert('L')
+    assert list(decoded.getdata()) == list(mask.convert('L').getdata())
+    assert len(encode_mask(mask, 'png1')) <= len(encode_mask(mask, 'png'))
+
+
+def test_jpeg_passthrough_only_for_source():
+    img = Image.new('RGB', (64, 48), (50, 60, 70))
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG')
+    source = buffer.getvalue()
+
+    assert encode_image(img, 'jpeg', source) is source
+    assert encode_image(img, 'jpeg').startswith(b'\x89PNG')
+    assert encode_image(img, 'png').startswith(b'\x89PNG')
@@ -0,0 +1,231 @@
+"""
+Геометрия водяного знака BeForward и inpainting только вокруг него
+Знак - полоса внизу по центру; LaMa получает вырезанный кусок с запасом
+контекста вместо всего фото, результат вклеивается обратно по маске.
+Фото BeForward бывают всего нескольких размеров, поэтому маски и их
+закодированные для IOPaint версии кэшируются (LRU) по размеру и геометрии
+"""
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+import config
+from image_codec import encode_mask, to_base64
+
+logger = logging.getLogger(__name__)
+
+# (x1, y1, x2, y2) - координаты как в ImageDraw.rectangle (включительно)
+Box = Tuple[int, int, int, int]
+
+
+def watermark_box(
+    img_width: int,
+    img_height: int,
+    width: int = None,
+    height: int = None
+) -> Box:
+    """Прямоугольник водяного знака (внизу по центру)
+
+    Args:
+        img_width: Ширина изображения
+        img_height: Высота изображения
+        width: Ширина знака (по умолчанию config.WATERMARK_WIDTH)
+        height: Высота знака (по умолчанию config.WATERMARK_HEIGHT)
+    """
+    width = width or config.WATERMARK_WIDTH
+    height = height or config.WATERMARK_HEIGHT
+
+    x1 = (img_width - width) // 2
+    y1 = img_height - height
+    x2 = x1 + width
+    y2 = img_height
+    return x1, y1, x2, y2
+
+
+def create_watermark_mask(
+    img_width: int,
+    img_height: int,
+    width: int = None,
+    height: int = None
+) -> Image.Image:
+    """Создаёт маску водяного знака на всё изображение (255 - закрасить)"""
+    mask = Image.new('L', (img_width, img_height), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.rectangle(watermark_box(img_width, img_height, width, height), fill=255)
+    return mask
+
+
+def crop_box(img_width: int, img_height: int, box: Box, padding: int) -> Box:
+    """Область вокруг знака с запасом контекста для LaMa
+
+    Returns:
+        (left, top, right, bottom) для Image.crop, в пределах изображения
+    """
+    x1, y1, x2, y2 = box
+    return (
+        max(0, x1 - padding),
+        max(0, y1 - padding),
+        min(img_width, x2 + 1 + padding),
+        min(img_height, y2 + 1 + padding),
+    )
+
+
+def _geometry(mode: str, padding: int, width: int, height: int) -> Tuple[str, int, int, int]:
+    """Параметры знака с подставленными значениями из config (ключ кэша)"""
+    return (
+        mode or config.INPAINT_MODE,
+        config.INPAINT_CROP_PADDING if padding is None else padding,
+        width or config.WATERMARK_WIDTH,
+        height or config.WATERMARK_HEIGHT,
+    )
+
+
+@lru_cache(maxsize=config.MASK_CACHE_SIZE)
+def _watermark_mask(
+    img_width: int,
+    img_height: int,
+    mode: str,
+    padding: int,
+    width: int,
+    height: int
+) -> Tuple[Optional[Box], Image.Image]:
+    mask = create_watermark_mask(img_width, img_height, width, height)
+    if mode != 'crop':
+        return None, mask
+
+    region = crop_box(img_width, img_height, watermark_box(img_width, img_height, width, height), padding)
+    return region, mask.crop(region)
+
+
+@lru_cache(maxsize=config.MASK_CACHE_SIZE)
+def _encoded_watermark_mask(
+    img_width: int,
+    img_height: int,
+    codec: str,
+    mode: str,
+    padding: int,
+    width: int,
+    height: int
+) -> str:
+    _, mask = _watermark_mask(img_width, img_height, mode, padding, width, height)
+    return to_base64(encode_mask(mask, codec))
+
+
+def watermark_mask(
+    img_width: int,
+    img_height: int,
+    mode: str = None,
+    padding: int = None,
+    width: int = None,
+    height: int = None
+) -> Tuple[Optional[Box], Image.Image]:
+    """Маска для модели (на всё фото или на область вокруг знака) из кэша
+
+    Маска общая для всех фото этого размера - не изменяйте её.
+
+    Returns:
+        (область или None для full, маска)
+    """
+    return _watermark_mask(img_width, img_height, *_geometry(mode, padding, width, height))
+
+
+def encoded_watermark_mask(
+    img_width: int,
+    img_height: int,
+    codec: str = None,
+    mode: str = None,
+    padding: int = None,
+    width: int = None,
+    height: int = None
+) -> str:
+    """Маска watermark_mask, уже закодированная в base64 для запроса к IOPaint
+
+    Args:
+        img_width: Ширина фото
+        img_height: Высота фото
+        codec: png или png1 (по умолчанию config.TRANSPORT_MASK_CODEC)
+        mode, padding, width, height: см. prepare_watermark
+    """
+    return _encoded_watermark_mask(
+        img_width, img_height, codec or config.TRANSPORT_MASK_CODEC, *_geometry(mode, padding, width, height)
+    )
+
+
+def mask_cache_info() -> Dict[str, Dict]:
+    """Счётчики кэшей масок (hits, misses, maxsize, currsize)"""
+    return {
+        'mask': _watermark_mask.cache_info()._asdict(),
+        'encoded': _encoded_watermark_mask.cache_info()._asdict(),
+    }
+
+
+def prepare_watermark(
+    img: Image.Image,
+    mode: str = None,
+    padding: int = None,
+    width: int = None,
+    height: int = None
+) -> Tuple[Optional[Box], Image.Image, Image.Image]:
+    """Готовит вход модели: всё фото или область вокруг знака
+
+    Args:
+        img: Исходное изображение
+        mode: crop - только область вокруг знака, full - всё фото
+            (по умолчанию config.INPAINT_MODE)
+        padding: Запас контекста вокруг знака в пикселях (config.INPAINT_CROP_PADDING)
+        width: Ширина знака
+        height: Высота знака
+
+    Returns:
+        (область или None для full, изображение для модели, маска того же размера -
+        общая из кэша, не изменяйте её)
+    """
+    region, mask = watermark_mask(img.size[0], img.size[1], mode, padding, width, height)
+    if region is None:
+        return None, img, mask
+
+    return region, img.crop(region), mask
+
+
+def apply_watermark(
+    img: Image.Image,
+    region: Optional[Box],
+    mask: Image.Image,
+    result: Optional[Image.Image]
+) -> Optional[Image.Image]:
+    """Собирает итоговое фото из результата модели (см. prepare_watermark)"""
+    if result is None or region is None:
+        return result
+
+    if result.size != mask.size:
+        logger.warning(f"⚠️ Inpaint вернул {result.size} вместо {mask.size} - масштабируем")
+        result = result.resize(mask.size)
+
+    # Вклеиваем только пиксели под маской - остальное фото не меняется
+    output = img.convert('RGB') if img.mode not in ('RGB', 'L') else img.copy()
+    output.paste(result.convert(output.mode), region[:2], mask)
+    return output
+
+
+def inpaint_watermark(
+    img: Image.Image,
+    inpaint: Callable[[Image.Image, Image.Image], Optional[Image.Image]],
+    mode: str = None,
+    padding: int = None,
+    width: int = None,
+    height: int = None
+) -> Optional[Image.Image]:
+    """Удаляет водяной знак функцией inpaint (IOPaint HTTP, модель в процессе...)
+
+    Args:
+        img: Исходное изображение
+        inpaint: inpaint(image, mask) -> изображение того же размера или None
+        mode, padding, width, height: см. prepare_watermark
+
+    Returns:
+        Изображение без водяного знака или None, если inpaint вернул None
+    """
+    region, model_input, mask = prepare_watermark(img, mode, padding, width, height)
+    return apply_watermark(img, region, mask, inpaint(model_input, mask))